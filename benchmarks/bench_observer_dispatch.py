@@ -0,0 +1,81 @@
+"""Broadcast-to-handler latency and idle wakeups of the observer, 1s polling vs event-driven dispatch.
+
+Run from the repository root:  python -m benchmarks.bench_observer_dispatch
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from custom_components.peaqhvac.service.observer.iobserver_coordinator import IObserver
+
+
+class BenchObserver(IObserver):
+    def __init__(self):
+        super().__init__()
+        self.dispatch_calls = 0
+
+    async def async_dispatch(self, *args):
+        self.dispatch_calls += 1
+        await super().async_dispatch(*args)
+
+
+async def _poll(observer: BenchObserver, interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        await observer.async_dispatch()
+
+
+async def _measure(polling: bool, samples: int, idle: float, interval: float) -> dict:
+    observer = BenchObserver()
+    loop = asyncio.get_running_loop()
+    if polling:
+        task = loop.create_task(_poll(observer, interval))
+    else:
+        observer.start(loop)
+    latencies = []
+    received = asyncio.Event()
+
+    async def handler(sent):
+        latencies.append(time.perf_counter() - sent)
+        received.set()
+
+    observer.add("bench", handler)
+    for _ in range(samples):
+        await asyncio.sleep(random.uniform(0, interval))
+        received.clear()
+        observer.broadcast("bench", time.perf_counter())
+        await received.wait()
+
+    observer.dispatch_calls = 0
+    await asyncio.sleep(idle)
+    idle_wakeups = observer.dispatch_calls * 3600 / idle
+
+    if polling:
+        task.cancel()
+    else:
+        observer.stop()
+    return {
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "max_ms": max(latencies) * 1000,
+        "idle_wakeups_per_hour": idle_wakeups,
+    }
+
+
+async def main(samples: int, idle: float, interval: float):
+    for name, polling in (("before (1s polling)", True), ("after (event-driven)", False)):
+        res = await _measure(polling, samples, idle, interval)
+        print(
+            f"{name:<22} latency mean {res['mean_ms']:8.2f} ms  max {res['max_ms']:8.2f} ms  "
+            f"idle wakeups/h {res['idle_wakeups_per_hour']:8.0f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--samples", type=int, default=10)
+    parser.add_argument("--idle", type=float, default=5.0, help="seconds of idle time to count wakeups over")
+    parser.add_argument("--interval", type=float, default=1.0, help="polling interval of the old dispatcher")
+    args = parser.parse_args()
+    asyncio.run(main(args.samples, args.idle, args.interval))
@@ -0,0 +1,89 @@
+"""Burst thousands of broadcasts through the observer queue, list-based queue vs hash-indexed queue.
+
+Run from the repository root:  python -m benchmarks.bench_observer_queue
+"""
+import argparse
+import asyncio
+import time
+
+from custom_components.peaqhvac.service.observer.iobserver_coordinator import (
+    COMMAND_VALIDITY, DISPATCH_DELAY_TIMEOUT, IObserver)
+from custom_components.peaqhvac.service.observer.models.command import Command
+
+
+class LegacyQueue:
+    """The list-backed queue and full-scan dispatch delay the observer used before."""
+    def __init__(self):
+        self.broadcast_queue = []
+        self.dispatch_delay_queue = {}
+        self.dispatched = 0
+
+    def broadcast(self, command, argument=None):
+        cc = Command(command, time.time() + COMMAND_VALIDITY, argument)
+        if cc not in self.broadcast_queue:
+            if cc not in self.dispatch_delay_queue.keys():
+                self.dispatch_delay_queue[cc] = time.time()
+                self.broadcast_queue.append(cc)
+
+    def drain(self):
+        for q in list(self.broadcast_queue):
+            old_items = [k for k, v in self.dispatch_delay_queue.items() if time.time() - v > DISPATCH_DELAY_TIMEOUT]
+            for old in old_items:
+                self.dispatch_delay_queue.pop(old)
+            self.dispatched += 1
+            self.broadcast_queue.remove(q)
+
+
+class BenchObserver(IObserver):
+    def __init__(self):
+        super().__init__()
+        self.dispatched = 0
+
+    async def _async_invoke(self, subscriber, command):
+        self.dispatched += 1
+
+
+async def _noop(*args):
+    pass
+
+
+def _burst(broadcast, count: int, distinct: int):
+    for i in range(count):
+        broadcast(f"command {i % distinct}", i)
+
+
+async def _drain(observer: IObserver):
+    while observer.model.broadcast_queue:
+        await observer.async_dispatch()
+
+
+def main(count: int, distinct: int):
+    legacy = LegacyQueue()
+    start = time.perf_counter()
+    _burst(legacy.broadcast, count, distinct)
+    legacy_broadcast = time.perf_counter() - start
+    start = time.perf_counter()
+    legacy.drain()
+    legacy_drain = time.perf_counter() - start
+
+    observer = BenchObserver()
+    for i in range(distinct):
+        observer.add(f"command {i}", _noop)
+    start = time.perf_counter()
+    _burst(observer.broadcast, count, distinct)
+    new_broadcast = time.perf_counter() - start
+    start = time.perf_counter()
+    asyncio.run(_drain(observer))
+    new_drain = time.perf_counter() - start
+
+    print(f"{count} broadcasts over {distinct} commands")
+    print(f"before  broadcast {legacy_broadcast * 1000:9.1f} ms  drain {legacy_drain * 1000:9.1f} ms  dispatched {legacy.dispatched}")
+    print(f"after   broadcast {new_broadcast * 1000:9.1f} ms  drain {new_drain * 1000:9.1f} ms  dispatched {observer.dispatched}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--distinct", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.count, args.distinct)
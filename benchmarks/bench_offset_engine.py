@@ -0,0 +1,69 @@
+"""Time of _deviation_from_mean per price count: the old per-element mean/stdev, the python engine and the numpy engine.
+
+Run from the repository root:  python -m benchmarks.bench_offset_engine
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from statistics import mean, stdev
+
+from custom_components.peaqhvac.service.hvac.offset.offset_utils import (
+    _afternoon_index, _deviation_from_mean, _deviation_from_mean_numpy, _get_timedelta)
+
+
+def _legacy_deviation_from_mean(prices: list[float], min_price: float, dt: datetime) -> dict[datetime, float]:
+    """_deviation_from_mean before the mean and stdev of the shifted prices were taken out of the comprehension."""
+    delta = _get_timedelta(prices)
+    afternoon = _afternoon_index(delta)
+    dt_lister = dt.replace(hour=0)
+    min_list_price = min(min(prices), 0)
+    shifted_prices = [p - min_list_price for p in prices]
+    standardized_prices = [(p - mean(shifted_prices)) / stdev(shifted_prices) for p in shifted_prices]
+    avg, devi = mean(standardized_prices), stdev(standardized_prices)
+    avg2, devi2 = avg, devi
+    if dt.hour >= 13:
+        avg2 = mean(standardized_prices[afternoon:])
+        devi2 = stdev(standardized_prices[afternoon:])
+    ret = {}
+    for i, num in enumerate(standardized_prices):
+        _devi = devi if i < afternoon else devi2
+        _avg = avg if i < afternoon else avg2
+        deviation = (num - _avg) / _devi
+        if _devi < 1:
+            deviation *= 0.5
+        if num <= min_price:
+            setval = min(round(deviation, 2), 0)
+        elif num <= min_price * 2:
+            setval = round(deviation - 1 if deviation > 1 else deviation, 2)
+        else:
+            setval = round(deviation, 2)
+        ret[dt_lister + timedelta(minutes=delta * i)] = setval
+    return ret
+
+
+def _time(func, prices: list[float], dt: datetime, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func(prices, 0, dt)
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def main(rounds: int):
+    random.seed(16)
+    dt = datetime(2023, 12, 13, 14, 0, 0)
+    print(f"{'prices':>6} {'legacy ms':>10} {'python ms':>10} {'numpy ms':>10}")
+    for count in (24, 48, 96, 192):
+        prices = [round(random.uniform(-0.1, 3), 3) for _ in range(count)]
+        assert _deviation_from_mean_numpy(prices, 0, dt) == _deviation_from_mean(prices, 0, dt)
+        legacy = _time(_legacy_deviation_from_mean, prices, dt, max(rounds // 10, 1))
+        python = _time(_deviation_from_mean, prices, dt, rounds)
+        numpy = _time(_deviation_from_mean_numpy, prices, dt, rounds)
+        print(f"{count:>6} {legacy:>10.3f} {python:>10.3f} {numpy:>10.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+    main(args.rounds)
@@ -0,0 +1,80 @@
+"""Time of peak, valley and single valley detection per price count: the previous three detectors vs find_extremes.
+
+Run from the repository root:  python -m benchmarks.bench_peakfinder
+"""
+import argparse
+import random
+import statistics
+import time
+
+from custom_components.peaqhvac.service.hvac.offset.peakfinder import (
+    _check_deviation_peaks, _check_deviation_valleys, find_extremes)
+
+
+def _legacy_identify_peaks(prices: list) -> list[int]:
+    ret = []
+    for idx, p in enumerate(prices):
+        if p < statistics.mean(prices):
+            continue
+        if idx == 0 or idx == len(prices) - 1:
+            if p == max(prices):
+                ret.append(idx)
+        elif all([_check_deviation_peaks(p, prices[idx - 1]), _check_deviation_peaks(p, prices[idx + 1])]):
+            ret.append(idx)
+    return ret
+
+
+def _legacy_identify_valleys(prices: list) -> list[int]:
+    ret = []
+    for idx, p in enumerate(prices):
+        if p > statistics.mean(prices):
+            continue
+        if idx == 0 or idx == len(prices) - 1:
+            if p == min(prices):
+                ret.append(idx)
+        elif all([_check_deviation_valleys(p, prices[idx - 1]), _check_deviation_valleys(p, prices[idx + 1])]):
+            ret.append(idx)
+    return ret
+
+
+def _legacy_find_single_valleys(prices: list) -> list[int]:
+    ret = []
+    for idx, p in enumerate(prices):
+        if 1 < idx < len(prices) - 2 and all([
+            prices[idx] < prices[idx - 1],
+            prices[idx] < prices[idx + 1],
+            min(prices[idx - 1], prices[idx + 1]) / max(prices[idx - 1], prices[idx + 1]) > 0.8,
+        ]):
+            ret.append(idx)
+    return ret
+
+
+def _legacy(prices: list):
+    return _legacy_identify_peaks(prices), _legacy_identify_valleys(prices), _legacy_find_single_valleys(prices)
+
+
+def _time(func, prices: list, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func(prices)
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def main(rounds: int):
+    random.seed(19)
+    print(f"{'prices':>6} {'legacy ms':>10} {'single ms':>10} {'shape ms':>10}")
+    for count in (24, 48, 96, 192):
+        prices = [round(random.uniform(0.05, 2), 2) for _ in range(count)]
+        ret = find_extremes(prices)
+        assert (ret.peaks, ret.valleys, ret.single_valleys) == _legacy(prices)
+        legacy = _time(_legacy, prices, max(rounds // 10, 1))
+        single = _time(find_extremes, prices, rounds)
+        shape = _time(lambda p: find_extremes(p, shape=True), prices, rounds)
+        print(f"{count:>6} {legacy:>10.3f} {single:>10.3f} {shape:>10.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+    main(args.rounds)
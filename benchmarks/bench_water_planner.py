@@ -0,0 +1,113 @@
+"""Time of NextWaterBoost.get_next_start over 48 hours of quarter-hour prices: the list planner with a new mean per
+interval vs the single pass planner, with its suffix sums built per call or shared through PriceStats, and the
+horizon planner OptimalWaterBoost with shared stats.
+
+Run from the repository root:  python -m benchmarks.bench_water_planner
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from custom_components.peaqhvac.service.hvac.water_heater.water_heater_next_start import (
+    NextStartExportModel, NextStartPostModel, NextWaterBoost, PriceData)
+from custom_components.peaqhvac.service.hvac.water_heater.water_heater_optimal_start import OptimalWaterBoost
+from custom_components.peaqhvac.service.models.enums.hvac_presets import HvacPresets
+from custom_components.peaqhvac.service.models.price_stats import PriceStats
+
+
+class _LegacyNextWaterBoost(NextWaterBoost):
+    """get_next_start before the single pass: a full data list, filtered and sorted afterwards."""
+    def get_next_start(self, model: NextStartPostModel) -> NextStartExportModel:
+        self.water_limit = 30 if model.hvac_preset == HvacPresets.Away else 40
+        self.low_water_limit = self.water_limit - 20
+        self.dt = model.dt
+        self.min_price = model.min_price
+        self.interval = model.series.interval
+        if model.latest_boost is not None and self.dt - model.latest_boost < timedelta(hours=1):
+            self.dt = self.dt + timedelta(hours=1)
+        data = self._legacy_data(model)
+        selected = None
+        for d in data:
+            if all([
+                d.is_cold,
+                (d.price_spread < 1 or d.price < self.min_price or (d.is_demand or d.water_temp < d.target_temp)),
+                not d.is_non,
+                d.time >= self.reset_hour(self.dt, self.interval)
+            ]):
+                selected = d
+                break
+        if selected is None:
+            return NextStartExportModel(datetime.max, None)
+        filtered = [
+            d for d in data if max(d.time, selected.time) - min(d.time, selected.time) <= timedelta(hours=2)
+            and d.time >= self.reset_hour(self.dt, self.interval)
+        ]
+        for fdemand in [d for d in filtered if d.is_demand and not d.is_non]:
+            if fdemand.is_cold and fdemand.price_spread < selected.price_spread:
+                return NextStartExportModel(fdemand.time, fdemand.target_temp)
+        for d in sorted(filtered, key=lambda x: (not x.is_demand, x.price_spread)):
+            if not d.is_non and d.price_spread < selected.price_spread and not selected.is_demand and not selected.water_temp < self.low_water_limit:
+                selected = d
+                break
+        return NextStartExportModel(selected.time, selected.target_temp)
+
+    def _legacy_data(self, model: NextStartPostModel) -> list:
+        data = []
+        series = model.series
+        start = series.index_of(self.dt)
+        for idx, p in enumerate(series.prices[start:], start=start):
+            new_hour = series.floor(self.dt + series.step * (idx - start)) + series.step - timedelta(minutes=10)
+            second_hour = self.dt + series.step * (idx - start + 1)
+            temp_at_time = self._get_temperature_at_datetime(self.dt, new_hour, model.current_temp, model.temp_trend)
+            if new_hour < self.reset_hour(self.dt, self.interval):
+                continue
+            price_spread = round(p / statistics.mean(series.prices[max(idx - start, 0):]), 2)
+            data.append(PriceData(
+                p,
+                price_spread,
+                new_hour,
+                temp_at_time,
+                self._calculate_is_cold(temp_at_time, second_hour, model, p,
+                                        series.prices[idx + 1] if idx + 1 < len(series) else 9999),
+                second_hour.hour in model.demand_hours,
+                new_hour.hour in model.non_hours or second_hour.hour in model.non_hours,
+                self._calculate_target_temp_for_hour(temp_at_time, second_hour.hour in model.demand_hours, p,
+                                                     price_spread, model.min_price)
+            ))
+        return data
+
+
+def _time(planner, kwargs: dict, stats: PriceStats | None, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        planner.get_next_start(NextStartPostModel(**kwargs, stats=stats))
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def main(rounds: int):
+    random.seed(22)
+    prices = [round(random.uniform(0.05, 2), 2) for _ in range(192)]
+    day = datetime(2024, 1, 30)
+    stats = PriceStats(prices, start=day)
+    print(f"{'now':>5} {'temp':>5} {'legacy ms':>10} {'pass ms':>10} {'shared ms':>10} {'optimal ms':>10}")
+    for hour, temp in [(0, 45), (6, 38), (13, 50), (20, 30), (23, 55)]:
+        kwargs = dict(
+            prices=prices, demand_hours=[20, 21], non_hours=[12, 17, 11, 16], current_temp=temp, temp_trend=-1,
+            latest_boost=day - timedelta(hours=5), dt=day.replace(hour=hour, minute=7),
+        )
+        ret = NextWaterBoost().get_next_start(NextStartPostModel(**kwargs, stats=stats))
+        assert ret == _LegacyNextWaterBoost().get_next_start(NextStartPostModel(**kwargs))
+        legacy = _time(_LegacyNextWaterBoost(), kwargs, None, max(rounds // 10, 1))
+        single = _time(NextWaterBoost(), kwargs, None, rounds)
+        shared = _time(NextWaterBoost(), kwargs, stats, rounds)
+        optimal = _time(OptimalWaterBoost(), kwargs, stats, max(rounds // 10, 1))
+        print(f"{hour:>5} {temp:>5} {legacy:>10.3f} {single:>10.3f} {shared:>10.3f} {optimal:>10.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+    main(args.rounds)
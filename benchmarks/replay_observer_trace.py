@@ -0,0 +1,88 @@
+"""Plays an observer trace back into a headless Observer and reports how the bus handled it.
+
+Record a trace with the peaqhvac.start_observer_trace / stop_observer_trace services, it is written to
+peaqhvac_traces in the Home Assistant config directory. Then run from the repository root:
+    python -m benchmarks.replay_observer_trace peaqhvac_traces/peaqhvac_observer_trace.jsonl --speed 10
+
+Handlers are replaced by stand-ins that take as long as the recorded calls did, on average.
+Arguments are replayed as their digests, which keeps coalescing and the dispatch delay intact.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from collections import defaultdict
+
+from custom_components.peaqhvac.service.observer.models.priority import Priority
+from custom_components.peaqhvac.service.observer.observer_coordinator import Observer
+from custom_components.peaqhvac.service.observer.trace_recorder import TraceRecorder
+
+
+class FakeHass:
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+
+    async def async_add_executor_job(self, func, *args):
+        return await self.loop.run_in_executor(None, func, *args)
+
+    def async_create_background_task(self, coro, name: str):
+        return self.loop.create_task(coro, name=name)
+
+
+def _handler_costs(records: list[dict]) -> dict[str, dict[str, float]]:
+    durations = defaultdict(list)
+    for r in records:
+        if r["k"] == "h":
+            durations[(r["c"], r["h"])].append(r["ms"] / 1000)
+    costs = defaultdict(dict)
+    for (command, handler), values in durations.items():
+        costs[command][handler] = statistics.mean(values)
+    return costs
+
+
+def _stand_in(name: str, seconds: float):
+    async def handler(*args):
+        await asyncio.sleep(seconds)
+    handler.__qualname__ = name
+    return handler
+
+
+async def replay(records: list[dict], speed: float) -> dict:
+    observer = Observer(FakeHass(asyncio.get_running_loop()))
+    observer.enable_metrics()
+    for command, handlers in _handler_costs(records).items():
+        for name, seconds in handlers.items():
+            observer.add(command, _stand_in(name, seconds / speed))
+    broadcasts = [r for r in records if r["k"] == "b"]
+    if not broadcasts:
+        return {}
+    origin = broadcasts[0]["t"]
+    start = time.perf_counter()
+    for r in broadcasts:
+        delay = (r["t"] - origin) / speed - (time.perf_counter() - start)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        observer.broadcast(r["c"], r["a"], Priority(r.get("p", Priority.Recalculation)))
+    while observer.model.broadcast_queue or observer._cycles:
+        await asyncio.sleep(0.01)
+    observer.stop()
+    return {
+        "replayed": len(broadcasts),
+        "recorded_dispatches": sum(1 for r in records if r["k"] == "d"),
+        "seconds": round(time.perf_counter() - start, 2),
+        **observer.diagnostics()["metrics"],
+    }
+
+
+def main(path: str, speed: float):
+    result = asyncio.run(replay(TraceRecorder.read(path), speed))
+    print(json.dumps(result, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("trace")
+    parser.add_argument("--speed", type=float, default=1, help="replay this many times faster than recorded")
+    args = parser.parse_args()
+    main(args.trace, args.speed)
@@ -32,6 +32,8 @@ async def async_setup_entry(hass: HomeAssistant, config: ConfigEntry) -> bool:
     huboptions.heating.outdoor_temp_stop_heating = await async_get_existing_param(config, "outdoor_temp_stop_heating", 15)
     huboptions.heating.non_hours_water_boost = await async_get_existing_param(config, "non_hours_water_boost", [])
     huboptions.heating.demand_hours_water_boost = await async_get_existing_param(config, "demand_hours_water_boost", [])
+    huboptions.heating.water_planner = await async_get_existing_param(config, "water_planner", None)
+    huboptions.heating.offset_ramp_limit = await async_get_existing_param(config, "offset_ramp_limit", 0)
     huboptions.weather_entity = await async_get_existing_param(config, "weather_entity", None)
 
     huboptions.heating.low_dm = int((await async_get_existing_param(config, "low_degree_minutes", "-600")).replace(" ", ""))
@@ -68,6 +70,7 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok:
+        await hass.data[DOMAIN]["hub"].async_unload()
         hass.data[DOMAIN].pop(entry.entry_id)
     return unload_ok
 
@@ -10,6 +10,8 @@ from homeassistant.core import callback
 
 from custom_components.peaqhvac.configflow.config_flow_schemas import USER_SCHEMA, OPTIONAL_SCHEMA
 from custom_components.peaqhvac.configflow.config_flow_validation import ConfigFlowValidation
+from custom_components.peaqhvac.service.hvac.water_heater.water_heater_optimal_start import (
+    DEFAULT_WATER_PLANNER, WATER_PLANNERS)
 from .const import DOMAIN  # pylint:disable=unused-import
 
 _LOGGER = logging.getLogger(__name__)
@@ -76,6 +78,8 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
         _lowdm = await self._get_existing_param("low_degree_minutes", "-600")
         _verycoldtemp = await self._get_existing_param("very_cold_temp", "-12")
         _weather_entity = await self._get_existing_param("weather_entity", None)
+        _water_planner = await self._get_existing_param("water_planner", DEFAULT_WATER_PLANNER)
+        _offset_ramp_limit = await self._get_existing_param("offset_ramp_limit", 0)
 
         return self.async_show_form(
             step_id="init",
@@ -90,5 +94,8 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                 vol.Optional("low_degree_minutes", default=_lowdm): cv.string,
                 vol.Optional("very_cold_temp", default=_verycoldtemp): cv.string,
                 vol.Optional("weather_entity", default=_weather_entity): cv.string,
+                vol.Optional("water_planner", default=_water_planner): vol.In(WATER_PLANNERS),
+                vol.Optional("offset_ramp_limit", default=_offset_ramp_limit): vol.All(
+                    vol.Coerce(int), vol.Range(min=0, max=6)),
                 })
         )
@@ -1,6 +1,9 @@
 import homeassistant.helpers.config_validation as cv
 import voluptuous as vol
 
+from custom_components.peaqhvac.service.hvac.water_heater.water_heater_optimal_start import (
+    DEFAULT_WATER_PLANNER, WATER_PLANNERS)
+
 USER_SCHEMA = vol.Schema(
     {
         vol.Optional("indoor_tempsensors"): cv.string,
@@ -16,5 +19,7 @@ OPTIONAL_SCHEMA = vol.Schema({
     vol.Optional("low_degree_minutes", default="-600"): cv.string,
     vol.Optional("very_cold_temp", default="-12"): cv.string,
     vol.Optional("weather_entity"): cv.string,
+    vol.Optional("water_planner", default=DEFAULT_WATER_PLANNER): vol.In(WATER_PLANNERS),
+    vol.Optional("offset_ramp_limit", default=0): vol.All(vol.Coerce(int), vol.Range(min=0, max=6)),
 })
 
@@ -0,0 +1,19 @@
+"""Diagnostics support for peaqhvac."""
+from __future__ import annotations
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict:
+    """Observer metrics are only included while the observer diagnostic sensor is enabled."""
+    hub = hass.data[DOMAIN]["hub"]
+    return {
+        "observer": hub.observer.diagnostics(),
+        "hvac": hub.hvac.diagnostics(),
+        "offset_cache": hub.offset.cache.as_dict(),
+        "water_planner_cache": hub.hvac.water_heater.next_start_cache.as_dict(),
+        "tank_cooling": hub.hvac.water_heater.cooling.as_dict(),
+    }
@@ -65,7 +65,11 @@ def dt_from_epoch(epoch: int) -> str:
     return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(epoch))
 
 
-async def async_iscoroutine(object):
+def iscoroutine_function(object) -> bool:
     while isinstance(object, partial):
         object = object.func
     return inspect.iscoroutinefunction(object)
+
+
+async def async_iscoroutine(object):
+    return iscoroutine_function(object)
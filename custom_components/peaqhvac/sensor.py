@@ -9,6 +9,7 @@ from .const import AVERAGESENSORS, DEMANDSENSORS, DOMAIN, NEXT_WATER_START, LATE
     TRENDSENSOR_DM, TRENDSENSOR_OUTDOORS, TRENDSENSOR_INDOORS, TRENDSENSOR_WATERTEMP
 from .sensors.min_maxsensor import AverageSensor
 from .sensors.money_data_sensor import PeaqMoneyDataSensor
+from .sensors.observer_sensor import ObserverSensor
 from .sensors.offsetsensor import OffsetSensor
 from .sensors.peaqsensor import PeaqSensor
 from .sensors.simple_money_sensor import PeaqSimpleMoneySensor
@@ -83,6 +84,7 @@ async def _gather_sensors(hub, config) -> list:
 
     ret.append(PeaqSimpleSensor(hub, config.entry_id, "next water start", NEXT_WATER_START, "mdi:clock-start"))
     ret.append(PeaqSimpleSensor(hub, config.entry_id, "latest water boost", LATEST_WATER_BOOST, "mdi:clock-end"))
+    ret.append(ObserverSensor(hub, config.entry_id, "observer queue"))
 
     if not hub.peaqev_discovered:
         simplesensors = [("Average price this month", "average_month"),
@@ -0,0 +1,54 @@
+from homeassistant.const import EntityCategory
+
+from custom_components.peaqhvac.sensors.sensorbase import SensorBase
+
+SLOWEST_IN_ATTRIBUTES = 5
+
+
+class ObserverSensor(SensorBase):
+    """Queue depth and handler cost of the observer. Collecting the metrics starts when this sensor is enabled."""
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _unrecorded_attributes = frozenset({"Commands", "Slowest"})
+
+    def __init__(self, hub, entry_id, name):
+        self._sensorname = name
+        self._attr_name = f"{hub.hubname} {name}"
+        super().__init__(hub, self._attr_name, entry_id)
+        self._state = None
+        self._attributes = {}
+
+    @property
+    def state(self) -> int:
+        return self._state
+
+    @property
+    def icon(self) -> str:
+        return "mdi:transit-connection-variant"
+
+    @property
+    def extra_state_attributes(self) -> dict:
+        return self._attributes
+
+    async def async_added_to_hass(self) -> None:
+        self._hub.observer.enable_metrics()
+
+    async def async_will_remove_from_hass(self) -> None:
+        self._hub.observer.disable_metrics()
+
+    async def async_update(self) -> None:
+        diagnostics = self._hub.observer.diagnostics()
+        self._state = diagnostics["queue_depth"]
+        metrics = diagnostics["metrics"]
+        if metrics is None:
+            self._attributes = {}
+            return
+        self._attributes = {
+            "Queue wait mean (ms)":       metrics["queue_wait"]["mean_ms"],
+            "Queue wait max (ms)":        metrics["queue_wait"]["max_ms"],
+            "Handler duration mean (ms)": metrics["handler_duration"]["mean_ms"],
+            "Handler duration max (ms)":  metrics["handler_duration"]["max_ms"],
+            "Executor jobs saved/h":      diagnostics["dispatch_counters"]["executor_jobs_saved_per_hour"],
+            "Commands":                   metrics["commands"],
+            "Slowest":                    metrics["slowest"][:SLOWEST_IN_ATTRIBUTES],
+        }
@@ -20,6 +20,8 @@ class OffsetSensor(SensorBase):
         self._peaks_tomorrow = []
         self._prognosis = []
         self._aux_dict = {}
+        self._offsets_version = None
+        self._offsetsmodel: OffsetsExportModel | None = None
 
     @property
     def unit_of_measurement(self):
@@ -34,16 +36,18 @@ class OffsetSensor(SensorBase):
         return "mdi:stairs"
 
     async def async_update(self) -> None:
-
-        offsetsmodel: OffsetsExportModel = await self._hub.async_offset_export_model()
+        version = self._hub.offset.model.version
+        if version != self._offsets_version:
+            self._offsetsmodel = await self._hub.async_offset_export_model()
+            self._offsets = self._offsetsmodel.current_offset
+            self._offsets_tomorrow = self._offsetsmodel.current_offset_tomorrow
+            self._raw_offsets = self._offsetsmodel.raw_offsets
+            self._peaks_today, self._peaks_tomorrow = self._offsetsmodel.peaks
+            self._offsets_version = version
         data: CalculatedOffsetModel = await self._hub.hvac.house_heater.async_calculated_offsetdata(
-            offsetsmodel.current_raw_offset
+            self._offsetsmodel.current_raw_offset
         )
         self._state = self._hub.hvac.model.current_offset
-        self._offsets = offsetsmodel.current_offset
-        self._offsets_tomorrow = offsetsmodel.current_offset_tomorrow
-        self._raw_offsets = offsetsmodel.raw_offsets
-        self._peaks_today, self._peaks_tomorrow = offsetsmodel.peaks
 
         self._current_offset = data.current_offset
         self._tempdiff_offset = data.current_tempdiff
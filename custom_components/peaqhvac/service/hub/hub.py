@@ -9,6 +9,7 @@ from typing import Callable
 from custom_components.peaqhvac.const import LATEST_WATER_BOOST, NEXT_WATER_START
 from custom_components.peaqhvac.service.hub.hubsensors import HubSensors
 from custom_components.peaqhvac.service.hub.state_changes import StateChanges
+from custom_components.peaqhvac.service.hub.tick_scheduler import TickScheduler
 from custom_components.peaqhvac.service.hub.weather_prognosis import \
     WeatherPrognosis
 from custom_components.peaqhvac.service.hvac.hvacfactory import HvacFactory
@@ -16,6 +17,7 @@ from custom_components.peaqhvac.service.hvac.offset.offset_coordinator_factory i
 from custom_components.peaqhvac.service.hvac.update_system import UpdateSystem
 from custom_components.peaqhvac.service.models.config_model import ConfigModel
 from custom_components.peaqhvac.service.models.offsets_exportmodel import OffsetsExportModel
+from custom_components.peaqhvac.service.models.tick_snapshot import TickSnapshot
 from custom_components.peaqhvac.service.observer.observer_coordinator import Observer
 from custom_components.peaqhvac.extensionmethods import async_iscoroutine
 import sys
@@ -36,6 +38,7 @@ class Hub:
         self.state_machine = hass
         self.trackerentities = []
         self.observer = Observer(hass) #todo: move to creation factory
+        self.scheduler = TickScheduler(hass, snapshot_factory=self.tick_snapshot)
         self.options = hub_options
         self.peaqev_discovered: bool = self.get_peaqev()
         self.sensors = HubSensors(self, hub_options, hass, self.peaqev_discovered)
@@ -50,20 +53,35 @@ class Hub:
             is_active=True
         )
 
-        self.prognosis = WeatherPrognosis(hass, self.sensors.average_temp_outdoors, self.observer, self.options.weather_entity)
+        self.prognosis = WeatherPrognosis(
+            hass, self.sensors.average_temp_outdoors, self.observer, self.options.weather_entity, self.scheduler
+        )
         self.offset = OffsetFactory.create(self, observer=self.observer)
         self.options.hub = self
 
+    def tick_snapshot(self, now: datetime) -> TickSnapshot:
+        """The hvac values and price statistics the scheduler tasks of one tick share."""
+        return TickSnapshot(now=now, hvac=self.hvac.snapshot, prices=self.offset.price_series)
+
     async def async_setup(self) -> None:
+        await self.hvac.water_heater.async_setup()
         await self.async_setup_trackers()
         if self.prognosis.entity is not None:
             _LOGGER.debug("Weather-prognosis is enabled, will update weather.")
             await self.prognosis.async_update_weather()
+        self.scheduler.start()
+
+    async def async_unload(self) -> None:
+        self.scheduler.stop()
+        self.hvac.stop()
+        await self.observer.async_stop_recording()
+        self.observer.stop()
 
     async def async_setup_trackers(self):
         self.trackerentities.append(self.spotprice.entity)
         self.trackerentities.extend(self.options.indoor_temp)
         self.trackerentities.extend(self.options.outdoor_temp)
+        self.hvac.async_setup()
         await self.states.async_initialize_values()
         async_track_state_change_event(
             self.state_machine, self.trackerentities, self._async_on_change
@@ -1,6 +1,8 @@
 from __future__ import annotations
+import asyncio
 import logging
 import time
+from datetime import datetime, timedelta
 
 from peaqevcore.common.wait_timer import WaitTimer
 from typing import TYPE_CHECKING
@@ -10,12 +12,17 @@ if TYPE_CHECKING:
 
 _LOGGER = logging.getLogger(__name__)
 
+SENSOR_BATCH_TASK = "sensor_batch"
+SENSOR_BATCH_WINDOW = 2
+
 
 class StateChanges:
     def __init__(self, hub, hass):
         self._hub: Hub = hub
         self._hass = hass
         self.latest_price_update = WaitTimer(timeout=300)
+        self._price_changed: bool = False
+        self._batch_lock = asyncio.Lock()
 
     async def async_initialize_values(self):
         for t in self._hub.trackerentities:
@@ -34,17 +41,30 @@ class StateChanges:
                                                                       t=time.time())
 
     async def async_update_sensor(self, entity, value):
+        """
+        Averages and trends follow every event, the control cycle runs once for all events within SENSOR_BATCH_WINDOW
+        seconds, so one poll of many room sensors does not cause one cycle per sensor.
+        """
         if entity in self._hub.options.indoor_temp:
             await self._update_indoor_sensor(entity, value)
         elif entity in self._hub.options.outdoor_temp:
             await self._update_outdoor_sensor(entity, value)
+        if entity == self._hub.spotprice.entity:
+            self._price_changed = True
+        if not self._hub.scheduler.is_pending(SENSOR_BATCH_TASK):
+            self._hub.scheduler.call_at(
+                SENSOR_BATCH_TASK, datetime.now() + timedelta(seconds=SENSOR_BATCH_WINDOW), self.async_run_batch
+            )
 
-        await self._hass.async_add_executor_job(self._hub.prognosis.get_hvac_prognosis,
-                                                self._hub.sensors.average_temp_outdoors.value)
+    async def async_run_batch(self, *args) -> None:
+        async with self._batch_lock:
+            price_changed, self._price_changed = self._price_changed, False
+            await self._hass.async_add_executor_job(self._hub.prognosis.get_hvac_prognosis,
+                                                    self._hub.sensors.average_temp_outdoors.value)
 
-        if entity == self._hub.spotprice.entity or self.latest_price_update.is_timeout():
-            await self._hub.spotprice.async_update_spotprice()
-            #await self._hass.async_add_executor_job(self._hub.prognosis.update_weather_prognosis) #todo: add back when weather prognosis is fixed
-            self.latest_price_update.update()
+            if price_changed or self.latest_price_update.is_timeout():
+                await self._hub.spotprice.async_update_spotprice()
+                #await self._hass.async_add_executor_job(self._hub.prognosis.update_weather_prognosis) #todo: add back when weather prognosis is fixed
+                self.latest_price_update.update()
 
-        await self._hub.hvac.async_update_hvac()
+            await self._hub.hvac.async_update_hvac()
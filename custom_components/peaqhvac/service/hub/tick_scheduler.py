@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable
+
+from custom_components.peaqhvac.extensionmethods import iscoroutine_function
+from custom_components.peaqhvac.service.models.tick_snapshot import TickSnapshot
+
+_LOGGER = logging.getLogger(__name__)
+
+PRICE_INTERVAL = 900
+TICK_TOLERANCE = 0.05
+
+
+@dataclass
+class TickTask:
+    name: str
+    func: Callable
+    period: float
+    phase: float = 0
+    after: tuple[str, ...] = ()
+    next_due: float = 0
+    running: bool = False
+
+
+class TickScheduler:
+    """
+    One timer for every periodic job of the hub. Tasks run on a grid of period (plus phase) seconds anchored at local
+    midnight, so with periods dividing the price interval every task is due right on each price-interval boundary.
+    Tasks due on the same tick run after the tasks named in their after, and share one TickSnapshot made by
+    snapshot_factory when the tick starts.
+    call_at adds one-shot tasks for work that belongs to a known moment rather than a period.
+    """
+    def __init__(
+            self, hass, price_interval: float = PRICE_INTERVAL,
+            snapshot_factory: Callable[[datetime], TickSnapshot] | None = None
+    ):
+        self._hass = hass
+        self.price_interval = price_interval
+        self.snapshot_factory: Callable[[datetime], TickSnapshot] = snapshot_factory or (lambda now: TickSnapshot(now=now))
+        self.tasks: dict[str, TickTask] = {}
+        self._timer: asyncio.TimerHandle | None = None
+        self._oneshots: dict[str, asyncio.TimerHandle] = {}
+        self._running: set[asyncio.Task] = set()
+        self._started = False
+        self._stopped = False
+
+    def register(self, name: str, func: Callable, period: float, phase: float = 0, after: tuple[str, ...] = ()) -> None:
+        """func is called with the TickSnapshot of the tick, it may be a coroutine function."""
+        if self.price_interval % period and period % self.price_interval:
+            _LOGGER.warning(f"Tick task {name} every {period}s will drift against the {self.price_interval}s price interval.")
+        task = TickTask(name, func, period, phase % period, tuple(after))
+        self.tasks[name] = task
+        if self._started:
+            task.next_due = self._next_due(task, time.time())
+            self._arm()
+
+    def call_at(self, name: str, when: datetime, func: Callable) -> None:
+        """Runs func once at when (naive local time) with a TickSnapshot, replacing a pending call of the same name."""
+        self.cancel(name)
+        if self._stopped:
+            return
+        loop = self._hass.loop
+        delay = max((when - datetime.now()).total_seconds(), 0)
+        self._oneshots[name] = loop.call_at(loop.time() + delay, self._on_oneshot, name, func)
+
+    def is_pending(self, name: str) -> bool:
+        return name in self._oneshots
+
+    def cancel(self, name: str) -> None:
+        handle = self._oneshots.pop(name, None)
+        if handle is not None:
+            handle.cancel()
+
+    def start(self) -> None:
+        self._started = True
+        now = time.time()
+        for task in self.tasks.values():
+            task.next_due = self._next_due(task, now)
+        self._arm()
+
+    def stop(self) -> None:
+        self._started = False
+        self._stopped = True
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for name in list(self._oneshots):
+            self.cancel(name)
+        for running in self._running:
+            running.cancel()
+        self._running.clear()
+
+    def _next_due(self, task: TickTask, now: float) -> float:
+        offset = datetime.fromtimestamp(now).astimezone().utcoffset().total_seconds()
+        local = now + offset - task.phase
+        return math.floor(local / task.period + 1) * task.period + task.phase - offset
+
+    def _arm(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self.tasks:
+            return
+        wakeup = min(t.next_due for t in self.tasks.values())
+        loop = self._hass.loop
+        self._timer = loop.call_at(loop.time() + max(wakeup - time.time(), 0), self._on_tick)
+
+    def _on_tick(self) -> None:
+        self._timer = None
+        now = time.time()
+        due = [t for t in self.tasks.values() if t.next_due <= now + TICK_TOLERANCE]
+        for task in due:
+            task.next_due = self._next_due(task, max(now, task.next_due))
+        self._arm()
+        runnable = [t for t in due if not t.running]
+        for task in due:
+            if task.running:
+                _LOGGER.debug(f"Tick task {task.name} is still running, skipping this tick.")
+        if runnable:
+            self._start_run(runnable, now)
+
+    def _on_oneshot(self, name: str, func: Callable) -> None:
+        self._oneshots.pop(name, None)
+        self._start_run([TickTask(name, func, period=0)], time.time())
+
+    def _start_run(self, tasks: list[TickTask], now: float) -> None:
+        run = self._hass.async_create_background_task(
+            self.async_run(tasks, self.snapshot_factory(datetime.fromtimestamp(now))), "peaqhvac_tick"
+        )
+        self._running.add(run)
+        run.add_done_callback(self._running.discard)
+
+    async def async_run(self, tasks: list[TickTask], snapshot: TickSnapshot) -> None:
+        for task in self._ordered(tasks):
+            task.running = True
+            try:
+                if iscoroutine_function(task.func):
+                    await task.func(snapshot)
+                else:
+                    task.func(snapshot)
+            except Exception as e:
+                _LOGGER.exception(f"Tick task {task.name} failed: {e}")
+            finally:
+                task.running = False
+
+    @staticmethod
+    def _ordered(tasks: list[TickTask]) -> list[TickTask]:
+        """Registration order, except that a task waits for the tasks in its after that are due as well."""
+        names = {t.name for t in tasks}
+        done: set[str] = set()
+        ret = []
+        waiting = list(tasks)
+        while waiting:
+            ready = [t for t in waiting if all(a in done or a not in names for a in t.after)]
+            if not ready:
+                _LOGGER.warning(f"Circular tick task dependencies: {[t.name for t in waiting]}")
+                ready = waiting
+            for t in ready:
+                ret.append(t)
+                done.add(t.name)
+            waiting = [t for t in waiting if t.name not in done]
+        return ret
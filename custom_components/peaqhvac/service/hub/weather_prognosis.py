@@ -5,7 +5,6 @@ from datetime import datetime, timedelta, timezone
 from typing import Tuple
 
 import homeassistant.helpers.template as template
-from homeassistant.helpers.event import async_track_time_interval
 from peaqevcore.common.models.observer_types import ObserverTypes
 
 from custom_components.peaqhvac.service.models.prognosis_export_model import \
@@ -17,7 +16,7 @@ _LOGGER = logging.getLogger(__name__)
 
 
 class WeatherPrognosis:
-    def __init__(self, hass, average_temp_outdoors, observer, weather_entity: str):
+    def __init__(self, hass, average_temp_outdoors, observer, weather_entity: str, scheduler):
         self._hass = hass
         self.average_temp_outdoors = average_temp_outdoors
         self.observer = observer
@@ -28,7 +27,7 @@ class WeatherPrognosis:
         self.entity = weather_entity
         _LOGGER.debug("WeatherPrognosis initialized with entity: %s", self.entity)
         if self.entity is not None:
-            async_track_time_interval(self._hass, self.async_update_weather, timedelta(seconds=30))
+            scheduler.register("weather_prognosis", self.async_update_weather, period=30)
 
     @property
     def prognosis(self) -> list:
@@ -5,4 +5,4 @@ DEFAULT_WATER_BOOST = 1200
 WAITTIMER_VENT = 900
 
 HOUSE_HEATER_NAME = "house_heater"
-WATER_HEATER_NAME = "water_heater"
\ No newline at end of file
+WATER_HEATER_NAME = "water_heater"
@@ -7,6 +7,7 @@ from custom_components.peaqhvac.service.hvac.house_heater.models.calculated_offs
 from custom_components.peaqhvac.service.hvac.house_heater.models.offset_adjustments import OffsetAdjustments
 from custom_components.peaqhvac.service.models.enums.demand import Demand
 from custom_components.peaqhvac.service.models.enums.hvacmode import HvacMode
+from custom_components.peaqhvac.service.models.enums.sensortypes import SensorType
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -46,6 +47,9 @@ class HouseHeaterHelpers:
         return False
 
     def helper_get_demand(self) -> Demand:
+        if self._hvac.is_stale(SensorType.DegreeMinutes):
+            _LOGGER.debug("No current degree minutes from the hvac, reporting no demand.")
+            return Demand.NoDemand
         _compressor_start = self._hvac.hvac_compressor_start or -300
         _return_temp = self._hvac.delta_return_temp or 1000
         dm = self._hvac.hvac_dm
@@ -1,5 +1,5 @@
 import time
-from datetime import datetime, timedelta
+from datetime import datetime
 import logging
 
 from peaqevcore.common.models.observer_types import ObserverTypes
@@ -8,9 +8,9 @@ from peaqevcore.models.hub.hubmember import HubMember
 from custom_components.peaqhvac.service.hvac.const import WAITTIMER_VENT
 from peaqevcore.common.wait_timer import WaitTimer
 from custom_components.peaqhvac.service.models.enums.hvac_presets import HvacPresets
-from homeassistant.helpers.event import async_track_time_interval
 
 from custom_components.peaqhvac.service.models.enums.hvacoperations import HvacOperations
+from custom_components.peaqhvac.service.models.tick_snapshot import TickSnapshot
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -25,7 +25,7 @@ class HouseVentilation:
         self._current_vent_state: bool = False
         self._latest_seen_fan_speed: float = 0
         self._control_module: HubMember = HubMember(data_type=bool, initval=False)
-        async_track_time_interval(self._hvac.hub.state_machine, self.async_check_vent_boost, timedelta(seconds=30))
+        self._hvac.hub.scheduler.register("house_ventilation", self.async_check_vent_boost, period=30)
 
     @property
     def control_module(self) -> bool:
@@ -61,58 +61,61 @@ class HouseVentilation:
                 )
             self._latest_seen_fan_speed = self._hvac.fan_speed
 
-    async def async_check_vent_boost(self, *args) -> None:
+    async def async_check_vent_boost(self, snapshot: TickSnapshot | None = None) -> None:
+        """On scheduler ticks the time and degree minutes are those of the tick."""
+        hour = snapshot.now.hour if snapshot is not None else datetime.now().hour
+        dm = snapshot.hvac.dm if snapshot is not None and snapshot.hvac is not None else self._hvac.hvac_dm
         if self._sensors.temp_trend_indoors.samples > 0 and time.time() - self._wait_timer_boost.value > WAITTIMER_VENT:
-            if self._vent_boost_warmth():
+            if self._vent_boost_warmth(hour):
                 await self.async_vent_boost_start("Vent boosting because of warmth.")
                 return
-            if self._vent_boost_night_cooling():
+            if self._vent_boost_night_cooling(hour):
                 await self.async_vent_boost_start("Vent boost night cooling")
                 return
-            if self._vent_boost_low_dm():
+            if self._vent_boost_low_dm(dm):
                 await self.async_vent_boost_start("Vent boosting because of low degree minutes.")
                 return
         if any([
-            (self._hvac.hvac_dm > self._options.heating.low_dm + 100 and self._sensors.average_temp_outdoors.value < self._options.heating.outdoor_temp_stop_heating),
+            (dm > self._options.heating.low_dm + 100 and self._sensors.average_temp_outdoors.value < self._options.heating.outdoor_temp_stop_heating),
             self._sensors.average_temp_outdoors.value < self._options.heating.very_cold_temp
             ]) and self.vent_boost:
-            _LOGGER.debug(f"recovered dm or very cold. stopping went boost. dm: {self._hvac.hvac_dm} > {self._options.heating.low_dm + 100}, temp: {self._sensors.average_temp_outdoors.value}")
+            _LOGGER.debug(f"recovered dm or very cold. stopping went boost. dm: {dm} > {self._options.heating.low_dm + 100}, temp: {self._sensors.average_temp_outdoors.value}")
             self.vent_boost = False
             await self.observer.async_broadcast(
                 command=ObserverTypes.UpdateOperation,
                 argument=(HvacOperations.VentBoost, int(self.vent_boost))
             )
 
-    def _vent_boost_warmth(self) -> bool:
+    def _vent_boost_warmth(self, hour: int) -> bool:
         return all(
                     [
                         self._sensors.get_tempdiff() > 4,
                         self._sensors.get_tempdiff_in_out() > 5,
                         self._sensors.temp_trend_indoors.gradient >= 0,
                         self._sensors.temp_trend_outdoors.gradient >= 0,
-                        datetime.now().hour in list(range(7, 21)),
+                        hour in list(range(7, 21)),
                         self._sensors.average_temp_outdoors.value >= self._options.heating.outdoor_temp_stop_heating,
                         self._sensors.set_temp_indoors.preset != HvacPresets.Away,
                     ]
                 )
 
-    def _vent_boost_night_cooling(self) -> bool:
+    def _vent_boost_night_cooling(self, hour: int) -> bool:
         return all(
                     [
                         self._sensors.get_tempdiff() > 4,
                         self._sensors.get_tempdiff_in_out() > 5,
                         self._sensors.average_temp_outdoors.value >= self._options.heating.outdoor_temp_stop_heating,
-                        datetime.now().hour in list(range(21, 24)) + list(range(0, 7)),
+                        hour in list(range(21, 24)) + list(range(0, 7)),
                         self._sensors.set_temp_indoors.preset != HvacPresets.Away,
                     ]
                 )
 
 
 
-    def _vent_boost_low_dm(self) -> bool:
+    def _vent_boost_low_dm(self, dm: int) -> bool:
         return all(
                     [
-                        self._hvac.hvac_dm <= self._options.heating.low_dm,
+                        dm <= self._options.heating.low_dm,
                         self._sensors.average_temp_outdoors.value >= self._options.heating.very_cold_temp,
                     ]
                 )
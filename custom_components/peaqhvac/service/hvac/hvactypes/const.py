@@ -1,5 +1,6 @@
 from custom_components.peaqhvac.service.models.enums.hvacmode import HvacMode
 from custom_components.peaqhvac.service.models.enums.hvacoperations import HvacOperations
+from custom_components.peaqhvac.service.models.enums.sensortypes import SensorType
 
 ADDON_VALUE_CONVERSION = {
             "Alarm":   False,
@@ -13,3 +14,23 @@ HVACMODE_LOOKUP = {
             "Hot water": HvacMode.Water,
             "Heating":   HvacMode.Heat,
         }
+
+UNAVAILABLE_STATES = ("unavailable", "unknown")
+
+
+def _parse_int(value) -> int:
+    return int(float(value))
+
+
+SENSOR_PARSERS = {
+            SensorType.HvacMode:            lambda v: HVACMODE_LOOKUP.get(v, HvacMode.Unknown),
+            SensorType.Offset:              _parse_int,
+            SensorType.DegreeMinutes:       _parse_int,
+            SensorType.WaterTemp:           float,
+            SensorType.HvacTemp:            float,
+            SensorType.HotWaterReturn:      float,
+            SensorType.ElectricalAddition:  ADDON_VALUE_CONVERSION.__getitem__,
+            SensorType.CompressorFrequency: _parse_int,
+            SensorType.DMCompressorStart:   _parse_int,
+            SensorType.FanSpeed:            float,
+        }
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import time
+from typing import Any
+
+from custom_components.peaqhvac.service.hvac.hvactypes.const import SENSOR_PARSERS, UNAVAILABLE_STATES
+from custom_components.peaqhvac.service.models.enums.sensortypes import SensorType
+
+
+class HvacStateCache:
+    """Typed hvac values, parsed when their entity changes state instead of on every read.
+
+    A value is None when its entity is missing, unavailable or cannot be parsed. updated holds the
+    timestamp of the latest state that could be parsed, so a value that has stopped reporting can be
+    told apart from a real reading.
+    """
+
+    def __init__(self, refs: dict[SensorType, tuple[str, str | None]]):
+        self._by_entity: dict[str, list[tuple[SensorType, str | None]]] = {}
+        self._readings: list[SensorType] = [s for s in refs if s in SENSOR_PARSERS]
+        for sensor, (entity_id, attribute) in refs.items():
+            self._by_entity.setdefault(entity_id, []).append((sensor, attribute))
+        self.values: dict[SensorType, Any] = {}
+        self.updated: dict[SensorType, float] = {}
+        self.version: int = 0
+
+    @property
+    def entities(self) -> list[str]:
+        return list(self._by_entity)
+
+    def get(self, sensor: SensorType, default=None):
+        ret = self.values.get(sensor)
+        return default if ret is None else ret
+
+    def update(self, entity_id: str, state) -> list[SensorType]:
+        """Parses the state for every sensor on the entity and returns the sensors whose value changed."""
+        changed = []
+        for sensor, attribute in self._by_entity.get(entity_id, []):
+            value = self._parse(sensor, self._raw(state, attribute))
+            if value is not None:
+                self.updated[sensor] = self._state_time(state)
+            if value != self.values.get(sensor):
+                self.values[sensor] = value
+                changed.append(sensor)
+        if changed:
+            self.version += 1
+        return changed
+
+    def age(self, sensor: SensorType) -> float | None:
+        """Seconds since the sensor last reported a parseable state, None if it never has."""
+        updated = self.updated.get(sensor)
+        return None if updated is None else time.time() - updated
+
+    def stale(self, max_age: float | None = None) -> list[SensorType]:
+        """Sensors without a current value, or whose latest value is older than max_age."""
+        ret = []
+        for sensor in self._readings:
+            age = self.age(sensor)
+            if self.values.get(sensor) is None or (max_age is not None and age > max_age):
+                ret.append(sensor)
+        return ret
+
+    @staticmethod
+    def _raw(state, attribute: str | None):
+        if state is None:
+            return None
+        if attribute is not None:
+            return state.attributes.get(attribute)
+        return state.state
+
+    @staticmethod
+    def _parse(sensor: SensorType, raw):
+        if raw is None or raw in UNAVAILABLE_STATES:
+            return None
+        parser = SENSOR_PARSERS.get(sensor)
+        if parser is None:
+            return raw
+        try:
+            return parser(raw)
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _state_time(state) -> float:
+        return getattr(state, "last_updated_timestamp", None) or time.time()
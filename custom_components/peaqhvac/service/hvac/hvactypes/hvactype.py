@@ -3,33 +3,35 @@ from __future__ import annotations
 import logging
 from abc import abstractmethod
 import time
-from datetime import timedelta
-from typing import TYPE_CHECKING, Tuple
+from typing import TYPE_CHECKING, Callable, Tuple
 
-from homeassistant.helpers.event import async_track_time_interval
 from peaqevcore.common.models.observer_types import ObserverTypes
 
-from custom_components.peaqhvac.service.hvac.hvactypes.const import HVACMODE_LOOKUP, ADDON_VALUE_CONVERSION
+from custom_components.peaqhvac.service.hvac.hvactypes.hvac_state_cache import HvacStateCache
 from custom_components.peaqhvac.service.observer.iobserver_coordinator import IObserver
 
 if TYPE_CHECKING:
     from custom_components.peaqhvac.service.hub.hub import Hub
 
-from homeassistant.core import HomeAssistant
+from homeassistant.core import Event, EventStateChangedData, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_state_change_event
 
-import custom_components.peaqhvac.extensionmethods as ex
 from custom_components.peaqhvac.service.hvac.house_heater.house_heater_coordinator import HouseHeaterCoordinator
 from custom_components.peaqhvac.service.hvac.water_heater.water_heater_coordinator import WaterHeater
 from custom_components.peaqhvac.service.hvac.house_ventilation import HouseVentilation
 from custom_components.peaqhvac.service.models.enums.hvacmode import HvacMode
 from custom_components.peaqhvac.service.models.enums.hvacoperations import HvacOperations
 from custom_components.peaqhvac.service.models.enums.sensortypes import SensorType
+from custom_components.peaqhvac.service.models.hvac_snapshot import HvacSnapshot
+from custom_components.peaqhvac.service.models.tick_snapshot import TickSnapshot
 from custom_components.peaqhvac.service.models.ihvac_model import IHvacModel
 
 _LOGGER = logging.getLogger(__name__)
 
 
 class HvacType:
+    """Entity per sensor type, formatted with the systemid. An attribute is addressed as entity|attribute."""
+    SENSORS: dict[SensorType, str] = {}
     _force_update: bool = False
     update_list: dict[HvacOperations, any] = {}
     periodic_update_timers: dict = {
@@ -42,13 +44,23 @@ class HvacType:
         self.hub = hub
         self.observer = observer
         self._hass = hass
+        self._sensors: dict[SensorType, str] = {
+            t: s.format(systemid=hub.options.systemid) for t, s in self.SENSORS.items()
+        }
+        self._sensor_refs: dict[SensorType, tuple[str, str | None]] = {
+            t: self._parse_sensor(s) for t, s in self._sensors.items()
+        }
+        self._callback_entities: list[str] = list(dict.fromkeys(e for e, _ in self._sensor_refs.values()))
+        self.state_cache = HvacStateCache(self._sensor_refs)
+        self._snapshot: HvacSnapshot | None = None
+        self._unsubscribe: Callable | None = None
         self.house_heater = HouseHeaterCoordinator(hvac=self, hub=hub, observer=observer, options=hub.options, sensors=hub.sensors)
         self.water_heater = WaterHeater(hub=hub, observer=observer, options=hub.options, sensors=hub.sensors)
         self.house_ventilation = HouseVentilation(hvac=self, observer=observer, options=hub.options, sensors=hub.sensors)
 
         self.observer.add(ObserverTypes.OffsetRecalculation, self.async_update_offset)
         self.observer.add("ObserverTypes.TemperatureIndoorsChanged", self.async_receive_temperature_change)
-        async_track_time_interval(self._hass, self.async_receive_temperature_change, timedelta(seconds=60))
+        self.hub.scheduler.register("hvac_temperature", self.async_receive_temperature_change, period=60)
 
     @property
     @abstractmethod
@@ -60,9 +72,72 @@ class HvacType:
     def fan_speed(self) -> float:
         pass
 
-    @abstractmethod
     def get_sensor(self, sensor: SensorType = None):
-        pass
+        return self._sensors.get(sensor) if sensor is not None else self._callback_entities
+
+    @property
+    def snapshot(self) -> HvacSnapshot:
+        """The cached hvac values, rebuilt only after one of them has changed."""
+        if self._snapshot is None or self._snapshot.version != self.state_cache.version:
+            self._snapshot = self._build_snapshot()
+        return self._snapshot
+
+    def is_stale(self, *sensors: SensorType, max_age: float | None = None) -> bool:
+        """True if any of the sensors has no current value, or has not reported within max_age seconds."""
+        stale = self.snapshot.stale if max_age is None else self.state_cache.stale(max_age)
+        return any(s in stale for s in sensors)
+
+    def diagnostics(self) -> dict:
+        return {
+            s.name: {"value": getattr(v, "name", v), "age": self.state_cache.age(s)}
+            for s, v in self.state_cache.values.items()
+        }
+
+    def async_setup(self) -> None:
+        """Loads the current hvac states and keeps the cache updated from their state changes."""
+        for entity_id in self.state_cache.entities:
+            self._update_state(entity_id, self._hass.states.get(entity_id))
+        self._unsubscribe = async_track_state_change_event(
+            self._hass, self.state_cache.entities, self._async_on_state_change
+        )
+
+    def stop(self) -> None:
+        if self._unsubscribe is not None:
+            self._unsubscribe()
+            self._unsubscribe = None
+
+    @callback
+    def _async_on_state_change(self, event: Event[EventStateChangedData]) -> None:
+        self._update_state(event.data["entity_id"], event.data["new_state"])
+
+    def _update_state(self, entity_id: str, state) -> None:
+        changed = self.state_cache.update(entity_id, state)
+        if SensorType.DegreeMinutes in changed and self.state_cache.values[SensorType.DegreeMinutes] is not None:
+            self._track_dm(self.state_cache.values[SensorType.DegreeMinutes])
+
+    def _build_snapshot(self) -> HvacSnapshot:
+        cache = self.state_cache
+        return HvacSnapshot(
+            version=cache.version,
+            stale=frozenset(cache.stale()),
+            hvac_mode=cache.get(SensorType.HvacMode, HvacMode.Unknown),
+            offset=cache.get(SensorType.Offset, 0),
+            dm=cache.get(SensorType.DegreeMinutes, 0),
+            water_temp=cache.get(SensorType.WaterTemp, 0),
+            supply_temp=cache.get(SensorType.HvacTemp),
+            return_temp=cache.get(SensorType.HotWaterReturn),
+            electrical_addon=cache.get(SensorType.ElectricalAddition, False),
+            compressor_frequency=cache.get(SensorType.CompressorFrequency, 0),
+            compressor_start=cache.get(SensorType.DMCompressorStart, 0),
+            fan_speed=cache.get(SensorType.FanSpeed, 0),
+        )
+
+    def _track_dm(self, dm: int) -> None:
+        if dm not in range(-10000, 101):
+            _LOGGER.warning(f"DM is out of range: {dm}")
+        if self.model.hvac_dm != dm:
+            self.model.hvac_dm = dm
+            self.hub.sensors.dm_trend.add_reading(dm, time.time())
 
     @abstractmethod
     def _set_servicecall_params(self, operation, _value):
@@ -103,41 +178,32 @@ class HvacType:
                 ],
                 """
 
-        sensor = self.get_sensor(SensorType.HvacMode)
-        ret = self._handle_sensor(sensor)
-        if ret is not None:
-            return HVACMODE_LOOKUP.get(ret, HvacMode.Unknown)
-        return HvacMode.Unknown
+        return self.snapshot.hvac_mode
 
     @property
     def hvac_offset(self) -> int:
-        return self.get_value(SensorType.Offset, int)
+        return self.snapshot.offset
 
     @property
     def hvac_dm(self) -> int:
-        ret = self.get_value(SensorType.DegreeMinutes, int)
-        if ret not in range(-10000, 101):
-            _LOGGER.warning(f"DM is out of range: {ret}")
-        if self.model.hvac_dm != ret:
-            self.model.hvac_dm = ret
-            self.hub.sensors.dm_trend.add_reading(ret, time.time())
-        return ret
+        return self.snapshot.dm
 
     @property
     def compressor_frequency(self) -> int:
-        return self.get_value(SensorType.CompressorFrequency, int)
+        return self.snapshot.compressor_frequency
 
     @property
     def hvac_electrical_addon(self) -> bool:
-        ret = self.get_value(SensorType.ElectricalAddition, str)
-        return ADDON_VALUE_CONVERSION.get(ret, False)
+        return self.snapshot.electrical_addon
 
     @property
     def hvac_compressor_start(self) -> int:
-        return self.get_value(SensorType.DMCompressorStart, int)
+        return self.snapshot.compressor_start
 
     async def async_receive_temperature_change(self, *args):
-        await self.async_update_offset()
+        """On scheduler ticks the offset is compared with the hvac values of the tick."""
+        snapshot = args[0] if args and isinstance(args[0], TickSnapshot) else None
+        await self.async_update_offset(hvac=snapshot.hvac if snapshot is not None else None)
 
     def set_operation_call_parameters(
             self, operation: HvacOperations, _value: any
@@ -148,7 +214,7 @@ class HvacType:
         return call_operation, params, service_domain
 
     async def async_hvac_watertemp(self) -> float:
-        val = self.get_value(SensorType.WaterTemp, float)
+        val = self.snapshot.water_temp
         await self.water_heater.async_set_current_temperature(val)
         return val
 
@@ -157,7 +223,7 @@ class HvacType:
         await self.water_heater.async_update_demand()
         await self.house_ventilation.async_check_vent_boost()
 
-    async def async_update_offset(self, raw_offset:int|None = None) -> bool:
+    async def async_update_offset(self, raw_offset:int|None = None, hvac: HvacSnapshot | None = None) -> bool:
         if raw_offset is not None:
             if int(raw_offset) != self.model.raw_offset:
                 self.model.raw_offset = int(raw_offset)
@@ -166,7 +232,7 @@ class HvacType:
             if len(self.hub.sensors.peaqev_facade.offsets.get("today", {})) < 20:
                 return ret
         try:
-            _hvac_offset = self.hvac_offset
+            _hvac_offset = hvac.offset if hvac is not None else self.hvac_offset
             new_offset, force_update = await self.house_heater.async_adjusted_offset(
                 self.model.raw_offset
             )
@@ -186,40 +252,12 @@ class HvacType:
         finally:
             return ret
 
-    def get_value(self, sensor: SensorType, return_type):
-        _sensor = self.get_sensor(sensor)
-        ret = self._handle_sensor(_sensor)
-        if ret is not None:
-            try:
-                return ex.parse_to_type(ret, return_type)
-            except Exception as e:
-                _LOGGER.debug(f"Could not parse {sensor.name} from hvac. {e}")
-        return 0
-
-    def _handle_sensor(self, sensor: str):
+    @staticmethod
+    def _parse_sensor(sensor: str) -> tuple[str, str | None]:
         sensor_obj = sensor.split("|")
         if not 0 < len(sensor_obj) <= 2:
-            raise ValueError
-        entity_id = sensor_obj[0]
-        state = self._hass.states.get(entity_id)
-        if state is None:
-            return None
-        if len(sensor_obj) == 2:
-            attribute = sensor_obj[1]
-            try:
-                return state.attributes.get(attribute)
-            except Exception as e:
-                _LOGGER.exception(e)
-                return None
-        return state.state
-
-    @staticmethod
-    def _get_sensors_for_callback(types: dict) -> list:
-        ret = []
-        for t in types:
-            item = types[t]
-            ret.append(item.split("|")[0])
-        return ret
+            raise ValueError(f"Could not parse sensor {sensor}")
+        return sensor_obj[0], sensor_obj[1] if len(sensor_obj) == 2 else None
 
     @staticmethod
     def _service_domain_per_operation(operation: HvacOperations) -> str:
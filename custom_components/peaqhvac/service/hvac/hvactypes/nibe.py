@@ -12,6 +12,20 @@ NIBE_MIN_THRESHOLD = -10
 class Nibe(HvacType):
     domain = "Nibe"
     water_heater_entity = None
+    SENSORS = {
+        SensorType.HvacMode: "sensor.{systemid}_priority",
+        SensorType.Offset: "number.{systemid}_heating_offset_climate_system_1",
+        SensorType.DegreeMinutes: "number.{systemid}_current_value",
+        SensorType.WaterTemp: "sensor.{systemid}_hot_water_charging_bt6",
+        SensorType.HvacTemp: "sensor.{systemid}_supply_line_bt2",
+        SensorType.HotWaterReturn: "sensor.{systemid}_return_line_bt3",
+        SensorType.ElectricalAddition: "sensor.{systemid}_int_elec_add_heat",
+        SensorType.CompressorFrequency: "sensor.{systemid}_current_compressor_frequency",
+        SensorType.DMCompressorStart: "number.{systemid}_start_compressor",
+        SensorType.FanSpeed: "sensor.{systemid}_current_fan_mode",
+        SensorType.HotWaterBoost: "switch.{systemid}_temporary_lux",
+        SensorType.VentilationBoost: "switch.{systemid}_increased_ventilation",
+    }
 
     def _servicecall_types(self):
         return {
@@ -20,55 +34,13 @@ class Nibe(HvacType):
             HvacOperations.WaterBoost: self.get_sensor(SensorType.HotWaterBoost),
         }
 
-    def get_sensor(self, sensor: SensorType = None):
-        types = {
-            SensorType.HvacMode: f"sensor.{self.hub.options.systemid}_priority",
-            SensorType.Offset: f"number.{self.hub.options.systemid}_heating_offset_climate_system_1",
-            SensorType.DegreeMinutes: f"number.{self.hub.options.systemid}_current_value",
-            SensorType.WaterTemp: f"sensor.{self.hub.options.systemid}_hot_water_charging_bt6",
-            SensorType.HvacTemp: f"sensor.{self.hub.options.systemid}_supply_line_bt2",
-            SensorType.HotWaterReturn: f"sensor.{self.hub.options.systemid}_return_line_bt3",
-            SensorType.ElectricalAddition: f"sensor.{self.hub.options.systemid}_int_elec_add_heat",
-            SensorType.CompressorFrequency: f"sensor.{self.hub.options.systemid}_current_compressor_frequency",
-            SensorType.DMCompressorStart: f"number.{self.hub.options.systemid}_start_compressor",
-            SensorType.FanSpeed: f"sensor.{self.hub.options.systemid}_current_fan_mode",
-            SensorType.HotWaterBoost: f"switch.{self.hub.options.systemid}_temporary_lux",
-            SensorType.VentilationBoost: f"switch.{self.hub.options.systemid}_increased_ventilation",
-        }
-        return (
-            types.get(sensor, None)
-            if sensor is not None
-            else self._get_sensors_for_callback(types)
-        )
-
     @property
     def fan_speed(self) -> float:
-        try:
-            speed = self.get_sensor(SensorType.FanSpeed)
-            return float(self._handle_sensor(speed))
-        except Exception as e:
-            if "unavailable" not in str(e):
-                _LOGGER.exception(e)
-            return 0
+        return self.snapshot.fan_speed
 
     @property
     def delta_return_temp(self):
-        try:
-            temp = self.get_sensor(SensorType.HvacTemp)
-            returntemp = self.get_sensor(SensorType.HotWaterReturn)
-            
-            # Handle None values
-            temp_value = self._handle_sensor(temp)
-            returntemp_value = self._handle_sensor(returntemp)
-            
-            # Check for None values
-            if temp_value is None or returntemp_value is None:
-                return 0
-            
-            return round(float(temp_value) - float(returntemp_value), 2)
-        except Exception as e:
-            _LOGGER.debug(f"Unable to calculate delta return: {e}")
-            return 0
+        return self.snapshot.delta_return_temp
 
     def _set_servicecall_params(self, operation, _value):
         ret = {"entity_id": self._servicecall_types()[operation]}
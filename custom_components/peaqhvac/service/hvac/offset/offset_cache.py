@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from datetime import datetime
+
+from custom_components.peaqhvac.service.models.enums.hvac_presets import HvacPresets
+
+OFFSET_CACHE_SIZE = 16
+
+
+def offset_fingerprint(
+        prices: list[float],
+        prices_tomorrow: list[float],
+        min_price: float,
+        tolerance: int | None,
+        preset: HvacPresets | None,
+        weather_adjusted_today: dict | None,
+        dt: datetime,
+) -> tuple:
+    """Everything a calculated offset dict depends on. The reference time only matters to the hour."""
+    return (
+        tuple(prices),
+        tuple(prices_tomorrow),
+        min_price,
+        tolerance,
+        preset,
+        tuple(weather_adjusted_today.items()) if weather_adjusted_today is not None else None,
+        dt.replace(minute=0, second=0, microsecond=0),
+    )
+
+
+class OffsetCache:
+    """Least recently used offset dicts per input fingerprint, so recalculations with unchanged inputs are free."""
+    def __init__(self, maxsize: int = OFFSET_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._items: OrderedDict[tuple, dict] = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def get(self, key: tuple) -> dict | None:
+        ret = self._items.get(key)
+        if ret is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._items.move_to_end(key)
+        return dict(ret)
+
+    def put(self, key: tuple, value: dict) -> None:
+        self._items[key] = dict(value)
+        self._items.move_to_end(key)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    def as_dict(self) -> dict:
+        return {"size": len(self._items), "hits": self.hits, "misses": self.misses}
@@ -1,18 +1,25 @@
 import logging
 from abc import abstractmethod
-from datetime import datetime, timedelta
+from datetime import datetime
 from peaqevcore.common.models.observer_types import ObserverTypes
 from peaqevcore.services.hourselection.hoursselection import Hoursselection
+from custom_components.peaqhvac.service.hvac.offset.offset_cache import OffsetCache, offset_fingerprint
 from custom_components.peaqhvac.service.hvac.offset.offset_utils import (
     max_price_lower_internal, offset_per_day, set_offset_dict)
 from custom_components.peaqhvac.service.hvac.offset.peakfinder import (
     identify_peaks, smooth_transitions)
 from custom_components.peaqhvac.service.models.offset_model import OffsetModel
+from custom_components.peaqhvac.service.models.price_stats import PriceStats
+from custom_components.peaqhvac.service.models.tick_snapshot import TickSnapshot
 from custom_components.peaqhvac.service.observer.iobserver_coordinator import IObserver
-from homeassistant.helpers.event import async_track_time_interval
+from custom_components.peaqhvac.service.observer.models.dispatch_policy import DispatchPolicy
 
 _LOGGER = logging.getLogger(__name__)
 
+# preset, set-temperature, prognosis and tolerance changes tend to arrive together
+RECALCULATION_POLICY = DispatchPolicy(debounce=1)
+BOUNDARY_TASK = "current_offset_boundary"
+
 class OffsetCoordinator:
     """The class that provides the offsets for the hvac"""
     def __init__(self, hub, observer: IObserver, hours_type: Hoursselection = None): #type: ignore
@@ -22,17 +29,16 @@ class OffsetCoordinator:
         self.hours = hours_type
         self._current_raw_offset: int|None = None
         self.latest_raw_offset_update_hour: int = -1
+        self.cache = OffsetCache()
+        self.price_stats: PriceStats = PriceStats([])
         self._initialize_observers()
-        async_track_time_interval(
-            self._hub.state_machine, self.async_create_current_raw_offset, timedelta(seconds=20)
-        )
         #self.async_create_current_raw_offset()
 
     def _initialize_observers(self):
-        self.observer.add(ObserverTypes.PrognosisChanged, self.async_update_prognosis)
-        self.observer.add(ObserverTypes.HvacPresetChanged, self.async_set_offset)
-        self.observer.add(ObserverTypes.SetTemperatureChanged, self.async_set_offset)
-        self.observer.add("ObserverTypes.OffsetPreRecalculation", self.async_set_offset)
+        self.observer.add(ObserverTypes.PrognosisChanged, self.async_set_offset, policy=RECALCULATION_POLICY)
+        self.observer.add(ObserverTypes.HvacPresetChanged, self.async_set_offset, policy=RECALCULATION_POLICY)
+        self.observer.add(ObserverTypes.SetTemperatureChanged, self.async_set_offset, policy=RECALCULATION_POLICY)
+        self.observer.add("ObserverTypes.OffsetPreRecalculation", self.async_set_offset, policy=RECALCULATION_POLICY)
 
     @property
     @abstractmethod
@@ -49,6 +55,16 @@ class OffsetCoordinator:
     def min_price(self) -> float:
         pass
 
+    @property
+    def price_series(self) -> PriceStats:
+        if not self.price_stats.matches((self.prices or []) + (self.prices_tomorrow or [])):
+            self.update_price_stats()
+        return self.price_stats
+
+    def update_price_stats(self) -> None:
+        """Called when the prices change, the statistics are then shared read-only until the next change."""
+        self.price_stats = PriceStats.from_days(self.prices or [], self.prices_tomorrow or [], datetime.now())
+
     @property
     def current_offset(self) -> int|None:
         return self._current_raw_offset
@@ -59,41 +75,61 @@ class OffsetCoordinator:
             _LOGGER.debug(f"current_raw_offset updated to {self._current_raw_offset}")
             await self.observer.async_broadcast(ObserverTypes.OffsetRecalculation, val)
 
-    async def async_create_current_raw_offset(self, *args) -> None:
-        ret = 0
-        initialized = False
-        try:
-            if self.model.raw_offsets:
-                latest_key = max((key for key in self.model.raw_offsets if key <= datetime.now()), default=None)
-                if latest_key is not None:
-                    ret = self.model.raw_offsets[latest_key]
-                    initialized = True
-        except KeyError as e:
-            _LOGGER.error(f"Unable to get current offset: {e}. raw_offsets: {self.model.raw_offsets}")
-        finally:
-            if self.current_offset is not None or initialized:
-                if self.current_offset != ret:
-                   await self.async_set_offset()
-                await self.async_update_raw_offset(ret)
-
-    async def async_update_prognosis(self) -> None:
-        self.model.prognosis = self._hub.prognosis.prognosis
-        await self.async_set_offset()
+    async def async_create_current_raw_offset(self, snapshot: TickSnapshot | None = None) -> None:
+        """Runs at each key of raw_offsets, a new current offset is recalculated before it is applied."""
+        now = snapshot.now if snapshot is not None else datetime.now()
+        ret, initialized = self._raw_offset_at(now)
+        if (self.current_offset is not None or initialized) and self.current_offset != ret:
+            await self.async_set_offset()
+        await self.async_apply_raw_offsets()
+
+    async def async_apply_raw_offsets(self) -> None:
+        self._schedule_next_boundary()
+        ret, initialized = self._raw_offset_at(datetime.now())
+        if self.current_offset is not None or initialized:
+            await self.async_update_raw_offset(ret)
+
+    def _raw_offset_at(self, dt: datetime) -> tuple[int, bool]:
+        ret = self.model.raw_timeline.value_at(dt)
+        return (0, False) if ret is None else (ret, True)
+
+    def _schedule_next_boundary(self) -> None:
+        """One wakeup at the next key of raw_offsets, nothing changes in between."""
+        next_key = self.model.raw_timeline.next_key(datetime.now())
+        if next_key is None:
+            self._hub.scheduler.cancel(BOUNDARY_TASK)
+            return
+        self._hub.scheduler.call_at(BOUNDARY_TASK, next_key, self.async_create_current_raw_offset)
 
     def max_price_lower(self, tempdiff: float) -> bool:
-        return max_price_lower_internal(tempdiff, self.model.peaks_today)
+        return max_price_lower_internal(tempdiff, self.model.peaks_today, self.model.price_interval)
 
     async def async_update_offset(self, weather_adjusted_today: dict | None = None) -> dict:
         try:
-            all_values = await set_offset_dict(self.prices + self.prices_tomorrow, datetime.now(), self.min_price, {})
+            now = datetime.now()
+            key = offset_fingerprint(
+                self.prices,
+                self.prices_tomorrow,
+                self.min_price,
+                self.model.tolerance,
+                self._hub.sensors.set_temp_indoors.preset,
+                weather_adjusted_today,
+                now,
+            )
+            ret = self.cache.get(key)
+            if ret is not None:
+                return ret
+            series = self.price_series
+            all_values = await set_offset_dict(
+                list(series.prices), now, self.min_price, {}, interval=series.interval, stats=series
+            )
             offsets_per_day = await self.async_calculate_offset_per_day(all_values, weather_adjusted_today)
-            tolerance = self.model.tolerance if self.model.tolerance is not None else 3
-            for k, v in offsets_per_day.items():
-                if v > tolerance:
-                    offsets_per_day[k] = tolerance
-                elif v < -tolerance:
-                    offsets_per_day[k] = -tolerance
-            return smooth_transitions(vals=offsets_per_day, tolerance=tolerance)
+            ramp = self._hub.options.heating.offset_ramp_limit or None
+            ret = smooth_transitions(
+                vals=offsets_per_day, tolerance=self.model.tolerance, ramp_up=ramp, ramp_down=ramp
+            )
+            self.cache.put(key, ret)
+            return ret
         except Exception as e:
             _LOGGER.exception(f"Exception while trying to calculate offset: {e}")
             return {}
@@ -106,11 +142,13 @@ class OffsetCoordinator:
                 day_values=day_values,
                 tolerance=self.model.tolerance,
                 indoors_preset=indoors_preset,
+                stats=self.price_series,
             )
         else:
             return weather_adjusted_today
 
     async def async_set_offset(self) -> None:
+        self.model.prognosis = self._hub.prognosis.prognosis
         if not self.prices:
             if self._hub.is_initialized:
                 _LOGGER.warning(f"Hub is ready but I'm unable to set offset. Prices num: {len(self.prices) if self.prices else 0}")
@@ -121,6 +159,7 @@ class OffsetCoordinator:
             await self.async_set_offset_weather()
         else:
             _LOGGER.debug("No prognosis available, setting normal calculation.")
+        await self.async_apply_raw_offsets()
 
     async def async_set_offset_weather(self) -> None:
         try:
@@ -131,9 +170,12 @@ class OffsetCoordinator:
             _LOGGER.warning(f"Unable to calculate prognosis-offsets. Setting normal calculation: {e}")
 
     async def async_update_model(self) -> None:
-        self.model.peaks_today = identify_peaks(self.prices)
-        self.model.peaks_tomorrow = identify_peaks(self.prices_tomorrow)
+        series = self.price_series
+        self.model.price_interval = series.interval
+        self.model.peaks_today = identify_peaks(self.prices, series.per_hour, series.today)
+        self.model.peaks_tomorrow = identify_peaks(self.prices_tomorrow, series.per_hour, series.tomorrow)
         self.model.raw_offsets = await self.async_update_offset()
+        self._schedule_next_boundary()
 
 
 
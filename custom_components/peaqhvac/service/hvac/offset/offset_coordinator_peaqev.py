@@ -45,5 +45,6 @@ class OffsetCoordinatorPeaqEv(OffsetCoordinator):
             self._prices = prices[0]
         if self._prices_tomorrow != prices[1]:
             self._prices_tomorrow = prices[1]
+        self.update_price_stats()
         await self.async_set_offset()
         await self.async_update_model()
@@ -2,20 +2,35 @@ import logging
 from datetime import datetime, timedelta
 from statistics import mean, stdev
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 from custom_components.peaqhvac.service.hvac.house_heater.models.calculated_offset import CalculatedOffsetModel
 from custom_components.peaqhvac.service.models.enums.hvac_presets import \
     HvacPresets
+from custom_components.peaqhvac.service.models.price_series import PriceSeries
+from custom_components.peaqhvac.service.models.price_stats import PriceStats
 
 _LOGGER = logging.getLogger(__name__)
 
 TODAY = "today"
 TOMORROW = "tomorrow"
 
-def flat_day_lower_tolerance(prices):
+OFFSET_ENGINE_PYTHON = "python"
+OFFSET_ENGINE_NUMPY = "numpy"
+DEFAULT_OFFSET_ENGINE = OFFSET_ENGINE_NUMPY if np is not None else OFFSET_ENGINE_PYTHON
+# Standardized prices have a stdev of 1 up to float rounding, which must not decide whether offsets are halved.
+UNIT_STDEV_TOLERANCE = 1e-9
+
+def flat_day_lower_tolerance(prices, stats: PriceStats | None = None):
     if not len(prices):
         return 0
+    if stats is None:
+        stats = PriceStats(prices)
     try:
-        deviator = (max(prices) - min(prices)) / mean(prices)
+        deviator = (stats.max - stats.min) / stats.mean
         if deviator > 0.95:
             return 0
         if deviator > 0.8:
@@ -32,11 +47,13 @@ def offset_per_day(
         all_prices: list[float],
         tolerance: int | None,
         indoors_preset: HvacPresets = HvacPresets.Normal,
+        stats: PriceStats | None = None,
 ) -> dict:
     ret = {}
     if tolerance is not None:
-        tolerance -= flat_day_lower_tolerance(all_prices)
-        print(f"Flat day lower tolerance: {flat_day_lower_tolerance(all_prices)}")
+        lowered = flat_day_lower_tolerance(all_prices, stats)
+        tolerance -= lowered
+        _LOGGER.debug(f"Flat day lower tolerance: {lowered}")
         for k, v in day_values.items():
             ret[k] = int(round((day_values[k] * tolerance) * -1, 0))
             if indoors_preset is HvacPresets.Away:
@@ -53,12 +70,35 @@ def get_offset_dict(offset_dict, dt_now) -> dict:
     }
 
 
-async def set_offset_dict(prices: list[float], dt: datetime, min_price: float, existing: dict) -> dict:
+async def set_offset_dict(
+        prices: list[float], dt: datetime, min_price: float, existing: dict, engine: str | None = None, interval: int | None = None,
+        stats: PriceStats | None = None
+) -> dict:
+    """
+    engine is OFFSET_ENGINE_PYTHON or OFFSET_ENGINE_NUMPY, both give the same offsets up to the last rounded digit.
+    Defaults to numpy when installed, which is several times faster on quarter-hour prices.
+    interval is the price interval in minutes, taken from the number of prices when not given.
+    stats are the shared statistics of prices, their mean and stdev are used instead of being taken again.
+    """
     dt = dt.replace(minute=0, second=0, microsecond=0)
-    all_offsets = _deviation_from_mean(prices, min_price, dt)
+    match engine or DEFAULT_OFFSET_ENGINE:
+        case "numpy" if np is not None:
+            all_offsets = _deviation_from_mean_numpy(prices, min_price, dt, interval, stats)
+        case "numpy":
+            _LOGGER.debug("NumPy is not installed, calculating offsets in python.")
+            all_offsets = _deviation_from_mean(prices, min_price, dt, interval, stats)
+        case "python":
+            all_offsets = _deviation_from_mean(prices, min_price, dt, interval, stats)
+        case _:
+            raise ValueError(f"Unknown offset engine {engine}")
     return all_offsets
 
 
+def _afternoon_index(delta: int | None) -> int:
+    """Index of the first price from 13:00."""
+    return 13 * (60 // delta) if delta else 13
+
+
 def _get_timedelta(prices: list[float]) -> int:
     _len = len(prices)
     match _len:
@@ -68,30 +108,45 @@ def _get_timedelta(prices: list[float]) -> int:
             return 15
 
 
-def _deviation_from_mean(prices: list[float], min_price: float, dt: datetime) -> dict[datetime, float]:
+def _shifted_mean_stdev(shifted_prices: list[float], shift: float, stats: PriceStats | None) -> tuple[float, float]:
+    """Unshifted prices have the mean and stdev of the shared stats, shifted ones are taken again to stay exact."""
+    if stats is not None and shift == 0:
+        return stats.mean, stats.stdev
+    if len(shifted_prices) < 2:
+        return mean(shifted_prices), 0
+    return mean(shifted_prices), stdev(shifted_prices)
+
+
+def _deviation_from_mean(
+        prices: list[float], min_price: float, dt: datetime, interval: int | None = None, stats: PriceStats | None = None
+) -> dict[datetime, float]:
     if not len(prices):
         return {}
-    delta = _get_timedelta(prices)
+    delta = interval or _get_timedelta(prices)
+    afternoon = _afternoon_index(delta)
     dt_lister = dt.replace(hour=0)
-    min_list_price = min(min(prices),0)
+    min_list_price = min(stats.min if stats is not None else min(prices), 0)
     shifted_prices = [p - min_list_price for p in prices]
-    standardized_prices = [(p - mean(shifted_prices)) / stdev(shifted_prices) for p in shifted_prices]
+    shifted_mean, shifted_stdev = _shifted_mean_stdev(shifted_prices, min_list_price, stats)
+    if not shifted_stdev:
+        return {dt_lister + timedelta(minutes=delta * i): 0 for i in range(len(prices))}
+    standardized_prices = [(p - shifted_mean) / shifted_stdev for p in shifted_prices]
     avg = mean(standardized_prices)
     devi = stdev(standardized_prices)
     avg2 = avg
     devi2 = devi
 
     if dt.hour >= 13:
-        avg2 = mean(standardized_prices[13:])
-        devi2 = stdev(standardized_prices[13:])
+        avg2 = mean(standardized_prices[afternoon:])
+        devi2 = stdev(standardized_prices[afternoon:])
 
     deviation_dict = {}
 
     for i, num in enumerate(standardized_prices):
-        _devi = devi if i < 13 else devi2
-        _avg = avg if i < 13 else avg2
-        deviation = (num - _avg) / _devi
-        if _devi < 1:
+        _devi = devi if i < afternoon else devi2
+        _avg = avg if i < afternoon else avg2
+        deviation = (num - _avg) / _devi if _devi else 0
+        if _devi < 1 - UNIT_STDEV_TOLERANCE:
             deviation *= 0.5
 
         if num <= min_price:
@@ -105,13 +160,63 @@ def _deviation_from_mean(prices: list[float], min_price: float, dt: datetime) ->
     return deviation_dict
 
 
-def max_price_lower_internal(tempdiff: float, peaks_today: list) -> bool:
-    """Temporarily lower to -10 if this hour is a peak for today and temp > set-temp + 0.5C"""
+def _deviation_from_mean_numpy(
+        prices: list[float], min_price: float, dt: datetime, interval: int | None = None, stats: PriceStats | None = None
+) -> dict[datetime, float]:
+    """
+    Same offsets as _deviation_from_mean, taken with np.mean and np.std. These may differ from statistics in the last
+    digit, so an offset on a rounding edge can be 0.01 apart.
+    """
+    if not len(prices):
+        return {}
+    delta = interval or _get_timedelta(prices)
+    afternoon = _afternoon_index(delta)
+    dt_lister = dt.replace(hour=0)
+    min_list_price = min(stats.min if stats is not None else min(prices), 0)
+    shifted_prices = np.asarray(prices, dtype=float) - min_list_price
+    if stats is not None and min_list_price == 0:
+        shifted_mean, shifted_stdev = stats.mean, stats.stdev
+    else:
+        shifted_mean, shifted_stdev = _np_mean_stdev(shifted_prices)
+    if not shifted_stdev:
+        return {dt_lister + timedelta(minutes=delta * i): 0 for i in range(len(prices))}
+    standardized_prices = (shifted_prices - shifted_mean) / shifted_stdev
+    avg, devi = avg2, devi2 = _np_mean_stdev(standardized_prices)
+    if dt.hour >= 13:
+        avg2, devi2 = _np_mean_stdev(standardized_prices[afternoon:])
+
+    before = np.arange(len(prices)) < afternoon
+    _avg = np.where(before, avg, avg2)
+    _devi = np.where(before, devi, devi2)
+    deviation = np.divide(standardized_prices - _avg, _devi, out=np.zeros_like(standardized_prices), where=_devi != 0)
+    deviation = np.where(_devi < 1 - UNIT_STDEV_TOLERANCE, deviation * 0.5, deviation)
+
+    low = standardized_prices <= min_price
+    near_low = ~low & (standardized_prices <= min_price * 2) & (deviation > 1)
+    deviation = np.round(np.where(near_low, deviation - 1, deviation), 2)
+    deviation = np.where(low, np.minimum(deviation, 0), deviation)
+    return {dt_lister + timedelta(minutes=delta * i): value for i, value in enumerate(deviation.tolist())}
+
+
+def _np_mean_stdev(values) -> tuple[float, float]:
+    """Mean and sample stdev. Equal values have no spread, np.std would give float noise for them."""
+    if len(values) < 2 or not np.ptp(values):
+        return float(np.mean(values)), 0.0
+    return float(np.mean(values)), float(np.std(values, ddof=1))
+
+
+def max_price_lower_internal(tempdiff: float, peaks_today: list, interval: int = 60) -> bool:
+    """
+    Temporarily lower to -10 if this price interval is a peak for today and temp > set-temp + 0.5C.
+    The last sixth of an interval looks ahead to the next one, the last ten minutes of an hour.
+    """
     if tempdiff >= 0.5:
-        if datetime.now().hour in peaks_today:
+        now = datetime.now()
+        idx = PriceSeries([], interval).index_of(now)
+        if idx in peaks_today:
             return True
-        elif datetime.now().hour < 23 and datetime.now().minute > 50:
-            if datetime.now().hour + 1 in peaks_today:
+        elif idx < 24 * 60 // interval - 1 and now.minute % interval > interval - interval // 6:
+            if idx + 1 in peaks_today:
                 return True
     return False
 
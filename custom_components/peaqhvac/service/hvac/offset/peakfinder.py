@@ -1,46 +1,72 @@
-import statistics
-from datetime import timedelta
+import math
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
 import logging
 
+from custom_components.peaqhvac.service.models.price_stats import PriceStats
+
 _LOGGER = logging.getLogger(__name__)
 
 
-def identify_peaks(prices: list) -> list[int]:
-    ret = []
+@dataclass
+class PriceExtremes:
+    """
+    Peak, valley and single valley indexes of a price list. With shape, every peak also gets the width of the plateau
+    of equal prices it lies on, and its prominence: how far it rises above the higher of the lowest prices between it
+    and the nearest higher price on either side.
+    """
+    peaks: list[int] = field(default_factory=list)
+    valleys: list[int] = field(default_factory=list)
+    single_valleys: list[int] = field(default_factory=list)
+    peak_widths: dict[int, int] = field(default_factory=dict)
+    peak_prominence: dict[int, float] = field(default_factory=dict)
+
+
+def find_extremes(prices: list, step: int = 1, shape: bool = False, stats: PriceStats | None = None) -> PriceExtremes:
+    """
+    One pass over the prices with the mean, max and min taken once, or taken from the shared stats of the prices.
+    step is the distance to the neighbours compared with, one hour of intervals keeps quarter-hour plateaus apart.
+    """
+    ret = PriceExtremes()
+    if not len(prices):
+        return ret
+    count = len(prices)
+    if stats is None:
+        stats = PriceStats(prices)
+    avg, highest, lowest = stats.mean, stats.max, stats.min
     for idx, p in enumerate(prices):
-        if p < statistics.mean(prices):
-            continue
-        if idx == 0 or idx == len(prices) - 1:
-            if p == max(prices):
-                ret.append(idx)
+        if idx < step or idx >= count - step:
+            is_peak = p == highest
+            is_valley = p == lowest
         else:
-            if all(
-                    [
-                        _check_deviation_peaks(p, prices[idx - 1]),
-                        _check_deviation_peaks(p, prices[idx + 1]),
-                    ]
-            ):
-                ret.append(idx)
+            before, after = prices[idx - step], prices[idx + step]
+            is_peak = _check_deviation_peaks(p, before) and _check_deviation_peaks(p, after)
+            is_valley = _check_deviation_valleys(p, before) and _check_deviation_valleys(p, after)
+            if step < idx < count - 1 - step and _is_single_valley(p, before, after):
+                ret.single_valleys.append(idx)
+        if is_peak and p >= avg:
+            ret.peaks.append(idx)
+        if is_valley and p <= avg:
+            ret.valleys.append(idx)
+    if shape and ret.peaks:
+        ret.peak_widths = {idx: _plateau_width(prices, idx) for idx in ret.peaks}
+        left = _bases(prices)
+        right = _bases(prices[::-1])[::-1]
+        ret.peak_prominence = {idx: prices[idx] - max(left[idx], right[idx]) for idx in ret.peaks}
     return ret
 
 
-def identify_valleys(prices: list) -> list[int]:
-    ret = []
-    for idx, p in enumerate(prices):
-        if p > statistics.mean(prices):
-            continue
-        if idx == 0 or idx == len(prices) - 1:
-            if p == min(prices):
-                ret.append(idx)
-        else:
-            if all(
-                    [
-                        _check_deviation_valleys(p, prices[idx - 1]),
-                        _check_deviation_valleys(p, prices[idx + 1]),
-                    ]
-            ):
-                ret.append(idx)
-    return ret
+def identify_peaks(prices: list, step: int = 1, stats: PriceStats | None = None) -> list[int]:
+    return find_extremes(prices, step, stats=stats).peaks
+
+
+def identify_valleys(prices: list, step: int = 1) -> list[int]:
+    return find_extremes(prices, step).valleys
+
+
+def find_single_valleys(prices: list, step: int = 1) -> list[int]:
+    return find_extremes(prices, step).single_valleys
 
 
 def _check_deviation_peaks(p: float, neighbor: float) -> bool:
@@ -61,64 +87,110 @@ def _check_deviation_valleys(p: float, neighbor: float) -> bool:
     return False
 
 
-def find_single_valleys(prices: list) -> list[int]:
+def _is_single_valley(p: float, before: float, after: float) -> bool:
+    return p < before and p < after and min(before, after) / max(before, after) > 0.8
+
+
+def _plateau_width(prices: list, idx: int) -> int:
+    start = end = idx
+    while start > 0 and prices[start - 1] == prices[idx]:
+        start -= 1
+    while end < len(prices) - 1 and prices[end + 1] == prices[idx]:
+        end += 1
+    return end - start + 1
+
+
+def _bases(prices: list) -> list[float]:
+    """
+    Per index, the lowest price between it and the nearest higher price before it (or the start).
+    A stack of the prices not yet passed, each with the lowest price since the one below it, keeps this linear.
+    """
     ret = []
-    for idx, p in enumerate(prices):
-        if idx <= 1 or idx >= len(prices) - 2:
-            pass
-        else:
-            if all(
-                    [
-                        prices[idx] < prices[idx - 1],
-                        prices[idx] < prices[idx + 1],
-                        min(prices[idx - 1], prices[idx + 1])
-                        / max(prices[idx - 1], prices[idx + 1])
-                        > 0.8,
-                    ]
-            ):
-                ret.append(idx)
+    stack: list[tuple[float, float]] = []
+    for p in prices:
+        lowest = p
+        while stack and stack[-1][0] <= p:
+            lowest = min(lowest, stack.pop()[1])
+        ret.append(lowest)
+        stack.append((p, lowest))
+    return ret
+
+
+RAMP_WINDOW = timedelta(hours=1)
+
+
+def _find_single_anomalies(keys: list[datetime], values: list[int]) -> list[int]:
+    """
+    A run of equal offsets of at most an hour, with the same offset right before and after it, is moved halfway back
+    to that offset. One pass over the runs, so single hours and quarter-hour blips are treated alike.
+    """
+    ret = list(values)
+    step = min(b - a for a, b in zip(keys, keys[1:]))
+    runs = []
+    start = 0
+    for idx in range(1, len(values) + 1):
+        if idx == len(values) or values[idx] != values[start] or keys[idx] - keys[idx - 1] > step:
+            runs.append((start, idx))
+            start = idx
+    for start, end in runs[1:-1]:
+        prev, curr = values[start - 1], values[start]
+        if any([
+            values[end] != prev,
+            keys[start] - keys[start - 1] > step,
+            keys[end] - keys[end - 1] > step,
+            keys[end] - keys[start] > RAMP_WINDOW,
+        ]):
+            continue
+        diff = int(abs(prev - curr) / 2)
+        for idx in range(start, end):
+            ret[idx] = curr + diff if prev > curr else curr - diff
+    return ret
+
+
+def _limit_ramps(keys: list[datetime], values: list[int], ramp_up: int | None, ramp_down: int | None) -> list[int]:
+    """
+    One pass from the end, moving each offset towards the offsets of the hour after it, so that within any hour the
+    offset rises at most ramp_up and falls at most ramp_down, a limit of None leaves that direction alone. Earlier
+    offsets are the ones changed, which starts a rise ahead of cheap prices and a fall ahead of expensive ones.
+    Sliding window max and min keep it linear.
+    """
+    ramp_up = math.inf if ramp_up is None else ramp_up
+    ramp_down = math.inf if ramp_down is None else ramp_down
+    ret = list(values)
+    highest: deque[int] = deque()
+    lowest: deque[int] = deque()
+    for idx in range(len(ret) - 2, -1, -1):
+        nxt = idx + 1
+        while highest and ret[highest[0]] <= ret[nxt]:
+            highest.popleft()
+        highest.appendleft(nxt)
+        while lowest and ret[lowest[0]] >= ret[nxt]:
+            lowest.popleft()
+        lowest.appendleft(nxt)
+        for window in (highest, lowest):
+            while window and keys[window[-1]] - keys[idx] > RAMP_WINDOW:
+                window.pop()
+        if not highest:
+            continue
+        ret[idx] = min(max(ret[idx], ret[highest[-1]] - ramp_up), ret[lowest[-1]] + ramp_down)
     return ret
 
 
-# def _find_single_anomalies(adj: list) -> list[int]:
-#     for idx, p in enumerate(adj):
-#         if idx <= 1 or idx >= len(adj) - 1:
-#             pass
-#         else:
-#             if all([adj[idx - 1] == adj[idx + 1], adj[idx - 1] != adj[idx]]):
-#                 _prev = adj[idx - 1]
-#                 _curr = adj[idx]
-#                 diff = max(_prev, _curr) - min(_prev, _curr)
-#                 if int(diff / 2) > 0:
-#                     if _prev > _curr:
-#                         adj[idx] += int(diff / 2)
-#                     else:
-#                         adj[idx] -= int(diff / 2)
-#     return adj
-
-def _find_single_anomalies(adj: dict) -> dict:
-    return adj
-    # for k, v in adj.items():
-    #     if all([k+timedelta(hours=-1) in adj.items, k+timedelta(hours=+1) in adj.items]):
-
-
-def _smooth_upwards_transitions(start_list: dict, tolerance):
-    for k, v in start_list.items():
-        if k + timedelta(hours=+1) in start_list.items():
-            if start_list[k + timedelta(hours=1)] >= start_list[k] + tolerance:
-                start_list[k] += 1
-    return start_list
-
-
-def smooth_transitions(vals: dict, tolerance: int) -> dict:
-    if tolerance is not None:
-        tolerance = min(tolerance, 3)
-    else:
-        tolerance = 3
-
-    ret = _find_single_anomalies(vals)
-    ret = _smooth_upwards_transitions(ret, tolerance)
+def smooth_transitions(vals: dict, tolerance: int, ramp_up: int | None = None, ramp_down: int | None = None) -> dict:
+    """
+    Clamps the offsets to the tolerance, removes short anomalies and, when ramp_up or ramp_down is given, limits how
+    fast the offset may change, per hour for both hourly and quarter-hour offsets. Without them the offsets change as
+    fast as the prices do.
+    """
+    tolerance = tolerance if tolerance is not None else 3
+    if len(vals) < 2:
+        return {k: max(min(v, tolerance), -tolerance) for k, v in vals.items()}
+    keys = sorted(vals)
+    values = _find_single_anomalies(keys, [max(min(vals[k], tolerance), -tolerance) for k in keys])
+    if ramp_up is not None or ramp_down is not None:
+        values = _limit_ramps(keys, values, ramp_up, ramp_down)
+    ret = dict(zip(keys, values))
 
     if any([h for h in ret.values() if abs(h) > 10]):
-        _LOGGER.warning("Offset values are out of range", ret, vals)
+        _LOGGER.warning(f"Offset values are out of range: {ret}, from {vals}")
     return ret
@@ -2,3 +2,6 @@
 WAITTIMER_TIMEOUT = 1800
 LOWTEMP_THRESHOLD = 30
 HIGHTEMP_THRESHOLD = 40
+COOLING_STORAGE_KEY = "peaqhvac.tank_cooling"
+COOLING_STORAGE_VERSION = 1
+COOLING_SAVE_DELAY = 300
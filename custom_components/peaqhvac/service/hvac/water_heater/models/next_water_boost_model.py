@@ -1,9 +1,9 @@
 from datetime import datetime, timedelta
-from statistics import mean
 
 from custom_components.peaqhvac.service.hvac.water_heater.models.water_boost_data import WaterBoostData
 from custom_components.peaqhvac.service.models.enums.demand import Demand
 from custom_components.peaqhvac.service.models.enums.hvac_presets import HvacPresets
+from custom_components.peaqhvac.service.models.price_stats import PriceStats
 
 HOUR_LIMIT = 18
 DELAY_LIMIT = 48
@@ -52,6 +52,7 @@ def get_demand(temp) -> Demand:
 class NextWaterBoostModel:
     def __init__(self, data: WaterBoostData):
         self.data = data
+        self.stats: PriceStats = PriceStats([])
 
     @property
     def cold_limit(self) -> datetime:
@@ -80,8 +81,10 @@ class NextWaterBoostModel:
         return self.data.now_dt.replace(second=0, microsecond=0) if self.data.now_dt else None
 
     def _create_price_dict(self, prices) -> dict:
-        startofday = self.now_dt.replace(hour=0, minute=0)
-        return {startofday + timedelta(hours=i): prices[i] for i in range(0, len(prices))}
+        start = self.now_dt.replace(hour=0, minute=0)
+        if not (self.stats.matches(prices) and self.stats.start == start):
+            self.stats = PriceStats(prices, start=start)
+        return {self.stats.time_at(i): p for i, p in enumerate(self.stats.prices)}
 
     def update(self, temp, temp_trend, target_temp, prices_today: list, prices_tomorrow: list, preset: HvacPresets,
                now_dt=None, latest_boost: datetime = None) -> None:
@@ -134,4 +137,7 @@ class NextWaterBoostModel:
         self.data.now_dt = now_dt or datetime.now()
 
     def set_floating_mean(self) -> None:
-        self.data.floating_mean = mean([v for k, v in self.data.price_dict.items() if k >= self.now_dt]) * 0.9
\ No newline at end of file
+        idx = self.stats.index_of(self.now_dt)
+        if self.stats.time_at(idx) < self.now_dt:
+            idx += 1
+        self.data.floating_mean = self.stats.mean_from(idx) * 0.9
\ No newline at end of file
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+from datetime import datetime
+import statistics
+
+COOLING_ALPHA = 0.2
+MIN_SPAN = 600
+MAX_SPAN = 3 * 3600
+MIN_SAMPLES = 3
+MAX_COOLING_RATE = 20
+
+
+class TankCoolingModel:
+    """
+    How fast the water tank cools in each hour of the day, in degrees per hour, standing losses and draw-off together.
+    Fitted incrementally from the water temperature: every fall over at least MIN_SPAN seconds is one sample for the
+    hour in the middle of it, weighted into that hour by an exponential moving average. A rise is a boost and starts
+    over, as do gaps longer than MAX_SPAN. Readings at or below zero are an unavailable sensor and are skipped, and a
+    fall faster than MAX_COOLING_RATE degrees per hour is an outlier and starts over without being learned.
+    """
+    def __init__(self):
+        self.rates: list[float | None] = [None] * 24
+        self.samples: list[int] = [0] * 24
+        self._anchor: tuple[float, float] | None = None
+
+    def add_reading(self, temp: float, timestamp: float) -> bool:
+        """Returns True when the reading taught the model something."""
+        if temp <= 0:
+            return False
+        if self._anchor is None or timestamp <= self._anchor[1] or temp > self._anchor[0]:
+            self._anchor = (temp, timestamp)
+            return False
+        anchor_temp, anchor_time = self._anchor
+        span = timestamp - anchor_time
+        if span < MIN_SPAN:
+            return False
+        self._anchor = (temp, timestamp)
+        if span > MAX_SPAN:
+            return False
+        rate = (anchor_temp - temp) / (span / 3600)
+        if rate > MAX_COOLING_RATE:
+            return False
+        hour = datetime.fromtimestamp(anchor_time + span / 2).hour
+        current = self.rates[hour]
+        self.rates[hour] = rate if current is None else current + COOLING_ALPHA * (rate - current)
+        self.samples[hour] += 1
+        return True
+
+    @property
+    def standing_loss(self) -> float | None:
+        """The slowest learned cooling, the hours without draw-off."""
+        learned = self._learned()
+        return min(learned.values()) if learned else None
+
+    def forecast(self) -> tuple[float, ...] | None:
+        """Cooling per hour of the day, hours with too few samples at the mean of the learned ones."""
+        learned = self._learned()
+        if not learned:
+            return None
+        fallback = statistics.mean(learned.values())
+        return tuple(round(learned.get(hour, fallback), 3) for hour in range(24))
+
+    def _learned(self) -> dict[int, float]:
+        return {h: r for h, r in enumerate(self.rates) if r is not None and self.samples[h] >= MIN_SAMPLES}
+
+    def as_dict(self) -> dict:
+        return {"rates": list(self.rates), "samples": list(self.samples)}
+
+    def load(self, data: dict) -> None:
+        rates, samples = data.get("rates", []), data.get("samples", [])
+        if len(rates) == len(samples) == 24:
+            self.rates = list(rates)
+            self.samples = list(samples)
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from dataclasses import replace
+from datetime import datetime
+
+from custom_components.peaqhvac.service.hvac.water_heater.water_heater_next_start import (
+    NextStartExportModel, NextStartPostModel)
+
+
+def next_start_fingerprint(model: NextStartPostModel) -> tuple:
+    """
+    Everything a planned start depends on. The planners project the water temperature from the exact reference
+    time, so it is part of the key as it is. The coordinator plans from the start of the minute, which lets the
+    calls within the same minute share a plan.
+    """
+    series = model.series
+    return (
+        series.prices,
+        series.interval,
+        tuple(model.demand_hours),
+        tuple(model.non_hours),
+        model.current_temp,
+        model.temp_trend,
+        model.cooling,
+        model.min_price,
+        model.hvac_preset,
+        model.latest_boost,
+        model.dt,
+    )
+
+
+class NextStartCache:
+    """The latest planned start and the fingerprint it was planned from. It is kept until the start has passed."""
+    def __init__(self):
+        self._key: tuple | None = None
+        self._value: NextStartExportModel | None = None
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def get(self, key: tuple, now: datetime) -> NextStartExportModel | None:
+        if self._value is None or key != self._key or self._value.next_start <= now:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return replace(self._value)
+
+    def put(self, key: tuple, value: NextStartExportModel) -> None:
+        self._key = key
+        self._value = replace(value)
+
+    def clear(self) -> None:
+        self._key = None
+        self._value = None
+
+    def as_dict(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "next_start": self._value.next_start.isoformat() if self._value is not None else None,
+        }
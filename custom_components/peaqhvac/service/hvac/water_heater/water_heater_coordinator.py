@@ -7,6 +7,7 @@ import logging
 import time
 from datetime import datetime, timedelta
 
+from homeassistant.helpers.storage import Store
 from peaqevcore.common.models.observer_types import ObserverTypes
 from peaqevcore.common.trend import Gradient
 
@@ -14,12 +15,16 @@ from custom_components.peaqhvac.service.hvac.const import DEFAULT_WATER_BOOST, W
 from custom_components.peaqhvac.service.hvac.interfaces.iheater import IHeater
 from peaqevcore.common.wait_timer import WaitTimer
 from custom_components.peaqhvac.service.hvac.water_heater.const import *
-from custom_components.peaqhvac.service.hvac.water_heater.water_heater_next_start import NextWaterBoost, \
-    NextStartPostModel
+from custom_components.peaqhvac.service.hvac.water_heater.models.tank_cooling_model import TankCoolingModel
+from custom_components.peaqhvac.service.hvac.water_heater.next_start_cache import NextStartCache, next_start_fingerprint
+from custom_components.peaqhvac.service.hvac.water_heater.water_heater_next_start import NextStartPostModel
+from custom_components.peaqhvac.service.hvac.water_heater.water_heater_optimal_start import create_water_planner
 from custom_components.peaqhvac.service.models.enums.demand import Demand
+from custom_components.peaqhvac.service.models.enums.sensortypes import SensorType
 from custom_components.peaqhvac.service.models.enums.hvac_presets import \
     HvacPresets
-from homeassistant.helpers.event import async_track_time_interval
+from custom_components.peaqhvac.service.models.price_series import interval_minutes
+from custom_components.peaqhvac.service.models.tick_snapshot import TickSnapshot
 from custom_components.peaqhvac.service.hvac.water_heater.models.waterbooster_model import \
     WaterBoosterModel
 
@@ -43,13 +48,22 @@ class WaterHeater(IHeater):
             max_age=900, max_samples=5, precision=2, ignore=0, outlier=20
         )
         self.model = WaterBoosterModel(self.hub.state_machine)
-        self.next = NextWaterBoost()
+        self.next = create_water_planner(self._options.heating.water_planner)
+        self.next_start_cache = NextStartCache()
+        self.cooling = TankCoolingModel()
+        self._cooling_store = Store(self.hub.state_machine, COOLING_STORAGE_VERSION, COOLING_STORAGE_KEY)
         self.observer.add(ObserverTypes.OffsetsChanged, self.async_update_operation)
         self.observer.add("water boost done", self.async_reset_water_boost)
-        async_track_time_interval(
-            self.hub.state_machine, self.async_update_operation, timedelta(seconds=30)
+        self.hub.scheduler.register(
+            "water_heater", self.async_update_operation, period=30, after=("hvac_temperature",)
         )
 
+    async def async_setup(self) -> None:
+        """Loads the learned tank cooling, so the planner does not start from the default trend after a restart."""
+        data = await self._cooling_store.async_load()
+        if data:
+            self.cooling.load(data)
+
     @property
     def is_initialized(self) -> bool:
         return self._current_temp is not None and self._is_initialized
@@ -88,6 +102,8 @@ class WaterHeater(IHeater):
         floatval = float(val)
         try:
             self._check_and_add_trend_reading(floatval)
+            if not self.hub.hvac.is_stale(SensorType.WaterTemp) and self.cooling.add_reading(floatval, time.time()):
+                self._cooling_store.async_delay_save(self.cooling.as_dict, COOLING_SAVE_DELAY)
             if self._current_temp != floatval:
                 self._current_temp = floatval
                 old_demand = self.demand.value
@@ -129,7 +145,7 @@ class WaterHeater(IHeater):
             self.model.bus_fire_once("peaqhvac.water_heater_warning", {"new": True}, next_start)
         return next_start
 
-    def _get_next_start(self) -> int | None:
+    def _get_next_start(self, snapshot: TickSnapshot | None = None) -> int | None:
         if not self.is_initialized or not self.control_module:
             return None
         if self.water_heating:
@@ -137,18 +153,27 @@ class WaterHeater(IHeater):
             self.model.next_water_heater_start = datetime.max
             return None
 
+        now = snapshot.now if snapshot is not None else datetime.now()
+        stats = snapshot.prices if snapshot is not None and snapshot.prices is not None else self.hub.offset.price_series
         model = NextStartPostModel(
             prices=self.hub.spotprice.model.prices + self.hub.spotprice.model.prices_tomorrow,
+            interval=interval_minutes(len(self.hub.spotprice.model.prices)),
             non_hours=self._options.heating.non_hours_water_boost,
             demand_hours=self._options.heating.demand_hours_water_boost,
             current_temp=self.current_temperature,
-            dt=datetime.now(),
+            dt=now.replace(second=0, microsecond=0),
             temp_trend=self.temp_trend.gradient_raw,
             latest_boost=datetime.fromtimestamp(self.model.latest_boost_call),
             min_price=self._sensors.peaqev_facade.min_price,
             hvac_preset=self._sensors.set_temp_indoors.preset,
+            stats=stats,
+            cooling=self.cooling.forecast(),
         )
-        ret = self.next.get_next_start(model)
+        key = next_start_fingerprint(model)
+        ret = self.next_start_cache.get(key, model.dt)
+        if ret is None:
+            ret = self.next.get_next_start(model)
+            self.next_start_cache.put(key, ret)
 
         if ret.next_start < datetime.now() + timedelta(days=-100):
             ret.next_start = datetime.max
@@ -165,17 +190,18 @@ class WaterHeater(IHeater):
             _LOGGER.debug("Water boost has been on for more than an hour. Turning off.")
             self.model.water_boost.value = False
 
-    async def async_update_operation(self, caller=None):
+    async def async_update_operation(self, snapshot: TickSnapshot | None = None):
+        """snapshot is given on scheduler ticks, the next start is then planned from its time and prices."""
         self._check_and_reset_boost()
         if self.is_initialized:
             if self._sensors.set_temp_indoors.preset != HvacPresets.Away:
-                await self.async_set_water_heater_operation(HIGHTEMP_THRESHOLD)
+                await self.async_set_water_heater_operation(HIGHTEMP_THRESHOLD, snapshot)
             elif self._sensors.set_temp_indoors.preset == HvacPresets.Away:
-                await self.async_set_water_heater_operation(LOWTEMP_THRESHOLD)
+                await self.async_set_water_heater_operation(LOWTEMP_THRESHOLD, snapshot)
 
-    async def async_set_water_heater_operation(self, target_temp: int) -> None:
+    async def async_set_water_heater_operation(self, target_temp: int, snapshot: TickSnapshot | None = None) -> None:
         if self.is_initialized:
-            target_temp = self._get_next_start()
+            target_temp = self._get_next_start(snapshot)
         try:
             if target_temp:
                 await self.async_set_toggle_boost_next_start(self.model.next_water_heater_start, target_temp)
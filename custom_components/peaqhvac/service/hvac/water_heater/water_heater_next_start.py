@@ -1,7 +1,12 @@
+import statistics
+from collections import deque
 from datetime import datetime, timedelta
 import logging
+from typing import Callable, Iterable, Iterator
 
 from custom_components.peaqhvac.service.models.enums.hvac_presets import HvacPresets
+from custom_components.peaqhvac.service.models.price_series import PriceSeries
+from custom_components.peaqhvac.service.models.price_stats import PriceStats
 
 
 
@@ -12,8 +17,7 @@ REQUIRED_DEMAND_DELAY = 6
 #--------------------------------
 
 from datetime import datetime, timedelta
-from statistics import mean
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 
 @dataclass
@@ -39,9 +43,29 @@ class NextStartPostModel:
     hvac_preset: HvacPresets = HvacPresets.Normal
     latest_boost: datetime|None = None
     dt: datetime = datetime.now()
+    interval: int | None = None
+    stats: PriceStats | None = None
+    cooling: tuple[float, ...] | None = None
+    series: PriceSeries = field(init=False)
 
     def __post_init__(self):
-        self.temp_trend = -0.5 if -0.5 < self.temp_trend < 0.1 else self.temp_trend
+        """
+        cooling is the learned cooling per hour of the day. It is used for every hour after the current one, and in
+        the current hour too instead of the default when the trend is unknown.
+        """
+        if -0.5 < self.temp_trend < 0.1:
+            self.temp_trend = -statistics.mean(self.cooling) if self.cooling else -0.5
+        start = self.dt.replace(hour=0, minute=0, second=0, microsecond=0)
+        if self.stats is not None and self.stats.matches(self.prices) and self.stats.start == start:
+            self.series = self.stats
+        else:
+            self.series = PriceSeries(self.prices, self.interval, start)
+
+    def cooling_at(self, dt: datetime) -> float | None:
+        """The learned cooling in degrees per hour at dt, None in the current hour where the measured trend applies."""
+        if not self.cooling or dt < self.dt.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1):
+            return None
+        return self.cooling[dt.hour]
 
 @dataclass
 class NextStartExportModel:
@@ -50,6 +74,7 @@ class NextStartExportModel:
 
 
 TARGET_TEMP = 47
+SELECTION_WINDOW = timedelta(hours=2)
 MAX_TARGET_TEMP = 53
 
 class NextWaterBoost:
@@ -58,23 +83,41 @@ class NextWaterBoost:
         self.low_water_limit: float = 20
         self.min_price: float = 0
         self.dt: datetime = datetime.now()
+        self.interval: int = 60
 
 
     def get_next_start(self, model: NextStartPostModel) -> NextStartExportModel:
+        """
+        One pass over the price intervals. Candidates are kept only for the two hours before the first selectable
+        interval, and the pass stops two hours after it, as nothing further away can be chosen.
+        """
         self.water_limit = 30 if model.hvac_preset == HvacPresets.Away else 40
         self.low_water_limit = self.water_limit - 20
         
         self.dt = model.dt
         self.min_price = model.min_price
-
-        data = self.get_data(model)
-        selected = self.get_selected(data)
+        self.interval = model.series.interval
+        if model.latest_boost is not None and self.dt - model.latest_boost < timedelta(hours=1):
+            self.dt = self.dt + timedelta(hours=1)
+
+        selected: PriceData | None = None
+        filtered: deque[PriceData] = deque()
+        for d in self._iter_data(model):
+            if selected is None:
+                while filtered and d.time - filtered[0].time > SELECTION_WINDOW:
+                    filtered.popleft()
+                filtered.append(d)
+                if self._is_selectable(d):
+                    selected = d
+            elif d.time - selected.time > SELECTION_WINDOW:
+                break
+            else:
+                filtered.append(d)
         if selected is None:
             return NextStartExportModel(datetime.max, None)
-        filtered = self.get_filtered(data, selected)
         selected = self.get_final_selected(filtered, selected)
         return NextStartExportModel(selected.time, selected.target_temp)
-   
+
     @staticmethod
     def _calculate_target_temp_for_hour(temp_at_time: float, is_demand: bool, price: float, price_spread:float, min_price:float) -> int:
         target = TARGET_TEMP if price > min_price else MAX_TARGET_TEMP
@@ -95,32 +138,50 @@ class NextWaterBoost:
         return min(int(temp_at_time+add_temp), target)
 
     @staticmethod
-    def _get_temperature_at_datetime(now_dt, target_dt, current_temp, temp_trend) -> float:
-        delay = (target_dt - now_dt).total_seconds() / 3600
-        return max(10,round(current_temp + (delay * temp_trend), 1))
-
-    def _add_data_list(self, model: NextStartPostModel) -> list:
-        data = []
-        for idx, p in enumerate(model.prices[self.dt.hour:], start=self.dt.hour):
-            new_hour = (self.dt + timedelta(hours=idx - self.dt.hour)).replace(minute=50, second=0, microsecond=0)
-            second_hour = (self.dt + timedelta(hours=idx - self.dt.hour + 1))
-            temp_at_time = self._get_temperature_at_datetime(self.dt, new_hour, model.current_temp, model.temp_trend)
-            if new_hour < self.reset_hour(self.dt):
+    def _get_temperature_at_datetime(
+            now_dt, target_dt, current_temp, temp_trend, cooling_at: Callable[[datetime], float | None] | None = None
+    ) -> float:
+        """The trend projected to target_dt, hour by hour with the learned cooling of each hour when cooling_at is given."""
+        if cooling_at is None:
+            delay = (target_dt - now_dt).total_seconds() / 3600
+            return max(10,round(current_temp + (delay * temp_trend), 1))
+        temp, dt = current_temp, now_dt
+        while dt < target_dt:
+            next_dt = min(dt.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1), target_dt)
+            rate = cooling_at(dt)
+            temp += (next_dt - dt).total_seconds() / 3600 * (temp_trend if rate is None else -rate)
+            dt = next_dt
+        return max(10, round(temp, 1))
+
+    def _iter_data(self, model: NextStartPostModel) -> Iterator[PriceData]:
+        """One candidate per price interval from the current one, starting ten minutes before the interval ends."""
+        series = model.series
+        start = series.index_of(self.dt)
+        first = self.reset_hour(self.dt, self.interval)
+        demand_hours, non_hours = set(model.demand_hours), set(model.non_hours)
+        for idx in range(start, len(series)):
+            offset = idx - start
+            new_hour = series.floor(self.dt + series.step * offset) + series.step - timedelta(minutes=10)
+            if new_hour < first:
                 continue
-            data.append(PriceData(
+            p = series.prices[idx]
+            second_hour = self.dt + series.step * (offset + 1)
+            temp_at_time = self._get_temperature_at_datetime(
+                self.dt, new_hour, model.current_temp, model.temp_trend, model.cooling_at if model.cooling else None
+            )
+            price_spread = round(p / series.mean_from(offset), 2)
+            is_demand = second_hour.hour in demand_hours
+            yield PriceData(
                 p,
-                round(p / mean(model.prices[idx - self.dt.hour:]), 2),
+                price_spread,
                 new_hour,
                 temp_at_time,
                 self._calculate_is_cold(temp_at_time, second_hour, model, p,
-                                        model.prices[idx + 1] if idx + 1 < len(model.prices) else 9999),
-                second_hour.hour in model.demand_hours,
-                new_hour.hour in model.non_hours or second_hour.hour in model.non_hours,
-                self._calculate_target_temp_for_hour(temp_at_time, second_hour.hour in model.demand_hours, p,
-                                                     round(p / mean(model.prices[idx - self.dt.hour:]), 2),
-                                                     model.min_price)
-            ))
-        return data
+                                        series.prices[idx + 1] if idx + 1 < len(series) else 9999),
+                is_demand,
+                new_hour.hour in non_hours or second_hour.hour in non_hours,
+                self._calculate_target_temp_for_hour(temp_at_time, is_demand, p, price_spread, model.min_price)
+            )
 
     def _calculate_is_cold(self, temp_at_time: float, second_hour: datetime, model: NextStartPostModel, p: float, p2: float) -> bool:
         calculated_water_limit = self.water_limit
@@ -132,41 +193,29 @@ class NextWaterBoost:
 
 
     @staticmethod
-    def reset_hour(dt) -> datetime:
-        return dt.replace(minute=0,second=0,microsecond=0)
-
-    def get_data(self, model: NextStartPostModel) -> list:
-        if model.latest_boost is not None:
-            if self.dt - model.latest_boost < timedelta(hours=1):
-                self.dt = self.dt+timedelta(hours=1)
-        data = self._add_data_list(model)
-        return data
-
-    def get_selected(self, data: list) -> PriceData:
-        selected: PriceData = None
-        for d in data:
-            if all([
-                d.is_cold,
-                (d.price_spread < 1 or d.price < self.min_price or (d.is_demand or d.water_temp < d.target_temp)),
-                not d.is_non,
-                d.time >= self.reset_hour(self.dt)
-                ]):
-                selected = d
-                break
-        return selected
-
-    def get_filtered(self, data: list, selected: PriceData) -> list:
-        return [d for d in data if max(d.time, selected.time) - min(d.time, selected.time) <= timedelta(hours=2) and d.time >= self.reset_hour(self.dt)]
-
-    def get_final_selected(self, filtered: list, selected: PriceData) -> PriceData:
-        for fdemand in [d for d in filtered if d.is_demand and not d.is_non]:
-            if fdemand.is_cold and fdemand.price_spread < selected.price_spread:
-                selected = fdemand
-                _LOGGER.debug("final selected chose a demandhour", selected)
-                return selected
-
-        for d in sorted(filtered, key=lambda x: (not x.is_demand, x.price_spread)):
-            if not d.is_non and d.price_spread < selected.price_spread and not selected.is_demand and not selected.water_temp < self.low_water_limit:
-                selected = d
-                break
-        return selected
+    def reset_hour(dt, interval: int = 60) -> datetime:
+        """Start of the price interval dt falls in."""
+        return dt.replace(minute=dt.minute - dt.minute % interval, second=0, microsecond=0)
+
+    def _is_selectable(self, d: PriceData) -> bool:
+        return all([
+            d.is_cold,
+            (d.price_spread < 1 or d.price < self.min_price or (d.is_demand or d.water_temp < d.target_temp)),
+            not d.is_non,
+        ])
+
+    def get_final_selected(self, filtered: Iterable[PriceData], selected: PriceData) -> PriceData:
+        """A cheaper cold demand interval first, otherwise the cheapest interval, demand intervals before others."""
+        for d in filtered:
+            if d.is_demand and not d.is_non and d.is_cold and d.price_spread < selected.price_spread:
+                _LOGGER.debug(f"final selected chose a demandhour: {d}")
+                return d
+        if selected.is_demand or selected.water_temp < self.low_water_limit:
+            return selected
+        ret = selected
+        for d in filtered:
+            if d.is_non or d.price_spread >= selected.price_spread:
+                continue
+            if ret is selected or (not d.is_demand, d.price_spread) < (not ret.is_demand, ret.price_spread):
+                ret = d
+        return ret
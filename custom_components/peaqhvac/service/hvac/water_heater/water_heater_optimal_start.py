@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+import logging
+
+from custom_components.peaqhvac.service.models.enums.hvac_presets import HvacPresets
+from custom_components.peaqhvac.service.hvac.water_heater.water_heater_next_start import (
+    MAX_TARGET_TEMP, TARGET_TEMP, NextStartExportModel, NextStartPostModel, NextWaterBoost)
+
+_LOGGER = logging.getLogger(__name__)
+
+WATER_PLANNER_GREEDY = "greedy"
+WATER_PLANNER_OPTIMAL = "optimal"
+WATER_PLANNERS = [WATER_PLANNER_GREEDY, WATER_PLANNER_OPTIMAL]
+DEFAULT_WATER_PLANNER = WATER_PLANNER_GREEDY
+
+BOOST_TARGETS = (TARGET_TEMP, MAX_TARGET_TEMP)
+TEMP_RESOLUTION = 0.5
+MIN_TEMP = 10
+MIN_COOLING = 0.5
+# start and standing losses of a boost, in degrees of tank temperature
+BOOST_OVERHEAD = 5
+# per degree and hour below the limits, in units of the mean price of the horizon
+COLD_PENALTY = 1
+DEMAND_PENALTY = 10
+MIN_REFERENCE_PRICE = 0.01
+
+
+@dataclass(frozen=True)
+class PlannedBoost:
+    time: datetime
+    target_temp: int
+
+
+class OptimalWaterBoost:
+    """
+    Plans the boosts of the whole price horizon at the lowest cost, instead of the first cold interval and the cheapest
+    one within two hours of it. A forward dynamic program over the intervals keeps, per tank temperature bin, the
+    cheapest label. Each interval the tank cools, or is boosted to one of the targets at the price of the interval.
+    Time below the water limit is penalized, heavily in demand hours and below the low water limit.
+    Labels keep their exact temperature, so quarter-hour cooling smaller than a bin is not rounded away, and labels
+    that are both colder and dearer than another are dropped.
+    """
+    def __init__(self):
+        self.water_limit: float = 40
+        self.low_water_limit: float = 20
+        self.boosts: list[PlannedBoost] = []
+
+    def get_next_start(self, model: NextStartPostModel) -> NextStartExportModel:
+        self.boosts = self.plan(model)
+        if not self.boosts:
+            return NextStartExportModel(datetime.max, None)
+        return NextStartExportModel(self.boosts[0].time, self.boosts[0].target_temp)
+
+    def plan(self, model: NextStartPostModel) -> list[PlannedBoost]:
+        self.water_limit = 30 if model.hvac_preset == HvacPresets.Away else 40
+        self.low_water_limit = self.water_limit - 20
+        series = model.series
+        start = series.index_of(model.dt)
+        if start >= len(series):
+            return []
+        earliest = model.dt
+        if model.latest_boost is not None and model.dt - model.latest_boost < timedelta(hours=1):
+            earliest = model.dt + timedelta(hours=1)
+        reference = max(abs(series.mean_from(start)), MIN_REFERENCE_PRICE)
+        step_hours = series.interval / 60
+        demand_hours, non_hours = set(model.demand_hours), set(model.non_hours)
+
+        labels: list[tuple[float, float, tuple | None]] = [(0.0, model.current_temp, None)]
+        interval_start = series.floor(model.dt)
+        for idx in range(start, len(series)):
+            interval_end = interval_start + series.step
+            hours = min((interval_end - model.dt).total_seconds() / 3600, step_hours)
+            cooling = self._cooling(model, interval_start) * hours
+            price = series.prices[idx]
+            next_labels: dict[int, tuple[float, float, tuple | None]] = {}
+            for cost, temp, boosts in labels:
+                self._keep(next_labels, cost, max(temp - cooling, MIN_TEMP), boosts)
+            if interval_start.hour not in non_hours and interval_end - timedelta(minutes=10) >= earliest:
+                for target in BOOST_TARGETS:
+                    best = min(
+                        (label for label in labels if label[1] < target),
+                        key=lambda label: label[0] + price * (target - label[1]),
+                        default=None,
+                    )
+                    if best is not None:
+                        cost = best[0] + price * (target - best[1] + BOOST_OVERHEAD)
+                        self._keep(next_labels, cost, target, ((idx, target), best[2]))
+            weight = reference * hours
+            is_demand = interval_start.hour in demand_hours
+            labels = self._pareto(
+                (cost + self._penalty(temp, is_demand) * weight, temp, boosts)
+                for cost, temp, boosts in next_labels.values()
+            )
+            interval_start = interval_end
+
+        best = min(labels, key=lambda label: label[0] + reference * (self.water_limit - label[1]))
+        ret = []
+        boosts = best[2]
+        while boosts is not None:
+            (idx, target), boosts = boosts
+            ret.append(PlannedBoost(series.time_at(idx) + series.step - timedelta(minutes=10), target))
+        return ret[::-1]
+
+    @staticmethod
+    def _cooling(model: NextStartPostModel, dt: datetime) -> float:
+        """Degrees per hour the tank cools at dt. The measured trend for the current hour, later the learned cooling."""
+        learned = model.cooling_at(dt)
+        return learned if learned is not None else max(-model.temp_trend, MIN_COOLING)
+
+    @staticmethod
+    def _keep(labels: dict, cost: float, temp: float, boosts: tuple | None) -> None:
+        """Labels are (cost, exact temperature, boosts), the cheapest one per temperature bin is kept."""
+        b = round(temp / TEMP_RESOLUTION)
+        current = labels.get(b)
+        if current is None or cost < current[0]:
+            labels[b] = (cost, temp, boosts)
+
+    @staticmethod
+    def _pareto(labels) -> list[tuple[float, float, tuple | None]]:
+        """A colder tank that cost more can never end up cheaper, only the warmest label per cost is kept."""
+        ret = []
+        for label in sorted(labels, key=lambda label: -label[1]):
+            if not ret or label[0] < ret[-1][0]:
+                ret.append(label)
+        return ret
+
+    def _penalty(self, temp: float, is_demand: bool) -> float:
+        ret = COLD_PENALTY * max(self.water_limit - temp, 0)
+        if is_demand:
+            ret += DEMAND_PENALTY * max(self.water_limit - temp, 0)
+        return ret + DEMAND_PENALTY * max(self.low_water_limit - temp, 0)
+
+
+def create_water_planner(planner: str | None = None) -> NextWaterBoost | OptimalWaterBoost:
+    """planner is WATER_PLANNER_GREEDY or WATER_PLANNER_OPTIMAL, both have the same get_next_start."""
+    match planner or DEFAULT_WATER_PLANNER:
+        case "greedy":
+            return NextWaterBoost()
+        case "optimal":
+            return OptimalWaterBoost()
+        case _:
+            raise ValueError(f"Unknown water planner {planner}")
@@ -24,6 +24,8 @@ class HeatingOptions:
     demand_hours_water_boost: list[int] = field(default_factory=lambda: [])
     low_dm: int = -9999
     very_cold_temp: int = -999
+    water_planner: str | None = None
+    offset_ramp_limit: int | None = None
 
 
 class ConfigModel:
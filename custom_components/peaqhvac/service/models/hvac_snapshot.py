@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from custom_components.peaqhvac.service.models.enums.hvacmode import HvacMode
+from custom_components.peaqhvac.service.models.enums.sensortypes import SensorType
+
+
+@dataclass(frozen=True)
+class HvacSnapshot:
+    """The hvac values at one version of the state cache, shared by everything that reads them until the next change."""
+    version: int
+    stale: frozenset[SensorType] = frozenset()
+    hvac_mode: HvacMode = HvacMode.Unknown
+    offset: int = 0
+    dm: int = 0
+    water_temp: float = 0
+    supply_temp: float | None = None
+    return_temp: float | None = None
+    electrical_addon: bool = False
+    compressor_frequency: int = 0
+    compressor_start: int = 0
+    fan_speed: float = 0
+
+    @property
+    def delta_return_temp(self) -> float:
+        if self.supply_temp is None or self.return_temp is None:
+            return 0
+        return round(self.supply_temp - self.return_temp, 2)
@@ -1,22 +1,28 @@
 import logging
+from homeassistant.core import callback
 from homeassistant.helpers.event import async_track_time_interval
 from datetime import timedelta, datetime
 
 from peaqevcore.common.models.observer_types import ObserverTypes
 
+from custom_components.peaqhvac.service.models.offset_timeline import OffsetTimeline
+
 _LOGGER = logging.getLogger(__name__)
 
 
 class OffsetModel:
     _peaks_today: list = []
     _peaks_tomorrow: list = []
-    calculated_offsets = {}
-    raw_offsets = {}
+    _calculated_offsets = {}
+    _raw_offsets = {}
+    calculated_timeline = OffsetTimeline()
+    raw_timeline = OffsetTimeline()
     _tolerance = None
     tolerance_raw = None
     prognosis = None
     _tolerance_difference: int = 0
     _outdoor_temp: int|None = None
+    price_interval: int = 60
 
     def __init__(self, hub):
         self.hub = hub
@@ -24,17 +30,23 @@ class OffsetModel:
         self.hub.observer.add(ObserverTypes.HvacToleranceChanged, self.recalculate_tolerance)
         self.hub.observer.add(ObserverTypes.TemperatureOutdoorsChanged, self._set_outdoor_temp)
 
+    @callback
     def _set_outdoor_temp(self, val):
         self._outdoor_temp = val
         self.recalculate_tolerance()
 
+    @property
+    def intervals_per_day(self) -> int:
+        return 24 * 60 // self.price_interval
+
     @property
     def peaks_today(self) -> list:
+        """Indexes of the peak price intervals of today, hours when prices are hourly."""
         return self._peaks_today
 
     @peaks_today.setter
     def peaks_today(self, val: list):
-        self._peaks_today = [v for v in val if 0 <= v < 24]
+        self._peaks_today = [v for v in val if 0 <= v < self.intervals_per_day]
 
     @property
     def peaks_tomorrow(self) -> list:
@@ -42,7 +54,7 @@ class OffsetModel:
 
     @peaks_tomorrow.setter
     def peaks_tomorrow(self, val: list):
-        self._peaks_tomorrow = [v for v in val if 0 <= v < 24]
+        self._peaks_tomorrow = [v for v in val if 0 <= v < self.intervals_per_day]
 
     @property
     def tolerance(self) -> int:
@@ -54,15 +66,38 @@ class OffsetModel:
     def tolerance(self, val):
         self._tolerance = val
 
+    @property
+    def raw_offsets(self) -> dict:
+        return self._raw_offsets
+
+    @raw_offsets.setter
+    def raw_offsets(self, val: dict):
+        self._raw_offsets = val
+        self.raw_timeline = OffsetTimeline(val)
+
+    @property
+    def calculated_offsets(self) -> dict:
+        return self._calculated_offsets
+
+    @calculated_offsets.setter
+    def calculated_offsets(self, val: dict):
+        self._calculated_offsets = val
+        self.calculated_timeline = OffsetTimeline(val)
+
+    @property
+    def version(self) -> tuple:
+        """Changes when the offsets are recalculated or the day changes."""
+        return self.raw_timeline.version, self.calculated_timeline.version, datetime.now().date()
+
     @property
     def current_offset_dict(self) -> dict:
-        return {k: v for k, v in self.calculated_offsets.items() if k.date() == datetime.now().date()}
+        return self.calculated_timeline.day(datetime.now().date())
 
     @property
     def current_offset_dict_tomorrow(self) -> dict:
-        return {k: v for k, v in self.calculated_offsets.items() if
-                k.date() == datetime.now().date() + timedelta(days=1)}
+        return self.calculated_timeline.day(datetime.now().date() + timedelta(days=1))
 
+    @callback
     def recalculate_tolerance(self):
         if self.hub.options.hvac_tolerance is not None:
             old_tolerance = self._tolerance
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import bisect
+import itertools
+from datetime import date, datetime, time, timedelta
+from types import MappingProxyType
+
+_versions = itertools.count(1)
+
+
+class OffsetTimeline:
+    """
+    Offsets sorted by time in parallel tuples. Never changed after creation, a recalculation makes a new timeline
+    with a new version, so consumers can compare versions to tell whether anything changed.
+    """
+    __slots__ = ("times", "values", "version", "_days")
+
+    def __init__(self, offsets: dict[datetime, int] | None = None):
+        items = sorted(offsets.items()) if offsets else []
+        self.times: tuple[datetime, ...] = tuple(k for k, _ in items)
+        self.values: tuple = tuple(v for _, v in items)
+        self.version: int = next(_versions)
+        self._days: dict[date, MappingProxyType] = {}
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def value_at(self, dt: datetime, default=None):
+        """The value of the latest key at or before dt."""
+        idx = bisect.bisect_right(self.times, dt) - 1
+        return self.values[idx] if idx >= 0 else default
+
+    def next_key(self, dt: datetime) -> datetime | None:
+        """The first key after dt."""
+        idx = bisect.bisect_right(self.times, dt)
+        return self.times[idx] if idx < len(self.times) else None
+
+    def day(self, day: date) -> MappingProxyType:
+        """Read-only {datetime: value} of one day, sliced once per timeline."""
+        ret = self._days.get(day)
+        if ret is None:
+            start = bisect.bisect_left(self.times, datetime.combine(day, time.min))
+            end = bisect.bisect_left(self.times, datetime.combine(day + timedelta(days=1), time.min))
+            ret = self._days[day] = MappingProxyType(dict(zip(self.times[start:end], self.values[start:end])))
+        return ret
@@ -2,6 +2,8 @@ from typing import Tuple, List, Dict
 from dataclasses import dataclass, field
 from datetime import datetime
 
+from custom_components.peaqhvac.service.models.price_series import PriceSeries
+
 @dataclass
 class OffsetsExportModel:
     peaks: Tuple[List, List]
@@ -21,10 +23,11 @@ class OffsetsExportModel:
 
     @property
     def current_raw_offset(self) -> int:
-        """Returns the current raw offset based on the current hour."""
+        """Returns the current raw offset based on the current price interval."""
         if not self._raw_offsets:
             return 0
-        return self._raw_offsets[datetime.now().hour]
+        idx = PriceSeries(self._raw_offsets).index_of(datetime.now())
+        return self._raw_offsets[idx] if idx < len(self._raw_offsets) else 0
 
     @property
     def current_offset(self) -> List[int]:
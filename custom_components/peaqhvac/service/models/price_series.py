@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from fractions import Fraction
+from functools import cached_property
+
+QUARTER_HOUR_COUNTS = (92, 96, 100, 188, 192, 196)
+
+
+def interval_minutes(count: int) -> int:
+    """Length of one price interval for a list of one or two days of prices, dst days included."""
+    return 15 if count in QUARTER_HOUR_COUNTS else 60
+
+
+class PriceSeries:
+    """
+    Prices of consecutive intervals from the start of a day, today and tomorrow in one series.
+    Indexes are intervals, so hourly and quarter-hourly markets are handled the same way.
+    """
+    def __init__(self, prices: list[float], interval: int | None = None, start: datetime | None = None):
+        self.prices: tuple[float, ...] = tuple(prices)
+        self.interval: int = interval or interval_minutes(len(self.prices))
+        self.start: datetime | None = start
+
+    @classmethod
+    def from_days(cls, prices_today: list[float], prices_tomorrow: list[float], dt: datetime) -> PriceSeries:
+        return cls(
+            list(prices_today) + list(prices_tomorrow),
+            interval_minutes(len(prices_today)),
+            dt.replace(hour=0, minute=0, second=0, microsecond=0),
+        )
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    def __getitem__(self, idx):
+        return self.prices[idx]
+
+    @property
+    def per_hour(self) -> int:
+        return 60 // self.interval
+
+    @property
+    def per_day(self) -> int:
+        return 24 * self.per_hour
+
+    @property
+    def step(self) -> timedelta:
+        return timedelta(minutes=self.interval)
+
+    def index_of(self, dt: datetime) -> int:
+        """Index of the interval dt falls in, counted from the start of dt's day."""
+        return (dt.hour * 60 + dt.minute) // self.interval
+
+    def floor(self, dt: datetime) -> datetime:
+        return dt.replace(minute=dt.minute - dt.minute % self.interval, second=0, microsecond=0)
+
+    def time_at(self, idx: int) -> datetime:
+        return self.start + self.step * idx
+
+    @cached_property
+    def _suffix_sums(self) -> list[Fraction]:
+        ret = [Fraction(0)] * (len(self.prices) + 1)
+        for idx in range(len(self.prices) - 1, -1, -1):
+            ret[idx] = ret[idx + 1] + Fraction(self.prices[idx])
+        return ret
+
+    def mean_from(self, idx: int) -> float:
+        """statistics.mean(prices[idx:]) in constant time. Sums are exact, so the result is the same."""
+        idx = max(idx, 0)
+        count = len(self.prices) - idx
+        if count <= 0:
+            raise ValueError("mean requires at least one data point")
+        return float(self._suffix_sums[idx] / count)
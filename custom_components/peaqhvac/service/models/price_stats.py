@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import statistics
+from datetime import datetime
+from fractions import Fraction
+from functools import cached_property
+
+from custom_components.peaqhvac.service.models.price_series import PriceSeries, interval_minutes
+
+
+class PriceStats(PriceSeries):
+    """
+    Statistics of a price series, taken at most once per price update and shared read-only by everything planning on prices.
+    mean and stdev come from statistics, so they are the same values the planners got when computing them on their own.
+    days splits the series into the days it covers, each with statistics of its own. first_day is the length of the
+    first day when it is not a full day of intervals, as on dst days.
+    """
+    def __init__(
+            self, prices: list[float], interval: int | None = None, start: datetime | None = None, first_day: int | None = None
+    ):
+        super().__init__(prices, interval, start)
+        self.first_day: int = first_day or self.per_day
+        self.min: float | None = min(self.prices) if self.prices else None
+        self.max: float | None = max(self.prices) if self.prices else None
+
+    @cached_property
+    def mean(self) -> float | None:
+        return statistics.mean(self.prices) if self.prices else None
+
+    @cached_property
+    def stdev(self) -> float | None:
+        return statistics.stdev(self.prices) if len(self.prices) > 1 else None
+
+    @cached_property
+    def _sorted(self) -> tuple[float, ...]:
+        return tuple(sorted(self.prices))
+
+    @classmethod
+    def from_days(cls, prices_today: list[float], prices_tomorrow: list[float], dt: datetime) -> PriceStats:
+        return cls(
+            list(prices_today) + list(prices_tomorrow),
+            interval_minutes(len(prices_today)),
+            dt.replace(hour=0, minute=0, second=0, microsecond=0),
+            len(prices_today),
+        )
+
+    def matches(self, prices: list[float]) -> bool:
+        return self.prices == tuple(prices)
+
+    def percentile(self, q: float) -> float:
+        """The q:th percentile, 0 to 100, interpolated between the two closest prices."""
+        if not self._sorted:
+            raise ValueError("percentile requires at least one data point")
+        if not 0 <= q <= 100:
+            raise ValueError(f"percentile must be between 0 and 100, got {q}")
+        pos = (len(self._sorted) - 1) * q / 100
+        low = int(pos)
+        high = min(low + 1, len(self._sorted) - 1)
+        return self._sorted[low] + (self._sorted[high] - self._sorted[low]) * (pos - low)
+
+    @cached_property
+    def _prefix_sums(self) -> list[Fraction]:
+        total = self._suffix_sums[0]
+        return [total - s for s in self._suffix_sums]
+
+    def sum_between(self, start: int, end: int) -> float:
+        """sum(prices[start:end]) in constant time."""
+        start, end = max(start, 0), min(end, len(self.prices))
+        return float(self._prefix_sums[end] - self._prefix_sums[start]) if end > start else 0.0
+
+    def mean_between(self, start: int, end: int) -> float:
+        """statistics.mean(prices[start:end]) in constant time."""
+        start, end = max(start, 0), min(end, len(self.prices))
+        if end <= start:
+            raise ValueError("mean requires at least one data point")
+        return float((self._prefix_sums[end] - self._prefix_sums[start]) / (end - start))
+
+    @cached_property
+    def days(self) -> tuple[PriceStats, ...]:
+        bounds = [0, *range(self.first_day, len(self.prices), self.per_day), len(self.prices)]
+        return tuple(
+            PriceStats(self.prices[a:b], self.interval, self.time_at(a) if self.start else None)
+            for a, b in zip(bounds, bounds[1:]) if b > a
+        )
+
+    @property
+    def today(self) -> PriceStats:
+        return self.days[0] if self.days else PriceStats([], self.interval, self.start)
+
+    @property
+    def tomorrow(self) -> PriceStats:
+        return self.days[1] if len(self.days) > 1 else PriceStats([], self.interval)
@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+
+from custom_components.peaqhvac.service.models.hvac_snapshot import HvacSnapshot
+from custom_components.peaqhvac.service.models.price_stats import PriceStats
+
+
+@dataclass(frozen=True)
+class TickSnapshot:
+    """
+    State shared by the scheduler tasks that are due on the same tick, taken once when the tick starts so they all
+    see the same moment, hvac values and price statistics. hvac and prices are None where the hub has none to give.
+    """
+    now: datetime
+    hvac: HvacSnapshot | None = None
+    prices: PriceStats | None = None
@@ -1,2 +1,22 @@
+from peaqevcore.common.models.observer_types import ObserverTypes
+
+from custom_components.peaqhvac.service.observer.models.priority import Priority
+
 COMMAND_WAIT = 3
 TIMEOUT = 10
+SLOW_HANDLER_THRESHOLD = 1
+
+MAX_DISPATCH_PER_CYCLE = 16
+STARVATION_CYCLES = 3
+
+# commands not listed here are dispatched as Priority.Recalculation
+COMMAND_PRIORITIES = {
+    ObserverTypes.UpdateOperation: Priority.Control,
+    "water_boost_start": Priority.Control,
+    "water boost done": Priority.Control,
+    "control_module_changed": Priority.Control,
+    "ObserverTypes.TemperatureIndoorsChanged": Priority.Telemetry,
+    ObserverTypes.TemperatureOutdoorsChanged: Priority.Telemetry,
+    ObserverTypes.WatertempChange: Priority.Telemetry,
+    ObserverTypes.PrognosisChanged: Priority.Telemetry,
+}
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Callable
+
+from custom_components.peaqhvac.service.observer.models.command import \
+    Command
+from custom_components.peaqhvac.service.observer.models.dispatch_policy import \
+    DispatchPolicy
+from custom_components.peaqhvac.service.observer.models.subscriber import \
+    Subscriber
+
+
+class DispatchGate:
+    """
+    Enforces a DispatchPolicy for one handler. Subscriptions of the same handler share a gate, so dispatches of
+    different commands to that handler are merged as well.
+    """
+    def __init__(self, policy: DispatchPolicy, deliver: Callable[[Subscriber, Command], None]):
+        self.policy = policy
+        self._deliver = deliver
+        self._pending: tuple[Subscriber, Command] | None = None
+        self._timer: asyncio.TimerHandle | None = None
+        self._last_delivery: float | None = None
+        self._quiet_until: float = 0
+
+    def submit(self, subscriber: Subscriber, command: Command) -> bool:
+        """Returns False when the dispatch was dropped or merged into one that is still held back."""
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        merged = self._pending is not None
+        if self.policy.debounce:
+            if self.policy.trailing:
+                self._pending = (subscriber, command)
+                self._cancel_timer()
+                self._timer = loop.call_later(self.policy.debounce, self._flush)
+                return not merged
+            quiet = now >= self._quiet_until
+            self._quiet_until = now + self.policy.debounce
+            if quiet and self._rate_allows(now):
+                self._deliver_now(subscriber, command, now)
+                return True
+            return False
+        if self._rate_allows(now):
+            self._deliver_now(subscriber, command, now)
+            return True
+        if self.policy.trailing:
+            self._pending = (subscriber, command)
+            if self._timer is None:
+                self._timer = loop.call_at(self._last_delivery + self.policy.min_interval, self._flush)
+            return not merged
+        return False
+
+    def cancel(self) -> None:
+        self._cancel_timer()
+        self._pending = None
+
+    def _flush(self) -> None:
+        self._timer = None
+        if self._pending is None:
+            return
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        if not self._rate_allows(now):
+            self._timer = loop.call_at(self._last_delivery + self.policy.min_interval, self._flush)
+            return
+        subscriber, command = self._pending
+        self._pending = None
+        self._deliver_now(subscriber, command, now)
+
+    def _rate_allows(self, now: float) -> bool:
+        return self._last_delivery is None or now - self._last_delivery >= self.policy.min_interval
+
+    def _deliver_now(self, subscriber: Subscriber, command: Command, now: float) -> None:
+        self._last_delivery = now
+        self._deliver(subscriber, command)
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
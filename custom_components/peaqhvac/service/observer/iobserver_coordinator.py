@@ -1,19 +1,34 @@
 from __future__ import annotations
 
+import heapq
+import itertools
 import logging
 import time
-from abc import abstractmethod
 import asyncio
+from contextlib import AsyncExitStack
 from typing import Callable
 
 from peaqevcore.common.models.observer_types import ObserverTypes
 
 from custom_components.peaqhvac.service.observer.const import (
-    COMMAND_WAIT)
+    COMMAND_WAIT, MAX_DISPATCH_PER_CYCLE, SLOW_HANDLER_THRESHOLD,
+    STARVATION_CYCLES, TIMEOUT)
+from custom_components.peaqhvac.service.observer.dispatch_gate import \
+    DispatchGate
 from custom_components.peaqhvac.service.observer.models.command import \
     Command
+from custom_components.peaqhvac.service.observer.models.dispatch_policy import \
+    DispatchPolicy
+from custom_components.peaqhvac.service.observer.models.observer_metrics import \
+    ObserverMetrics
 from custom_components.peaqhvac.service.observer.models.observer_model import \
     ObserverModel
+from custom_components.peaqhvac.service.observer.models.priority import \
+    Priority
+from custom_components.peaqhvac.service.observer.models.subscriber import \
+    Subscriber
+from custom_components.peaqhvac.service.observer.trace_recorder import (
+    TRACE_FLUSH_RECORDS, TraceRecorder)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -26,11 +41,26 @@ class IObserver:
     Observer class handles updates throughout peaq.
     Attach to hub class and subscribe to updates (string matches) in other classes connected to the hub.
     When broadcasting, you may use one argument that the of-course needs to correspond to your receiving function.
+    Broadcasts wake the dispatcher right away, it sleeps while the queue is empty.
+    Subscribers of a command run concurrently unless the command was added as ordered. A handler still running after
+    handler_timeout is reported, never cancelled, so a write to the heat pump is not cut off halfway.
+    Queued commands are dispatched by Priority lane, a lane passed over for STARVATION_CYCLES cycles gets a reserved slot.
+    Call enable_metrics to collect per-command counters, latency histograms and the slowest handler calls,
+    and async_start_recording to write a trace of the traffic that benchmarks/replay_observer_trace.py can play back.
     """
-    def __init__(self):
+    def __init__(self, handler_timeout: float = TIMEOUT):
         self.model = ObserverModel()
-        self._dequeue_lock = asyncio.Lock()
-        self._dispatch_lock = asyncio.Lock()
+        self.metrics: ObserverMetrics | None = None
+        self.recorder: TraceRecorder | None = None
+        self.handler_timeout = handler_timeout
+        self._sequence = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._dispatcher: asyncio.Task | None = None
+        self._cycles: set[asyncio.Task] = set()
+        self._command_locks: dict[ObserverTypes | str, asyncio.Lock] = {}
+        self._locks: dict[Callable, asyncio.Lock] = {}
+        self._gates: dict[Callable, DispatchGate] = {}
 
     def activate(self, init_broadcast: ObserverTypes = None) -> None:
         self.model.active = True
@@ -40,6 +70,52 @@ class IObserver:
     def deactivate(self) -> None:
         self.model.active = False
 
+    def enable_metrics(self) -> None:
+        if self.metrics is None:
+            self.metrics = ObserverMetrics()
+
+    def disable_metrics(self) -> None:
+        self.metrics = None
+
+    async def async_start_recording(self, path: str) -> None:
+        """A running recording is written out and stopped first, nothing it collected is lost."""
+        await self.async_stop_recording()
+        self.recorder = TraceRecorder(path)
+
+    async def async_stop_recording(self) -> None:
+        recorder, self.recorder = self.recorder, None
+        if recorder is not None:
+            await self._async_run_in_executor(recorder.write, recorder.take())
+
+    def diagnostics(self) -> dict:
+        counters = self.model.counters
+        return {
+            "queue_depth": len(self.model.broadcast_queue),
+            "subscribers": {str(k): [s.name for s in v] for k, v in self.model.subscribers.items()},
+            "dispatch_counters": {
+                "inline_calls": counters.inline_calls,
+                "executor_calls": counters.executor_calls,
+                "executor_jobs": counters.executor_jobs,
+                "suppressed_calls": counters.suppressed_calls,
+                "executor_jobs_saved_per_hour": counters.executor_jobs_saved_per_hour,
+            },
+            "metrics": self.metrics.as_dict() if self.metrics is not None else None,
+        }
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+        self._dispatcher = loop.create_task(self.async_run_dispatcher())
+
+    def stop(self) -> None:
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            self._dispatcher = None
+        for cycle in self._cycles:
+            cycle.cancel()
+        self._cycles.clear()
+        for gate in self._gates.values():
+            gate.cancel()
+
     @staticmethod
     def _check_and_convert_enum_type(command) -> ObserverTypes | str:
         if isinstance(command, str):
@@ -51,95 +127,343 @@ class IObserver:
                 #return ObserverTypes.Test
         return command
 
-    def add(self, command: ObserverTypes|str, func):
+    def add(
+        self,
+        command: ObserverTypes|str,
+        func,
+        loop_safe: bool = False,
+        timeout: float | None = None,
+        ordered: bool = False,
+        policy: DispatchPolicy | None = None
+    ):
+        """
+        ordered makes every subscriber of the command run one after another, in subscription order.
+        policy debounces or throttles the handler, subscribing the same handler with a policy to several commands
+        lets a burst across those commands end up in one call.
+        A handler subscribed to several commands has one lock and one gate, it is never entered twice at once.
+        """
         command = self._check_and_convert_enum_type(command)
+        subscriber = Subscriber.create(
+            func,
+            loop_safe=loop_safe or self._is_loop_safe(func),
+            timeout=timeout,
+            policy=policy,
+            lock=self._locks.setdefault(func, asyncio.Lock()),
+        )
+        if ordered:
+            self.model.ordered_commands.add(command)
+        if policy is not None:
+            gate = self._gates.setdefault(func, DispatchGate(policy, self._deliver_gated))
+            if gate.policy != policy:
+                _LOGGER.warning(f"{subscriber.name} is already gated by {gate.policy}, {policy} for {command} is ignored.")
         if command in self.model.subscribers.keys():
-            self.model.subscribers[command].append(func)
+            self.model.subscribers[command].append(subscriber)
         else:
-            self.model.subscribers[command] = [func]
+            self.model.subscribers[command] = [subscriber]
+        if command in {q.command for q in self.model.broadcast_queue.values()}:
+            # commands broadcast before anyone subscribed are still waiting in the queue
+            self._wake_dispatcher()
+
+    def set_priority(self, command: ObserverTypes|str, priority: Priority) -> None:
+        self.model.priorities[self._check_and_convert_enum_type(command)] = priority
 
-    async def async_broadcast(self, command: ObserverTypes|str, argument=None):
-        self.broadcast(command, argument)
+    async def async_broadcast(self, command: ObserverTypes|str, argument=None, priority: Priority | None = None):
+        self.broadcast(command, argument, priority)
 
-    def broadcast(self, command: ObserverTypes|str, argument=None):
+    def broadcast(self, command: ObserverTypes|str, argument=None, priority: Priority | None = None):
+        """priority overrides the lane of the command for this broadcast."""
         command = self._check_and_convert_enum_type(command)
-        _expiration = time.time() + COMMAND_VALIDITY
-        cc = Command(command, _expiration, argument)
-        if cc not in self.model.broadcast_queue:
-            if cc not in self.model.dispatch_delay_queue.keys():
-                self.model.dispatch_delay_queue[cc] = time.time()
-                _LOGGER.debug(f"received broadcast: {command} - {argument}")
-                self.model.broadcast_queue.append(cc)
-        #     else:
-        #         _LOGGER.debug(f"Command {command} with argument {argument} is already in dispatch_delay_queue: {self.model.dispatch_delay_queue[cc]}")
-        # else:
-        #     _LOGGER.debug(
-        #         f"Command {command} with argument {argument} is already in broadcast_queue: {[q for q in self.model.broadcast_queue if q == cc]}")
+        now = time.time()
+        if priority is None:
+            priority = self.model.priorities.get(command, Priority.Recalculation)
+        cc = Command(command, now + COMMAND_VALIDITY, argument, now, priority)
+        if self._loop is None or self._on_loop():
+            self._enqueue(cc)
+        else:
+            # broadcasts from executor-threads are handed over to the loop that owns the queue
+            self._loop.call_soon_threadsafe(self._enqueue, cc)
 
-    async def async_dispatch(self, *args):
-        q: Command
-        for q in self.model.broadcast_queue:
-            if q.command in self.model.subscribers.keys():
-                await self.async_dequeue_and_broadcast(q)
+    def _on_loop(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
 
-    async def async_dequeue_and_broadcast(self, command: Command):
-        #if await self.async_ok_to_broadcast(command):
-        async with self._dequeue_lock:
-            await self.async_update_dispatch_delay(command)
-            for func in self.model.subscribers.get(command.command, []):
-                _LOGGER.debug(f"broadcasting {command.command} with {command.argument}")
-                await self.async_broadcast_separator(func, command)
-            if command in self.model.broadcast_queue:
-                self.model.broadcast_queue.remove(command)
-
-    async def async_update_dispatch_delay(self, command: Command):
-        async with self._dispatch_lock:
-            q: Command
-            old_items = [k for k, v in self.model.dispatch_delay_queue.items() if time.time() - v > DISPATCH_DELAY_TIMEOUT]
-            for old in old_items:
+    def _enqueue(self, cc: Command) -> None:
+        now = time.time()
+        key = cc.coalesce_key
+        if self.recorder is not None:
+            self.recorder.broadcast(cc)
+        stats = self.metrics.command(cc.command) if self.metrics is not None else None
+        if stats is not None:
+            stats.broadcasts += 1
+        queued = self.model.broadcast_queue.get(key)
+        if queued is not None:
+            if queued != cc:
+                _LOGGER.debug(f"coalesced broadcast: {cc.command} - {queued.argument} -> {cc.argument}")
+            if stats is not None:
+                stats.coalesced += 1
+            # queue wait counts from the first broadcast that is still waiting
+            cc.created = queued.created
+            if cc.priority < queued.priority:
+                self.model.lanes[queued.priority].pop(key)
+                self.model.lanes[cc.priority][key] = None
+            else:
+                cc.priority = queued.priority
+            # re-assigning an existing key keeps its place in the queue
+            self.model.broadcast_queue[key] = cc
+            self._add_dispatch_delay(cc, now)
+            return
+        self._evict_dispatch_delay(now)
+        if cc in self.model.dispatch_delay_queue:
+            if stats is not None:
+                stats.dropped += 1
+            return
+        self._add_dispatch_delay(cc, now)
+        _LOGGER.debug(f"received broadcast: {cc.command} - {cc.argument}")
+        self.model.broadcast_queue[key] = cc
+        self.model.lanes[cc.priority][key] = None
+        self._wakeup.set()
+
+    def _add_dispatch_delay(self, cc: Command, now: float) -> None:
+        if cc not in self.model.dispatch_delay_queue:
+            self.model.dispatch_delay_queue[cc] = now
+            heapq.heappush(self.model.dispatch_delay_heap, (now, next(self._sequence), cc))
+
+    def _evict_dispatch_delay(self, now: float) -> None:
+        heap = self.model.dispatch_delay_heap
+        while heap and now - heap[0][0] > DISPATCH_DELAY_TIMEOUT:
+            added, _, old = heapq.heappop(heap)
+            if self.model.dispatch_delay_queue.get(old) == added:
                 self.model.dispatch_delay_queue.pop(old)
-                #_LOGGER.debug(f"removed {old} from dispatch_delay_queue")
-            # if command not in self.model.dispatch_delay_queue.keys():
-            #     self.model.dispatch_delay_queue[command] = time.time()
 
-    @abstractmethod
-    async def async_broadcast_separator(self, func, command):
-        pass
+    def _wake_dispatcher(self) -> None:
+        if self._loop is None or self._on_loop():
+            self._wakeup.set()
+        else:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
 
-    @staticmethod
-    def _call_func(func: Callable, command: Command) -> None:
-        if command.argument is not None:
-            if isinstance(command.argument, dict):
-                try:
-                    func(**command.argument)
-                except TypeError:
-                    func()
+    async def async_run_dispatcher(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            # a slow cycle must not hold back the commands broadcast while it runs
+            cycle = self._create_task(self._async_run_cycle())
+            self._cycles.add(cycle)
+            cycle.add_done_callback(self._cycles.discard)
+
+    async def _async_run_cycle(self) -> None:
+        try:
+            await self.async_dispatch()
+        except Exception as e:
+            _LOGGER.exception(f"Observer dispatch failed: {e}")
+
+    async def async_dispatch(self, *args):
+        now = time.time()
+        executor_batch: list[tuple[Subscriber, Command]] = []
+        pending = []
+        for key in self._next_keys(now):
+            q: Command = self._pop(key)
+            if self.metrics is not None:
+                self.metrics.command(q.command).dispatched += 1
+                if q.created is not None:
+                    self.metrics.queue_wait.record(now - q.created)
+            if self.recorder is not None:
+                self.recorder.dispatch(q, now)
+            pending.extend(self._fan_out(q, executor_batch))
+        if executor_batch:
+            pending.append(self.async_run_executor_batch(executor_batch))
+        if pending:
+            await asyncio.gather(*pending)
+        recorder = self.recorder
+        if recorder is not None and recorder.pending >= TRACE_FLUSH_RECORDS:
+            await self._async_run_in_executor(recorder.write, recorder.take())
+
+    def _next_keys(self, now: float) -> list:
+        """
+        Picks up to MAX_DISPATCH_PER_CYCLE queued commands, Control lane first. Every lane that was passed over
+        for STARVATION_CYCLES cycles has one slot reserved.
+        """
+        chosen = set()
+        reserved = []
+        for lane, passed_over in sorted(self.model.lane_passed_over.items()):
+            if passed_over >= STARVATION_CYCLES and len(reserved) < MAX_DISPATCH_PER_CYCLE:
+                reserved += self._take(lane, 1, now, chosen)
+        selected = self._take(Priority.Control, MAX_DISPATCH_PER_CYCLE - len(reserved), now, chosen) + reserved
+        for lane in Priority:
+            selected += self._take(lane, MAX_DISPATCH_PER_CYCLE - len(selected), now, chosen)
+        if len(selected) >= MAX_DISPATCH_PER_CYCLE:
+            self._wakeup.set()
+        picked = {self.model.broadcast_queue[k].priority for k in selected}
+        self.model.lane_passed_over = {
+            lane: 0 if lane in picked else self.model.lane_passed_over.get(lane, 0) + 1
+            for lane, keys in self.model.lanes.items() if keys
+        }
+        return selected
+
+    def _take(self, lane: Priority, limit: int, now: float, chosen: set) -> list:
+        """The oldest dispatchable keys of a lane, expired commands met on the way are dropped."""
+        taken, expired = [], []
+        if limit <= 0:
+            return taken
+        for key in self.model.lanes[lane]:
+            q = self.model.broadcast_queue[key]
+            if q.is_expired(now):
+                expired.append(key)
+            elif key not in chosen and q.command in self.model.subscribers:
+                taken.append(key)
+                chosen.add(key)
+                if len(taken) >= limit:
+                    break
+        for key in expired:
+            q = self._pop(key)
+            _LOGGER.debug(f"dropped expired command: {q.command} - {q.argument}")
+            if self.metrics is not None:
+                self.metrics.command(q.command).dropped += 1
+        return taken
+
+    def _pop(self, key) -> Command:
+        q = self.model.broadcast_queue.pop(key)
+        self.model.lanes[q.priority].pop(key)
+        return q
+
+    def _fan_out(self, command: Command, executor_batch: list) -> list:
+        """
+        Returns the awaitables for the subscribers of command. Loop-safe handlers are called right away and
+        blocking sync handlers are added to executor_batch, to share one executor job per dispatch cycle.
+        """
+        #if await self.async_ok_to_broadcast(command):
+        self._evict_dispatch_delay(time.time())
+        _LOGGER.debug(f"broadcasting {command.command} with {command.argument}")
+        if command.command in self.model.ordered_commands:
+            return [self.async_dequeue_and_broadcast(command)]
+        pending = []
+        for subscriber in self.model.subscribers.get(command.command, []):
+            if subscriber.policy is not None:
+                self._submit_gated(subscriber, command)
+            elif subscriber.is_async:
+                pending.append(self.async_broadcast_separator(subscriber, command))
+            elif subscriber.loop_safe:
+                self._call_inline(subscriber, command)
             else:
-                try:
-                    func(command.argument)
-                except TypeError:
-                    func()
+                executor_batch.append((subscriber, command))
+        return pending
+
+    async def async_dequeue_and_broadcast(self, command: Command):
+        """
+        Runs the subscribers of an ordered command one at a time, and one dispatch of the command at a time.
+        Subscribers with a policy are handed to their gate and are not part of the ordering.
+        """
+        lock = self._command_locks.setdefault(command.command, asyncio.Lock())
+        async with lock:
+            for subscriber in self.model.subscribers.get(command.command, []):
+                if subscriber.policy is not None:
+                    self._submit_gated(subscriber, command)
+                    continue
+                await self.async_broadcast_separator(subscriber, command)
+
+    def _submit_gated(self, subscriber: Subscriber, command: Command) -> None:
+        if not self._gates[subscriber.func].submit(subscriber, command):
+            self.model.counters.suppressed_calls += 1
+
+    def _deliver_gated(self, subscriber: Subscriber, command: Command) -> None:
+        call = self._create_task(self.async_broadcast_separator(subscriber, command))
+        self._cycles.add(call)
+        call.add_done_callback(self._cycles.discard)
+
+    async def async_broadcast_separator(self, subscriber: Subscriber, command: Command):
+        if subscriber.is_async:
+            await self._async_invoke(subscriber, command)
+        elif subscriber.loop_safe:
+            self._call_inline(subscriber, command)
         else:
-            func()
+            await self.async_run_executor_batch([(subscriber, command)])
+
+    def _timeout(self, subscriber: Subscriber) -> float:
+        return subscriber.timeout or self.handler_timeout
+
+    async def _async_invoke(self, subscriber: Subscriber, command: Command) -> None:
+        timeout = self._timeout(subscriber)
+        # a handler still busy with an earlier dispatch is not entered twice
+        async with subscriber.lock:
+            start = time.perf_counter()
+            call = asyncio.ensure_future(subscriber.invoke(command.argument))
+            await self._async_watch(call, timeout, lambda: (subscriber, command))
+            duration = time.perf_counter() - start
+            try:
+                call.result()
+            except Exception as e:
+                self._log_handler_error(subscriber, command, e)
+            self._report_duration(subscriber, command, duration, timed_out=duration > timeout)
+
+    async def async_run_executor_batch(self, batch: list[tuple[Subscriber, Command]]) -> None:
+        self.model.counters.executor_jobs += 1
+        self.model.counters.executor_calls += len(batch)
+        durations: list[float] = []
+        # each handler of the batch is held like an async one, other batches only wait for the handlers they share
+        locks = {id(subscriber.lock): subscriber.lock for subscriber, _ in batch}
+        async with AsyncExitStack() as stack:
+            for key in sorted(locks):
+                await stack.enter_async_context(locks[key])
+            job = asyncio.ensure_future(self._async_run_in_executor(self._run_batch, batch, durations))
+            await self._async_watch(
+                job, sum(self._timeout(s) for s, _ in batch), lambda: batch[min(len(durations), len(batch) - 1)]
+            )
+            job.result()
+        for (subscriber, command), duration in zip(batch, durations):
+            self._report_duration(subscriber, command, duration, timed_out=duration > self._timeout(subscriber))
+
+    def _run_batch(self, batch: list[tuple[Subscriber, Command]], durations: list[float]) -> None:
+        for subscriber, command in batch:
+            start = time.perf_counter()
+            self._call_subscriber(subscriber, command)
+            durations.append(time.perf_counter() - start)
 
     @staticmethod
-    async def async_call_func(func: Callable, command: Command) -> None:
+    async def _async_watch(call: asyncio.Future, timeout: float, running: Callable) -> None:
+        """Waits for call without ever cancelling it, the handler running at timeout is logged once."""
+        done, _ = await asyncio.wait({call}, timeout=timeout)
+        if not done:
+            subscriber, command = running()
+            _LOGGER.warning(f"{subscriber.name} is still running on {command.command} after {timeout:.2f}s")
+            await asyncio.wait({call})
+
+    def _call_inline(self, subscriber: Subscriber, command: Command) -> None:
+        self.model.counters.inline_calls += 1
+        start = time.perf_counter()
+        self._call_subscriber(subscriber, command)
+        self._report_duration(subscriber, command, time.perf_counter() - start)
+
+    def _call_subscriber(self, subscriber: Subscriber, command: Command) -> None:
         try:
-            if command.argument is not None:
-                if isinstance(command.argument, dict):
-                    try:
-                        await func(**command.argument)
-                    except TypeError:
-                        await func()
-                else:
-                    try:
-                        await func(command.argument)
-                    except TypeError:
-                        await func()
-            else:
-                await func()
+            subscriber.invoke(command.argument)
         except Exception as e:
-            _LOGGER.error(f"async_call_func for {func} with command {command}: {e}")
+            self._log_handler_error(subscriber, command, e)
+
+    def _report_duration(self, subscriber: Subscriber, command: Command, duration: float, timed_out: bool = False) -> None:
+        if timed_out:
+            _LOGGER.warning(f"{subscriber.name} ran past its timeout on {command.command}: {duration:.2f}s")
+        elif duration > SLOW_HANDLER_THRESHOLD:
+            _LOGGER.warning(f"{subscriber.name} was slow on {command.command}: {duration:.2f}s")
+        if self.metrics is not None:
+            queue_wait = time.time() - duration - command.created if command.created is not None else None
+            self.metrics.record_handler(subscriber.name, command.command, duration, queue_wait, timed_out)
+        if self.recorder is not None:
+            self.recorder.handler(subscriber.name, command, duration)
+
+    @staticmethod
+    def _log_handler_error(subscriber: Subscriber, command: Command, e: Exception) -> None:
+        _LOGGER.error(f"{subscriber.name} failed on {command.command} with {command.argument}: {e}")
+
+    @staticmethod
+    def _is_loop_safe(func: Callable) -> bool:
+        return False
+
+    async def _async_run_in_executor(self, func: Callable, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    def _create_task(self, coro) -> asyncio.Task:
+        return asyncio.get_running_loop().create_task(coro)
 
     # async def async_ok_to_broadcast(self, command: Command) -> bool:
     #     if command not in self.model.wait_queue.keys():
@@ -1,13 +1,28 @@
 from dataclasses import dataclass
+import time
 
 from peaqevcore.common.models.observer_types import ObserverTypes
 
+from custom_components.peaqhvac.service.observer.models.priority import Priority
+
+
+def make_hashable(obj):
+    if isinstance(obj, (tuple, list)):
+        return tuple(make_hashable(e) for e in obj)
+    if isinstance(obj, dict):
+        return tuple(sorted((k, make_hashable(v)) for k, v in obj.items()))
+    if isinstance(obj, set):
+        return tuple(sorted(make_hashable(e) for e in obj))
+    return obj
+
 
 @dataclass
 class Command:
     command: ObserverTypes
     expiration: float = None
     argument: any = None
+    created: float = None
+    priority: Priority = Priority.Recalculation
 
     def __eq__(self, other):
         if all([self.command == other.command, self.argument == other.argument]):
@@ -15,14 +30,19 @@ class Command:
         return False
 
     def __hash__(self):
-        def make_hashable(obj):
-            if isinstance(obj, (tuple, list)):
-                return tuple(make_hashable(e) for e in obj)
-            if isinstance(obj, dict):
-                return tuple(sorted((k, make_hashable(v)) for k, v in obj.items()))
-            if isinstance(obj, set):
-                return tuple(sorted(make_hashable(e) for e in obj))
-            return obj
-
         return hash((self.command, make_hashable(self.argument)))
 
+    @property
+    def coalesce_key(self):
+        """
+        Queued commands with the same key collapse into the latest argument.
+        Tuple-arguments are (target, value) throughout peaqhvac, so those coalesce per target.
+        """
+        if isinstance(self.argument, tuple) and len(self.argument) == 2:
+            return self.command, make_hashable(self.argument[0])
+        return self.command
+
+    def is_expired(self, now: float = None) -> bool:
+        if self.expiration is None:
+            return False
+        return (now or time.time()) > self.expiration
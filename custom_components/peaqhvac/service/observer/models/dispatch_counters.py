@@ -0,0 +1,29 @@
+import time
+from dataclasses import dataclass, field
+
+
+@dataclass
+class DispatchCounters:
+    """Sync handler calls, and how many executor jobs they actually needed."""
+    inline_calls: int = 0
+    suppressed_calls: int = 0
+    executor_calls: int = 0
+    executor_jobs: int = 0
+    started: float = field(default_factory=time.time)
+
+    @property
+    def executor_jobs_saved(self) -> int:
+        """Every sync call used to be its own executor job"""
+        return self.inline_calls + self.executor_calls - self.executor_jobs
+
+    @property
+    def executor_jobs_saved_per_hour(self) -> float:
+        hours = max(time.time() - self.started, 1) / 3600
+        return round(self.executor_jobs_saved / hours, 1)
+
+    def reset(self) -> None:
+        self.inline_calls = 0
+        self.suppressed_calls = 0
+        self.executor_calls = 0
+        self.executor_jobs = 0
+        self.started = time.time()
@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class DispatchPolicy:
+    """
+    How often a subscriber may be called, declared when subscribing.
+    debounce: seconds of quiet to wait for before calling, every new dispatch restarts the wait.
+    max_rate: at most this many calls per second.
+    trailing: deliver the latest held back dispatch at the end of the window instead of dropping it.
+    """
+    debounce: float = 0
+    max_rate: float | None = None
+    trailing: bool = True
+
+    @property
+    def min_interval(self) -> float:
+        return 1 / self.max_rate if self.max_rate else 0
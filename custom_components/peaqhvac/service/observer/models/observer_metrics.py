@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import bisect
+import heapq
+import itertools
+import time
+from dataclasses import dataclass, field
+
+HISTOGRAM_BOUNDS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000, 10000)
+SLOWEST_DISPATCHES = 20
+SLOWEST_WINDOW = 3600
+
+
+@dataclass
+class CommandStats:
+    broadcasts: int = 0
+    coalesced: int = 0
+    dispatched: int = 0
+    dropped: int = 0
+
+
+@dataclass
+class Histogram:
+    """Counts per upper bound in milliseconds, the last bucket holds everything above the highest bound."""
+    counts: list[int] = field(default_factory=lambda: [0] * (len(HISTOGRAM_BOUNDS_MS) + 1))
+    total: float = 0
+    samples: int = 0
+    max: float = 0
+
+    def record(self, seconds: float) -> None:
+        ms = seconds * 1000
+        self.counts[bisect.bisect_left(HISTOGRAM_BOUNDS_MS, ms)] += 1
+        self.total += ms
+        self.samples += 1
+        self.max = max(self.max, ms)
+
+    def as_dict(self) -> dict:
+        buckets = {f"<={b}ms": c for b, c in zip(HISTOGRAM_BOUNDS_MS, self.counts)}
+        buckets[f">{HISTOGRAM_BOUNDS_MS[-1]}ms"] = self.counts[-1]
+        return {
+            "samples": self.samples,
+            "mean_ms": round(self.total / self.samples, 2) if self.samples else 0,
+            "max_ms": round(self.max, 2),
+            "buckets": buckets,
+        }
+
+
+@dataclass
+class ObserverMetrics:
+    """Collected by IObserver only while enabled."""
+    commands: dict[str, CommandStats] = field(default_factory=lambda: {})
+    queue_wait: Histogram = field(default_factory=Histogram)
+    handler_duration: Histogram = field(default_factory=Histogram)
+    started: float = field(default_factory=time.time)
+    _slowest: list[tuple[float, int, dict]] = field(default_factory=lambda: [])
+    _sequence: itertools.count = field(default_factory=itertools.count)
+
+    def command(self, command) -> CommandStats:
+        key = str(command)
+        stats = self.commands.get(key)
+        if stats is None:
+            stats = self.commands[key] = CommandStats()
+        return stats
+
+    def record_handler(self, handler: str, command, duration: float, queue_wait: float | None, timed_out: bool = False) -> None:
+        self.handler_duration.record(duration)
+        if len(self._slowest) >= SLOWEST_DISPATCHES and duration <= self._slowest[0][0]:
+            return
+        entry = {
+            "handler": handler,
+            "command": str(command),
+            "duration_ms": round(duration * 1000, 2),
+            "queue_wait_ms": round(queue_wait * 1000, 2) if queue_wait is not None else None,
+            "timed_out": timed_out,
+            "at": time.time(),
+        }
+        item = (duration, next(self._sequence), entry)
+        if len(self._slowest) < SLOWEST_DISPATCHES:
+            heapq.heappush(self._slowest, item)
+        else:
+            heapq.heapreplace(self._slowest, item)
+
+    def slowest(self, now: float | None = None) -> list[dict]:
+        """The slowest handler calls of the last SLOWEST_WINDOW seconds, slowest first."""
+        cutoff = (now or time.time()) - SLOWEST_WINDOW
+        self._slowest = [s for s in self._slowest if s[2]["at"] >= cutoff]
+        heapq.heapify(self._slowest)
+        return [s[2] for s in sorted(self._slowest, reverse=True)]
+
+    def as_dict(self) -> dict:
+        return {
+            "since": self.started,
+            "commands": {k: vars(v).copy() for k, v in self.commands.items()},
+            "queue_wait": self.queue_wait.as_dict(),
+            "handler_duration": self.handler_duration.as_dict(),
+            "slowest": self.slowest(),
+        }
@@ -1,10 +1,19 @@
 from dataclasses import dataclass, field
+from custom_components.peaqhvac.service.observer.const import COMMAND_PRIORITIES
 from custom_components.peaqhvac.service.observer.models.command import Command
+from custom_components.peaqhvac.service.observer.models.dispatch_counters import DispatchCounters
+from custom_components.peaqhvac.service.observer.models.priority import Priority
 
 @dataclass
 class ObserverModel:
     subscribers: dict = field(default_factory=lambda: {})
-    broadcast_queue: list[Command] = field(default_factory=lambda: [])
+    broadcast_queue: dict[any, Command] = field(default_factory=lambda: {})
     wait_queue: dict[Command, float] = field(default_factory=lambda: {})
     dispatch_delay_queue: dict[Command,float] = field(default_factory=lambda: {})
+    dispatch_delay_heap: list[tuple[float, int, Command]] = field(default_factory=lambda: [])
+    lanes: dict[Priority, dict] = field(default_factory=lambda: {p: {} for p in Priority})
+    priorities: dict = field(default_factory=lambda: dict(COMMAND_PRIORITIES))
+    lane_passed_over: dict[Priority, int] = field(default_factory=lambda: {})
+    ordered_commands: set = field(default_factory=lambda: set())
+    counters: DispatchCounters = field(default_factory=DispatchCounters)
     active: bool = False
@@ -0,0 +1,8 @@
+from enum import IntEnum
+
+
+class Priority(IntEnum):
+    """Dispatch lanes of the observer, lower values are drained first."""
+    Control = 0
+    Recalculation = 1
+    Telemetry = 2
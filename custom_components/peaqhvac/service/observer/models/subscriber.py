@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import asyncio
+import inspect
+from dataclasses import dataclass, field
+from enum import Enum
+from functools import partial
+from typing import Callable
+
+from custom_components.peaqhvac.extensionmethods import iscoroutine_function
+from custom_components.peaqhvac.service.observer.models.dispatch_policy import \
+    DispatchPolicy
+
+
+class CallShape(Enum):
+    NoArgument = 0
+    Positional = 1
+    Keywords = 2
+
+
+@dataclass(frozen=True)
+class Subscriber:
+    """A handler resolved once at subscription, so dispatch never has to inspect or retry it."""
+    func: Callable
+    name: str
+    is_async: bool
+    shape: CallShape
+    invoke: Callable
+    loop_safe: bool = False
+    timeout: float | None = None
+    policy: DispatchPolicy | None = None
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock, compare=False, repr=False)
+
+    @classmethod
+    def create(
+        cls,
+        func: Callable,
+        loop_safe: bool = False,
+        timeout: float | None = None,
+        policy: DispatchPolicy | None = None,
+        lock: asyncio.Lock | None = None,
+    ) -> Subscriber:
+        """
+        loop_safe marks a sync handler as cheap enough to run inline on the event loop.
+        timeout overrides the observer's handler timeout for this subscription.
+        policy debounces or throttles the calls to the handler.
+        lock is shared by the subscriptions of the same handler, a new one is made when it is not given.
+        """
+        shape = cls._get_call_shape(func)
+        return cls(
+            func=func,
+            name=cls._get_name(func),
+            is_async=iscoroutine_function(func),
+            shape=shape,
+            invoke=cls._compile(func, shape),
+            loop_safe=loop_safe,
+            timeout=timeout,
+            policy=policy,
+            lock=asyncio.Lock() if lock is None else lock,
+        )
+
+    @staticmethod
+    def _get_call_shape(func: Callable) -> CallShape:
+        try:
+            params = inspect.signature(func).parameters.values()
+        except (TypeError, ValueError):
+            return CallShape.Positional
+        named = [p for p in params if p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD)]
+        if len(named) > 1 or any(p.kind in (p.KEYWORD_ONLY, p.VAR_KEYWORD) for p in params):
+            return CallShape.Keywords
+        if named or any(p.kind is p.VAR_POSITIONAL for p in params):
+            return CallShape.Positional
+        return CallShape.NoArgument
+
+    @staticmethod
+    def _compile(func: Callable, shape: CallShape) -> Callable:
+        match shape:
+            case CallShape.NoArgument:
+                return lambda argument: func()
+            case CallShape.Positional:
+                return lambda argument: func() if argument is None else func(argument)
+            case CallShape.Keywords:
+                def _invoke(argument):
+                    if isinstance(argument, dict):
+                        return func(**argument)
+                    return func() if argument is None else func(argument)
+                return _invoke
+
+    @staticmethod
+    def _get_name(func: Callable) -> str:
+        while isinstance(func, partial):
+            func = func.func
+        return getattr(func, "__qualname__", repr(func))
@@ -1,12 +1,13 @@
 from __future__ import annotations
 
+import asyncio
 import logging
-from datetime import timedelta
+from functools import partial
+from typing import Callable
+
+from homeassistant.core import is_callback
 
-from homeassistant.helpers.event import async_track_time_interval
 from custom_components.peaqhvac.service.observer.iobserver_coordinator import IObserver
-from custom_components.peaqhvac.service.observer.models.command import Command
-from custom_components.peaqhvac.extensionmethods import async_iscoroutine
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -15,14 +16,20 @@ class Observer(IObserver):
     def __init__(self, hass):
         super().__init__()
         self.hass = hass
-        async_track_time_interval(
-            self.hass, self.async_dispatch, timedelta(seconds=1)
+        self._loop = hass.loop
+        self._dispatcher = hass.async_create_background_task(
+            self.async_run_dispatcher(), "peaqhvac_observer_dispatcher"
         )
 
-    async def async_broadcast_separator(self, func, command: Command):
-        if await async_iscoroutine(func):
-            await self.async_call_func(func=func, command=command),
-        else:
-            await self.hass.async_add_executor_job(
-                self._call_func, func, command
-            )
+    async def _async_run_in_executor(self, func: Callable, *args):
+        return await self.hass.async_add_executor_job(func, *args)
+
+    def _create_task(self, coro) -> asyncio.Task:
+        return self.hass.async_create_background_task(coro, "peaqhvac_observer_dispatch")
+
+    @staticmethod
+    def _is_loop_safe(func: Callable) -> bool:
+        """Sync handlers decorated with @callback run inline on the event loop."""
+        while isinstance(func, partial):
+            func = func.func
+        return is_callback(func)
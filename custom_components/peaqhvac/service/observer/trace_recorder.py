@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from enum import Enum
+
+from custom_components.peaqhvac.service.observer.models.command import (
+    Command, make_hashable)
+
+TRACE_FLUSH_RECORDS = 200
+TRACE_DIR = "peaqhvac_traces"
+DEFAULT_TRACE_FILE = "peaqhvac_observer_trace.jsonl"
+
+
+def command_name(command) -> str:
+    return command.value if isinstance(command, Enum) else command
+
+
+def trace_filename(filename: str | None) -> str:
+    """A bare file name for a trace in TRACE_DIR, anything with a directory in it is refused."""
+    filename = filename or DEFAULT_TRACE_FILE
+    if os.path.basename(filename) != filename or filename in (".", ".."):
+        raise ValueError(f"Trace filename must be a plain file name, got {filename}")
+    return filename
+
+
+def argument_digest(argument) -> str | None:
+    if argument is None:
+        return None
+    return hashlib.blake2b(repr(make_hashable(argument)).encode(), digest_size=6).hexdigest()
+
+
+class TraceRecorder:
+    """
+    Collects observer traffic as json lines, one record per line and appended in batches.
+    Records are {"k": kind, "t": timestamp, "c": command, "a": argument digest}, where kind is
+    b(roadcast), d(ispatch) with "w" queue wait in ms, or h(andler) with "h" name and "ms" duration.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._buffer: list[str] = []
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def broadcast(self, command: Command) -> None:
+        self._add({"k": "b", "t": round(command.created or time.time(), 4), "c": command_name(command.command),
+                   "a": argument_digest(command.argument), "p": int(command.priority)})
+
+    def dispatch(self, command: Command, now: float) -> None:
+        record = {"k": "d", "t": round(now, 4), "c": command_name(command.command), "a": argument_digest(command.argument)}
+        if command.created is not None:
+            record["w"] = round((now - command.created) * 1000, 2)
+        self._add(record)
+
+    def handler(self, name: str, command: Command, duration: float) -> None:
+        self._add({"k": "h", "t": round(time.time(), 4), "c": command_name(command.command), "h": name,
+                   "ms": round(duration * 1000, 2)})
+
+    def take(self) -> list[str]:
+        """Call on the event loop, hand the lines to write."""
+        lines, self._buffer = self._buffer, []
+        return lines
+
+    def write(self, lines: list[str]) -> None:
+        """Blocking, run it in the executor."""
+        if not lines:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def _add(self, record: dict) -> None:
+        self._buffer.append(json.dumps(record, separators=(",", ":")))
+
+    @staticmethod
+    def read(path: str) -> list[dict]:
+        with open(path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
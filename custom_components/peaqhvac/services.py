@@ -1,4 +1,5 @@
 from custom_components.peaqhvac import DOMAIN
+from custom_components.peaqhvac.service.observer.trace_recorder import TRACE_DIR, trace_filename
 
 
 async def async_setup_services(hass, hub) -> None:
@@ -16,6 +17,17 @@ async def async_setup_services(hass, hub) -> None:
             hub.observer.broadcast("water_boost_start", target)
 
 
+    async def servicehandler_start_observer_trace(call):
+        filename = trace_filename(call.data.get("filename"))
+        await hub.observer.async_start_recording(hass.config.path(TRACE_DIR, filename))
+
+
+    async def servicehandler_stop_observer_trace(call):  # pylint:disable=unused-argument
+        await hub.observer.async_stop_recording()
+
+
     hass.services.async_register(DOMAIN, "enable", servicehandler_enable)
     hass.services.async_register(DOMAIN, "disable", servicehandler_disable)
     hass.services.async_register(DOMAIN, "boost_water", servicehandler_boost_water)
+    hass.services.async_register(DOMAIN, "start_observer_trace", servicehandler_start_observer_trace)
+    hass.services.async_register(DOMAIN, "stop_observer_trace", servicehandler_stop_observer_trace)
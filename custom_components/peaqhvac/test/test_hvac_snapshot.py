@@ -0,0 +1,125 @@
+import dataclasses
+import time
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from ..service.hvac.hvactypes.nibe import Nibe
+from ..service.models.enums.hvacmode import HvacMode
+from ..service.models.enums.sensortypes import SensorType
+from ..service.models.tick_snapshot import TickSnapshot
+
+
+class FakeStates:
+    def __init__(self, states: dict):
+        self.states = states
+        self.reads = 0
+
+    def get(self, entity_id):
+        self.reads += 1
+        if entity_id not in self.states:
+            return None
+        return _state(self.states[entity_id])
+
+
+def _state(value, updated: float = None):
+    return SimpleNamespace(state=value, attributes={}, last_updated_timestamp=updated or time.time())
+
+
+def _event(entity_id, value, updated: float = None):
+    return SimpleNamespace(data={"entity_id": entity_id, "new_state": _state(value, updated)})
+
+
+def _nibe(states: dict) -> tuple[Nibe, FakeStates]:
+    fake = FakeStates(states)
+    hub = MagicMock()
+    hub.options.systemid = "123"
+    hub.options.heating.water_planner = None
+    nibe = Nibe(hass=SimpleNamespace(states=fake), hub=hub, observer=MagicMock())
+    for entity_id in nibe.state_cache.entities:
+        nibe._update_state(entity_id, fake.get(entity_id))
+    return nibe, fake
+
+
+def test_sensor_map_is_formatted_once_per_brand():
+    nibe, _ = _nibe({})
+    assert nibe.get_sensor(SensorType.HvacMode) == "sensor.123_priority"
+    assert "number.123_current_value" in nibe.get_sensor()
+    assert nibe.get_sensor() is nibe.get_sensor()
+
+
+def test_snapshot_parses_every_entity():
+    nibe, _ = _nibe({
+        "sensor.123_priority": "Hot water",
+        "number.123_current_value": "-250.0",
+        "sensor.123_supply_line_bt2": "35.5",
+        "sensor.123_return_line_bt3": "30.25",
+        "sensor.123_int_elec_add_heat": "Active",
+        "number.123_start_compressor": "-60",
+        "sensor.123_current_fan_mode": "unavailable",
+    })
+    assert nibe.hvac_mode is HvacMode.Water
+    assert nibe.hvac_dm == -250
+    assert nibe.delta_return_temp == 5.25
+    assert nibe.hvac_electrical_addon is True
+    assert nibe.hvac_compressor_start == -60
+    assert nibe.fan_speed == 0
+    assert nibe.model.hvac_dm == -250
+
+
+def test_reads_do_not_touch_the_state_machine():
+    nibe, fake = _nibe({"number.123_current_value": "-100"})
+    reads = fake.reads
+    snapshot = nibe.snapshot
+    for _ in range(5):
+        assert nibe.hvac_dm == -100
+        assert nibe.delta_return_temp == 0
+        assert nibe.hvac_electrical_addon is False
+    assert fake.reads == reads
+    assert nibe.snapshot is snapshot
+
+
+def test_state_change_updates_only_the_changed_value():
+    nibe, _ = _nibe({"number.123_current_value": "-100", "sensor.123_supply_line_bt2": "30"})
+    version = nibe.state_cache.version
+    nibe._async_on_state_change(_event("sensor.123_supply_line_bt2", "30.0"))
+    assert nibe.state_cache.version == version
+    nibe._async_on_state_change(_event("number.123_current_value", "-200"))
+    assert nibe.hvac_dm == -200
+    assert nibe.model.hvac_dm == -200
+    assert nibe.snapshot.version == version + 1
+
+
+def test_unavailable_values_are_stale_instead_of_zero():
+    nibe, _ = _nibe({"number.123_current_value": "-100"})
+    assert not nibe.is_stale(SensorType.DegreeMinutes)
+    assert nibe.is_stale(SensorType.WaterTemp)
+    nibe._async_on_state_change(_event("number.123_current_value", "unavailable"))
+    assert nibe.is_stale(SensorType.DegreeMinutes)
+    assert nibe.state_cache.values[SensorType.DegreeMinutes] is None
+    assert nibe.model.hvac_dm == -100
+
+
+def test_values_older_than_max_age_are_stale():
+    nibe, _ = _nibe({})
+    nibe._async_on_state_change(_event("number.123_current_value", "-100", updated=time.time() - 600))
+    assert 599 < nibe.state_cache.age(SensorType.DegreeMinutes) < 700
+    assert not nibe.is_stale(SensorType.DegreeMinutes)
+    assert nibe.is_stale(SensorType.DegreeMinutes, max_age=300)
+
+
+@pytest.mark.asyncio
+async def test_tick_compares_the_offset_with_the_hvac_values_of_the_tick():
+    nibe, fake = _nibe({"number.123_heating_offset_climate_system_1": "0"})
+    nibe.hub.sensors.peaqev_installed = False
+    nibe.observer = AsyncMock()
+    nibe.house_heater = MagicMock(async_adjusted_offset=AsyncMock(return_value=(2, False)))
+    snapshot = TickSnapshot(now=datetime.now(), hvac=dataclasses.replace(nibe.snapshot, offset=2))
+    reads = fake.reads
+    await nibe.async_receive_temperature_change(snapshot)
+    assert fake.reads == reads
+    nibe.observer.async_broadcast.assert_not_called()
+    await nibe.async_receive_temperature_change()
+    assert nibe.observer.async_broadcast.await_count == 2
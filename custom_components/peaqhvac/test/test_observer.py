@@ -0,0 +1,613 @@
+import asyncio
+import time
+
+import pytest
+from peaqevcore.common.models.observer_types import ObserverTypes
+
+from ..service.observer import iobserver_coordinator
+from ..service.observer.iobserver_coordinator import IObserver
+from ..service.observer.models.command import Command
+from ..service.observer.models.dispatch_policy import DispatchPolicy
+from ..service.observer.models.priority import Priority
+from ..service.observer.models.subscriber import CallShape, Subscriber
+from ..service.observer.trace_recorder import TraceRecorder, argument_digest, trace_filename
+
+
+class HeadlessObserver(IObserver):
+    async def _async_run_in_executor(self, func, *args):
+        return func(*args)
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_broadcast_is_dispatched_without_polling():
+    observer = HeadlessObserver()
+    observer.start(asyncio.get_running_loop())
+    received = asyncio.Event()
+
+    async def handler(val):
+        received.set()
+
+    observer.add("test command", handler)
+    start = time.perf_counter()
+    observer.broadcast("test command", 1)
+    await asyncio.wait_for(received.wait(), timeout=0.5)
+    assert time.perf_counter() - start < 0.1
+    assert not observer.model.broadcast_queue
+    observer.stop()
+
+
+@pytest.mark.asyncio
+async def test_identical_broadcast_within_delay_is_dropped():
+    observer = HeadlessObserver()
+    observer.start(asyncio.get_running_loop())
+    calls = []
+    observer.add("test command", lambda val: calls.append(val))
+    observer.broadcast("test command", 1)
+    await _settle()
+    observer.broadcast("test command", 1)
+    await _settle()
+    observer.broadcast("test command", 2)
+    await _settle()
+    assert calls == [1, 2]
+    observer.stop()
+
+
+@pytest.mark.asyncio
+async def test_late_subscriber_receives_queued_command():
+    observer = HeadlessObserver()
+    observer.start(asyncio.get_running_loop())
+    calls = []
+    observer.broadcast("test command", 1)
+    await _settle()
+    assert calls == []
+    observer.add("test command", lambda val: calls.append(val))
+    await _settle()
+    assert calls == [1]
+    observer.stop()
+
+
+@pytest.mark.asyncio
+async def test_queued_commands_coalesce_into_latest_argument():
+    observer = HeadlessObserver()
+    calls = []
+    observer.add("test command", lambda val: calls.append(val))
+    for i in range(1000):
+        observer.broadcast("test command", i)
+    assert len(observer.model.broadcast_queue) == 1
+    await observer.async_dispatch()
+    assert calls == [999]
+
+
+@pytest.mark.asyncio
+async def test_tuple_arguments_coalesce_per_target():
+    observer = HeadlessObserver()
+    calls = []
+    observer.add("update operation", lambda val: calls.append(val))
+    observer.broadcast("update operation", ("offset", 1))
+    observer.broadcast("update operation", ("ventboost", 1))
+    observer.broadcast("update operation", ("offset", 2))
+    await observer.async_dispatch()
+    assert calls == [("offset", 2), ("ventboost", 1)]
+
+
+@pytest.mark.asyncio
+async def test_expired_commands_are_dropped(monkeypatch):
+    observer = HeadlessObserver()
+    observer.broadcast("test command", 1)
+    now = time.time()
+    monkeypatch.setattr(iobserver_coordinator.time, "time", lambda: now + iobserver_coordinator.COMMAND_VALIDITY + 1)
+    calls = []
+    observer.add("test command", lambda val: calls.append(val))
+    await observer.async_dispatch()
+    assert calls == []
+    assert not observer.model.broadcast_queue
+
+
+@pytest.mark.asyncio
+async def test_dispatch_delay_is_evicted_after_timeout(monkeypatch):
+    observer = HeadlessObserver()
+    calls = []
+    observer.add("test command", lambda val: calls.append(val))
+    observer.broadcast("test command", 1)
+    await observer.async_dispatch()
+    observer.broadcast("test command", 1)
+    await observer.async_dispatch()
+    assert calls == [1]
+    now = time.time()
+    monkeypatch.setattr(iobserver_coordinator.time, "time", lambda: now + iobserver_coordinator.DISPATCH_DELAY_TIMEOUT + 1)
+    observer.broadcast("test command", 1)
+    await observer.async_dispatch()
+    assert calls == [1, 1]
+    assert len(observer.model.dispatch_delay_heap) == 1
+
+
+def test_subscriber_call_shapes_are_resolved_once():
+    class Handler:
+        def none(self):
+            pass
+
+        def positional(self, val=None):
+            pass
+
+        async def keywords(self, a, b):
+            pass
+
+    h = Handler()
+    assert Subscriber.create(h.none).shape is CallShape.NoArgument
+    assert Subscriber.create(h.positional).shape is CallShape.Positional
+    assert Subscriber.create(lambda *args: None).shape is CallShape.Positional
+    keywords = Subscriber.create(h.keywords)
+    assert keywords.shape is CallShape.Keywords
+    assert keywords.is_async
+    assert keywords.name == "test_subscriber_call_shapes_are_resolved_once.<locals>.Handler.keywords"
+
+
+@pytest.mark.asyncio
+async def test_argument_is_not_passed_to_handler_without_parameters():
+    observer = HeadlessObserver()
+    calls = []
+    observer.add("test command", lambda: calls.append("called"))
+    observer.broadcast("test command", 1)
+    await observer.async_dispatch()
+    assert calls == ["called"]
+
+
+@pytest.mark.asyncio
+async def test_dict_argument_is_passed_as_keywords():
+    observer = HeadlessObserver()
+    calls = []
+
+    async def handler(a, b):
+        calls.append((a, b))
+
+    observer.add("test command", handler)
+    observer.broadcast("test command", {"a": 1, "b": 2})
+    await observer.async_dispatch()
+    assert calls == [(1, 2)]
+
+
+@pytest.mark.asyncio
+async def test_failing_handler_is_not_retried():
+    observer = HeadlessObserver()
+    calls = []
+
+    def handler(val=None):
+        calls.append(val)
+        raise TypeError("real error")
+
+    observer.add("test command", handler)
+    observer.broadcast("test command", 1)
+    await observer.async_dispatch()
+    assert calls == [1]
+
+
+@pytest.mark.asyncio
+async def test_loop_safe_handlers_run_inline():
+    observer = HeadlessObserver()
+    calls = []
+    observer.add("test command", lambda val: calls.append(val), loop_safe=True)
+    observer.broadcast("test command", 1)
+    await observer.async_dispatch()
+    assert calls == [1]
+    assert observer.model.counters.inline_calls == 1
+    assert observer.model.counters.executor_jobs == 0
+
+
+@pytest.mark.asyncio
+async def test_blocking_handlers_share_one_executor_job_per_cycle():
+    observer = HeadlessObserver()
+    calls = []
+    observer.add("first command", lambda val: calls.append(val))
+    observer.add("second command", lambda val: calls.append(val))
+    observer.add("second command", lambda val: calls.append(val * 10))
+    observer.broadcast("first command", 1)
+    observer.broadcast("second command", 2)
+    await observer.async_dispatch()
+    assert calls == [1, 2, 20]
+    assert observer.model.counters.executor_jobs == 1
+    assert observer.model.counters.executor_calls == 3
+    assert observer.model.counters.executor_jobs_saved == 2
+
+
+@pytest.mark.asyncio
+async def test_subscribers_of_a_command_run_concurrently():
+    observer = HeadlessObserver()
+    started = []
+
+    async def first(val):
+        started.append("first")
+        await asyncio.sleep(0.2)
+
+    async def second(val):
+        started.append("second")
+        await asyncio.sleep(0.2)
+
+    observer.add("test command", first)
+    observer.add("test command", second)
+    observer.broadcast("test command", 1)
+    start = time.perf_counter()
+    await observer.async_dispatch()
+    assert time.perf_counter() - start < 0.35
+    assert started == ["first", "second"]
+
+
+@pytest.mark.asyncio
+async def test_timed_out_handler_is_reported_but_not_cancelled(caplog):
+    observer = HeadlessObserver(handler_timeout=0.05)
+    calls = []
+
+    async def hanging(val):
+        await asyncio.sleep(0.2)
+        calls.append("hanging")
+
+    async def quick(val):
+        calls.append("quick")
+
+    observer.add("test command", hanging)
+    observer.add("test command", quick)
+    observer.broadcast("test command", 1)
+    await observer.async_dispatch()
+    assert calls == ["quick", "hanging"]
+    assert "hanging is still running on test command after 0.05s" in caplog.text
+    assert "hanging ran past its timeout on test command: 0.2" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_timed_out_sync_handler_is_reported_but_not_cancelled(caplog):
+    observer = IObserver(handler_timeout=0.05)
+    calls = []
+
+    def quick(val):
+        calls.append("quick")
+
+    def hanging(val):
+        time.sleep(0.2)
+        calls.append("hanging")
+
+    observer.add("test command", quick)
+    observer.add("test command", hanging)
+    observer.broadcast("test command", 1)
+    await observer.async_dispatch()
+    assert calls == ["quick", "hanging"]
+    assert "hanging is still running on test command after 0.10s" in caplog.text
+    assert "hanging ran past its timeout on test command: 0.2" in caplog.text
+    assert "quick ran past" not in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_executor_batches_wait_only_for_shared_handlers():
+    observer = IObserver()
+    started = []
+
+    def slow(val):
+        started.append(("slow", val))
+        time.sleep(0.2)
+
+    def other(val):
+        started.append(("other", val))
+
+    observer.add("slow command", slow)
+    observer.add("other command", other)
+    subscribers = observer.model.subscribers
+    first = asyncio.ensure_future(
+        observer.async_run_executor_batch([(subscribers["slow command"][0], Command("slow command", argument=1))])
+    )
+    await asyncio.sleep(0.05)
+    start = time.perf_counter()
+    await observer.async_run_executor_batch([(subscribers["other command"][0], Command("other command", argument=2))])
+    assert time.perf_counter() - start < 0.1
+    await first
+    assert started == [("slow", 1), ("other", 2)]
+
+
+@pytest.mark.asyncio
+async def test_subscription_timeout_overrides_observer_timeout():
+    observer = HeadlessObserver(handler_timeout=0.01)
+    calls = []
+
+    async def handler(val):
+        await asyncio.sleep(0.05)
+        calls.append(val)
+
+    observer.add("test command", handler, timeout=1)
+    observer.broadcast("test command", 1)
+    await observer.async_dispatch()
+    assert calls == [1]
+
+
+@pytest.mark.asyncio
+async def test_slow_handler_is_reported_with_duration(caplog, monkeypatch):
+    monkeypatch.setattr(iobserver_coordinator, "SLOW_HANDLER_THRESHOLD", 0.01)
+    observer = HeadlessObserver()
+
+    def slow(val):
+        time.sleep(0.02)
+
+    observer.add("test command", slow)
+    observer.broadcast("test command", 1)
+    await observer.async_dispatch()
+    assert "slow was slow on test command: 0.0" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_ordered_command_runs_subscribers_in_sequence():
+    observer = HeadlessObserver()
+    calls = []
+
+    async def first(val):
+        await asyncio.sleep(0.05)
+        calls.append("first")
+
+    async def second(val):
+        calls.append("second")
+
+    observer.add("test command", first, ordered=True)
+    observer.add("test command", second)
+    observer.broadcast("test command", 1)
+    await observer.async_dispatch()
+    assert calls == ["first", "second"]
+
+
+@pytest.mark.asyncio
+async def test_slow_handler_does_not_hold_back_other_commands():
+    observer = HeadlessObserver()
+    observer.start(asyncio.get_running_loop())
+    received = asyncio.Event()
+
+    async def slow(val):
+        await asyncio.sleep(1)
+
+    async def quick(val):
+        received.set()
+
+    observer.add("slow command", slow)
+    observer.add("quick command", quick)
+    observer.broadcast("slow command", 1)
+    await _settle()
+    observer.broadcast("quick command", 1)
+    await asyncio.wait_for(received.wait(), timeout=0.5)
+    observer.stop()
+
+
+@pytest.mark.asyncio
+async def test_debounced_handler_is_called_once_across_commands():
+    observer = HeadlessObserver()
+    observer.start(asyncio.get_running_loop())
+    policy = DispatchPolicy(debounce=0.05)
+    calls = []
+
+    async def recalculate():
+        calls.append("recalculate")
+
+    observer.add("preset changed", recalculate, policy=policy)
+    observer.add("temperature changed", recalculate, policy=policy)
+    observer.broadcast("preset changed")
+    await _settle()
+    observer.broadcast("temperature changed")
+    await _settle()
+    assert calls == []
+    await asyncio.sleep(0.1)
+    assert calls == ["recalculate"]
+    assert observer.model.counters.suppressed_calls == 1
+    observer.stop()
+
+
+@pytest.mark.asyncio
+async def test_leading_edge_debounce_drops_the_burst():
+    observer = HeadlessObserver()
+    policy = DispatchPolicy(debounce=0.05, trailing=False)
+    calls = []
+    observer.add("test command", lambda val: calls.append(val), policy=policy, loop_safe=True)
+    for i in range(3):
+        observer.broadcast("test command", i)
+        await observer.async_dispatch()
+        await _settle()
+    assert calls == [0]
+
+
+@pytest.mark.asyncio
+async def test_throttled_handler_delivers_latest_on_trailing_edge():
+    observer = HeadlessObserver()
+    policy = DispatchPolicy(max_rate=20)
+    calls = []
+    observer.add("test command", lambda val: calls.append(val), policy=policy, loop_safe=True)
+    for i in range(3):
+        observer.broadcast("test command", i)
+        await observer.async_dispatch()
+        await _settle()
+    assert calls == [0]
+    await asyncio.sleep(0.07)
+    assert calls == [0, 2]
+
+
+@pytest.mark.asyncio
+async def test_throttled_handler_without_trailing_drops_within_interval():
+    observer = HeadlessObserver()
+    policy = DispatchPolicy(max_rate=20, trailing=False)
+    calls = []
+    observer.add("test command", lambda val: calls.append(val), policy=policy, loop_safe=True)
+    for i in range(3):
+        observer.broadcast("test command", i)
+        await observer.async_dispatch()
+        await _settle()
+    await asyncio.sleep(0.07)
+    assert calls == [0]
+
+
+@pytest.mark.asyncio
+async def test_metrics_are_not_collected_unless_enabled():
+    observer = HeadlessObserver()
+    observer.add("test command", lambda val: None, loop_safe=True)
+    observer.broadcast("test command", 1)
+    await observer.async_dispatch()
+    assert observer.metrics is None
+    assert observer.diagnostics()["metrics"] is None
+
+
+@pytest.mark.asyncio
+async def test_metrics_count_broadcasts_coalesced_dispatched_and_dropped():
+    observer = HeadlessObserver()
+    observer.enable_metrics()
+    observer.add("test command", lambda val: None, loop_safe=True)
+    observer.broadcast("test command", 1)
+    observer.broadcast("test command", 2)
+    await observer.async_dispatch()
+    observer.broadcast("test command", 2)
+    metrics = observer.diagnostics()["metrics"]
+    assert metrics["commands"]["test command"] == {"broadcasts": 3, "coalesced": 1, "dispatched": 1, "dropped": 1}
+    assert metrics["queue_wait"]["samples"] == 1
+    assert metrics["handler_duration"]["samples"] == 1
+
+
+@pytest.mark.asyncio
+async def test_slowest_dispatches_are_bounded_and_sorted():
+    from ..service.observer.models import observer_metrics
+    observer = HeadlessObserver()
+    observer.enable_metrics()
+    for i in range(observer_metrics.SLOWEST_DISPATCHES * 2):
+        observer.metrics.record_handler("handler", "test command", i / 1000, 0)
+    slowest = observer.metrics.slowest()
+    assert len(slowest) == observer_metrics.SLOWEST_DISPATCHES
+    assert slowest[0]["duration_ms"] == (observer_metrics.SLOWEST_DISPATCHES * 2 - 1)
+    assert slowest[-1]["duration_ms"] == observer_metrics.SLOWEST_DISPATCHES
+
+
+@pytest.mark.asyncio
+async def test_offset_write_is_dispatched_before_temperature_burst():
+    observer = HeadlessObserver()
+    calls = []
+
+    async def temperature_changed(val):
+        calls.append("temperature")
+
+    async def receive_request(val):
+        calls.append(val)
+
+    observer.add("ObserverTypes.TemperatureIndoorsChanged", temperature_changed)
+    observer.add(ObserverTypes.UpdateOperation, receive_request)
+    observer.add(ObserverTypes.TemperatureOutdoorsChanged, temperature_changed)
+    for i in range(100):
+        observer.broadcast("ObserverTypes.TemperatureIndoorsChanged", 20 + i / 100)
+        observer.broadcast(ObserverTypes.TemperatureOutdoorsChanged, i / 100)
+    observer.broadcast(ObserverTypes.UpdateOperation, ("offset", 2))
+    await observer.async_dispatch()
+    assert calls == [("offset", 2), "temperature", "temperature"]
+
+
+@pytest.mark.asyncio
+async def test_broadcast_priority_overrides_command_lane():
+    observer = HeadlessObserver()
+    calls = []
+    observer.add("first command", lambda: calls.append("first"), loop_safe=True)
+    observer.add("second command", lambda: calls.append("second"), loop_safe=True)
+    observer.broadcast("first command")
+    observer.broadcast("second command", priority=Priority.Control)
+    await observer.async_dispatch()
+    assert calls == ["second", "first"]
+
+
+@pytest.mark.asyncio
+async def test_lower_lane_is_not_starved(monkeypatch):
+    monkeypatch.setattr(iobserver_coordinator, "MAX_DISPATCH_PER_CYCLE", 1)
+    observer = HeadlessObserver()
+    calls = []
+    observer.add("telemetry", lambda: calls.append("telemetry"), loop_safe=True)
+    observer.add("control", lambda val: calls.append("control"), loop_safe=True)
+    observer.set_priority("telemetry", Priority.Telemetry)
+    observer.set_priority("control", Priority.Control)
+    observer.broadcast("telemetry")
+    for i in range(iobserver_coordinator.STARVATION_CYCLES + 1):
+        observer.broadcast("control", i)
+        await observer.async_dispatch()
+    assert calls[-1] == "telemetry"
+    assert calls.count("control") == iobserver_coordinator.STARVATION_CYCLES
+
+
+@pytest.mark.asyncio
+async def test_recorded_trace_holds_broadcasts_dispatches_and_handlers(tmp_path):
+    path = str(tmp_path / "trace.jsonl")
+    observer = HeadlessObserver()
+    await observer.async_start_recording(path)
+
+    async def receive_request(val):
+        pass
+
+    observer.add(ObserverTypes.UpdateOperation, receive_request)
+    observer.broadcast(ObserverTypes.UpdateOperation, ("offset", 1))
+    observer.broadcast(ObserverTypes.UpdateOperation, ("offset", 2))
+    await observer.async_dispatch()
+    await observer.async_stop_recording()
+    records = TraceRecorder.read(path)
+    assert [r["k"] for r in records] == ["b", "b", "d", "h"]
+    assert {r["c"] for r in records} == {"update operation"}
+    assert records[1]["a"] == records[2]["a"] == argument_digest(("offset", 2))
+    assert records[0]["a"] != records[1]["a"]
+    assert records[3]["h"].endswith("receive_request")
+    assert observer.recorder is None
+
+
+@pytest.mark.asyncio
+async def test_restarted_trace_keeps_the_running_one(tmp_path):
+    first, second = str(tmp_path / "first.jsonl"), str(tmp_path / "traces" / "second.jsonl")
+    observer = HeadlessObserver()
+    await observer.async_start_recording(first)
+    observer.broadcast("first")
+    await observer.async_start_recording(second)
+    observer.broadcast("second")
+    await observer.async_stop_recording()
+    assert [r["c"] for r in TraceRecorder.read(first)] == ["first"]
+    assert [r["c"] for r in TraceRecorder.read(second)] == ["second"]
+
+
+def test_trace_filename_is_a_plain_file_name():
+    assert trace_filename(None) == "peaqhvac_observer_trace.jsonl"
+    assert trace_filename("trace.jsonl") == "trace.jsonl"
+    for filename in ("../secrets.yaml", "/etc/passwd", "traces/trace.jsonl", ".."):
+        with pytest.raises(ValueError):
+            trace_filename(filename)
+
+
+@pytest.mark.asyncio
+async def test_handler_of_several_commands_is_not_entered_twice():
+    observer = HeadlessObserver()
+    running = []
+    overlaps = []
+
+    async def recalculate(val):
+        overlaps.append(bool(running))
+        running.append(val)
+        await asyncio.sleep(0.02)
+        running.remove(val)
+
+    observer.add("preset changed", recalculate)
+    observer.add("temperature changed", recalculate)
+    observer.broadcast("preset changed", 1)
+    observer.broadcast("temperature changed", 2)
+    await observer.async_dispatch()
+    assert overlaps == [False, False]
+    first, second = observer.model.subscribers.values()
+    assert first[0].lock is second[0].lock
+
+
+@pytest.mark.asyncio
+async def test_handler_keeps_the_gate_of_its_first_policy(caplog):
+    observer = HeadlessObserver()
+    observer.start(asyncio.get_running_loop())
+    calls = []
+
+    async def recalculate():
+        calls.append("recalculate")
+
+    observer.add("preset changed", recalculate, policy=DispatchPolicy(debounce=0.05))
+    observer.add("temperature changed", recalculate, policy=DispatchPolicy(max_rate=1))
+    assert "is already gated by" in caplog.text
+    observer.broadcast("preset changed")
+    observer.broadcast("temperature changed")
+    await asyncio.sleep(0.1)
+    assert calls == ["recalculate"]
+    observer.stop()
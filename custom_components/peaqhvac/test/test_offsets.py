@@ -1,10 +1,18 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 import random
+from unittest.mock import MagicMock
+
 import pytest
 from ..service.hvac.house_heater.models.calculated_offset import CalculatedOffsetModel
-from ..service.hvac.offset.offset_utils import (offset_per_day, set_offset_dict, adjust_to_threshold)
+from ..service.hvac.offset import offset_utils
+from ..service.hvac.offset.offset_utils import (offset_per_day, set_offset_dict, adjust_to_threshold,
+                                                 max_price_lower_internal, OFFSET_ENGINE_NUMPY, OFFSET_ENGINE_PYTHON)
+from ..service.hvac.offset.offset_coordinator import OffsetCoordinator
 from ..service.hvac.offset.peakfinder import smooth_transitions
 from ..service.models.enums.hvac_presets import HvacPresets
+from ..service.models import offsets_exportmodel
+from ..service.models.offset_timeline import OffsetTimeline
+from ..service.models.offsets_exportmodel import OffsetsExportModel
 
 P231213 = [1.17, 1.14, 1.14, 1.11, 1.11, 1.14, 1.25, 1.59, 2.09, 2.09, 2.13, 2.14,2.14, 1.61, 1.59, 1.62, 1.61, 1.68, 1.61, 1.52, 1.44, 1.36, 1.38, 1.27]
 P231214 = [1.17, 1.15, 1.16, 1.16, 1.19, 1.24, 1.47, 1.81, 1.97, 2.19, 2.19, 1.92,1.81, 1.99, 2.19, 2.73, 2.73, 2.63, 2.11, 1.81, 1.62, 1.43, 1.41, 1.28]
@@ -97,4 +105,239 @@ async def test_adjust_to_treshold_no_exceeding_values():
     for k,v in smooth.items():
         model = CalculatedOffsetModel(current_offset=v, current_tempdiff=random.uniform(-1, 1), current_temp_trend_offset=random.uniform(-1, 1))
         adj = adjust_to_threshold(model, 0, _tolerance)
-        assert abs(adj) <= _tolerance
\ No newline at end of file
+        assert abs(adj) <= _tolerance
+
+def test_offset_timeline_lookups_match_dict_scans():
+    offsets = {datetime(2023, 12, 13, 0, 0) + timedelta(minutes=15 * i): i % 7 - 3 for i in range(192)}
+    timeline = OffsetTimeline(dict(reversed(list(offsets.items()))))
+    for dt in [datetime(2023, 12, 13, 0, 0), datetime(2023, 12, 13, 13, 7), datetime(2023, 12, 14, 23, 59)]:
+        latest_key = max(k for k in offsets if k <= dt)
+        assert timeline.value_at(dt) == offsets[latest_key]
+        assert timeline.next_key(dt) == min((k for k in offsets if k > dt), default=None)
+    assert timeline.value_at(datetime(2023, 12, 12, 23, 59)) is None
+    today = timeline.day(datetime(2023, 12, 13).date())
+    assert dict(today) == {k: v for k, v in offsets.items() if k.date() == datetime(2023, 12, 13).date()}
+    assert timeline.day(datetime(2023, 12, 13).date()) is today
+
+
+def test_offset_timeline_versions_change_on_recalculation():
+    first = OffsetTimeline({datetime(2023, 12, 13, 0, 0): 1})
+    second = OffsetTimeline({datetime(2023, 12, 13, 0, 0): 1})
+    assert second.version != first.version
+    assert len(OffsetTimeline()) == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("hour", [0, 12, 13, 20])
+async def test_numpy_engine_matches_python_engine(hour):
+    pytest.importorskip("numpy")
+    days = [P231213, P231214, P231215, P231216, P231217, P231218, P231219]
+    for today, tomorrow in zip(days, days[1:]):
+        for prices in (today, today + tomorrow, [p * 100 for p in today + tomorrow], [p - 0.5 for p in today]):
+            for min_price in (0, 0.1, -0.2):
+                now_dt = datetime(2023, 12, 13, hour, 43, 0)
+                expected = await set_offset_dict(prices, now_dt, min_price, {}, engine=OFFSET_ENGINE_PYTHON)
+                actual = await set_offset_dict(prices, now_dt, min_price, {}, engine=OFFSET_ENGINE_NUMPY)
+                assert list(actual.items()) == list(expected.items())
+
+
+@pytest.mark.asyncio
+async def test_numpy_engine_matches_python_engine_for_quarter_hours():
+    pytest.importorskip("numpy")
+    random.seed(16)
+    for _ in range(20):
+        prices = [round(random.uniform(-0.1, 3), 3) for _ in range(192)]
+        now_dt = datetime(2023, 12, 13, random.randint(0, 23), 0, 0)
+        expected = await set_offset_dict(prices, now_dt, 0, {}, engine=OFFSET_ENGINE_PYTHON)
+        actual = await set_offset_dict(prices, now_dt, 0, {}, engine=OFFSET_ENGINE_NUMPY)
+        assert list(actual.items()) == list(expected.items())
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("engine", [OFFSET_ENGINE_PYTHON, OFFSET_ENGINE_NUMPY])
+async def test_flat_prices_give_no_offsets(engine):
+    now_dt = datetime(2023, 12, 13, 14, 0, 0)
+    offsets = await set_offset_dict([0.8] * 24, now_dt, 0, {}, engine=engine)
+    assert len(offsets) == 24
+    assert set(offsets.values()) == {0}
+    assert list((await set_offset_dict([0.8], now_dt, 0, {}, engine=engine, interval=60)).values()) == [0]
+
+
+class _Offsets(OffsetCoordinator):
+    def __init__(self, prices, prices_tomorrow):
+        hub = MagicMock()
+        hub.options.hvac_tolerance = 3
+        hub.options.heating.offset_ramp_limit = None
+        hub.sensors.set_temp_indoors.preset = HvacPresets.Normal
+        self._prices = prices
+        self._prices_tomorrow = prices_tomorrow
+        super().__init__(hub, MagicMock())
+        self.model.tolerance = 3
+
+    @property
+    def prices(self) -> list:
+        return self._prices
+
+    @property
+    def prices_tomorrow(self) -> list:
+        return self._prices_tomorrow
+
+    @property
+    def min_price(self) -> float:
+        return 0
+
+
+@pytest.mark.asyncio
+async def test_offset_cache_returns_same_offsets_for_unchanged_inputs():
+    offsets = _Offsets(P231213, P231214)
+    first = await offsets.async_update_offset()
+    first[next(iter(first))] = 99
+    second = await offsets.async_update_offset()
+    assert offsets.cache.hits == 1 and offsets.cache.misses == 1
+    assert second == await _Offsets(P231213, P231214).async_update_offset()
+
+
+@pytest.mark.asyncio
+async def test_offset_cache_misses_when_an_input_changes():
+    offsets = _Offsets(P231213, P231214)
+    expected = await offsets.async_update_offset()
+    offsets._hub.sensors.set_temp_indoors.preset = HvacPresets.Away
+    away = await offsets.async_update_offset()
+    offsets.model.tolerance = 2
+    await offsets.async_update_offset()
+    offsets._prices_tomorrow = P231215
+    await offsets.async_update_offset()
+    assert offsets.cache.misses == 4 and offsets.cache.hits == 0
+    assert away != expected
+    offsets._prices_tomorrow = P231214
+    offsets.model.tolerance = 3
+    offsets._hub.sensors.set_temp_indoors.preset = HvacPresets.Normal
+    assert await offsets.async_update_offset() == expected
+    assert offsets.cache.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_quarter_hour_peaks_are_kept_per_interval():
+    hourly = [1.5 if h in (8, 18) else 1.0 for h in range(24)]
+    offsets = _Offsets([p for p in hourly for _ in range(4)], [])
+    await offsets.async_update_model()
+    assert offsets.model.price_interval == 15
+    assert offsets.model.peaks_today == list(range(32, 36)) + list(range(72, 76))
+
+
+def _timeline(values: list[int], minutes: int) -> dict:
+    start = datetime(2023, 12, 13, 0, 0)
+    return {start + timedelta(minutes=minutes * i): v for i, v in enumerate(values)}
+
+
+def _steps_within_an_hour(ret: dict) -> list[int]:
+    keys = sorted(ret)
+    return [
+        ret[b] - ret[a] for i, a in enumerate(keys) for b in keys[i + 1:] if b - a <= timedelta(hours=1)
+    ]
+
+
+@pytest.mark.parametrize("minutes", [15, 60])
+@pytest.mark.parametrize("ramp_up,ramp_down", [(1, 1), (1, 2), (2, 1), (2, 2)])
+def test_smooth_transitions_keep_ramp_limits(minutes, ramp_up, ramp_down):
+    random.seed(20 + minutes)
+    per_hour = 60 // minutes
+    for _ in range(50):
+        values = [v for _ in range(48) for v in [random.randint(-3, 3)] * random.randint(1, per_hour * 2)]
+        vals = _timeline(values, minutes)
+        ret = smooth_transitions(vals, 3, ramp_up=ramp_up, ramp_down=ramp_down)
+        assert list(ret) == list(vals)
+        steps = _steps_within_an_hour(ret)
+        assert max(steps) <= ramp_up
+        assert min(steps) >= -ramp_down
+        assert min(vals.values()) <= min(ret.values()) and max(ret.values()) <= max(vals.values())
+
+
+def test_smooth_transitions_ramp_ahead_of_a_jump():
+    vals = _timeline([0, 0, 0, 3, 3, 3, -3, -3], 60)
+    ret = smooth_transitions(vals, 3, ramp_up=1, ramp_down=2)
+    assert list(ret.values()) == [0, 1, 2, 3, 1, -1, -3, -3]
+
+
+def test_smooth_transitions_remove_single_anomalies():
+    hourly = _timeline([2, 2, -2, 2, 2, 0, 0, -1, 0], 60)
+    assert list(smooth_transitions(hourly, 3, ramp_up=10, ramp_down=10).values()) == [2, 2, 0, 2, 2, 0, 0, -1, 0]
+    quarters = _timeline([2] * 8 + [-2] * 3 + [2] * 8 + [-2] * 5 + [2] * 4, 15)
+    ret = list(smooth_transitions(quarters, 3, ramp_up=10, ramp_down=10).values())
+    assert ret == [2] * 8 + [0] * 3 + [2] * 8 + [-2] * 5 + [2] * 4
+
+
+def test_smooth_transitions_leave_gaps_alone():
+    vals = _timeline([0, 0, 3, 3], 60)
+    del vals[datetime(2023, 12, 13, 1, 0)]
+    assert smooth_transitions(vals, 3, ramp_up=1) == vals
+
+
+def _frozen_now(monkeypatch, module, now: datetime) -> None:
+    class _Now(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return now
+    monkeypatch.setattr(module, "datetime", _Now)
+
+
+@pytest.mark.parametrize("interval, now, expected", [
+    (60, datetime(2023, 12, 13, 13, 50), False),
+    (60, datetime(2023, 12, 13, 13, 51), True),
+    (60, datetime(2023, 12, 13, 14, 10), True),
+    (15, datetime(2023, 12, 13, 13, 40), False),
+    (15, datetime(2023, 12, 13, 13, 44), True),
+    (15, datetime(2023, 12, 13, 13, 50), True),
+    (15, datetime(2023, 12, 13, 14, 0), False),
+])
+def test_max_price_lower_per_interval(monkeypatch, interval, now, expected):
+    _frozen_now(monkeypatch, offset_utils, now)
+    peaks = [14] if interval == 60 else [55]
+    assert max_price_lower_internal(1, peaks, interval) is expected
+    assert max_price_lower_internal(0.2, peaks, interval) is False
+
+
+@pytest.mark.parametrize("count", [24, 48, 96, 192])
+def test_current_raw_offset_per_interval(monkeypatch, count):
+    _frozen_now(monkeypatch, offsets_exportmodel, datetime(2023, 12, 13, 14, 50))
+    minutes = 24 * 60 * (1 if count in (24, 96) else 2) // count
+    model = OffsetsExportModel(([], []))
+    model.raw_offsets = _timeline(list(range(count)), minutes)
+    assert model.current_raw_offset == (14 * 60 + 50) // minutes
+
+
+def test_smooth_transitions_do_not_limit_ramps_by_default():
+    vals = _timeline([0, 0, 3, 3, -3, -3], 60)
+    assert smooth_transitions(vals, 3) == vals
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("today, tomorrow", [(P231213, P231214), (P231215, P231216), (P231216, P231217), (P231218, P231219)])
+async def test_smooth_transitions_only_move_single_hour_blips_by_default(today, tomorrow):
+    offsets = offset_per_day(
+        all_prices=today + tomorrow,
+        day_values=await set_offset_dict(today + tomorrow, datetime(2023, 12, 13, 20, 43), 0, {}),
+        tolerance=3,
+        indoors_preset=HvacPresets.Normal,
+    )
+    ret = smooth_transitions(offsets, 3)
+    before = [offsets[k] for k in sorted(offsets)]
+    after = [ret[k] for k in sorted(offsets)]
+    for idx, (old, new) in enumerate(zip(before, after)):
+        if old != new:
+            assert 0 < idx < len(before) - 1 and before[idx - 1] == before[idx + 1] != old
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("prices, prices_tomorrow", [
+    (P231213, P231214), (P231216, P231217), ([p for p in P231218 for _ in range(4)], [])
+])
+async def test_offset_ramp_limit_option_is_applied(prices, prices_tomorrow):
+    unlimited = await _Offsets(prices, prices_tomorrow).async_update_offset()
+    limited_offsets = _Offsets(prices, prices_tomorrow)
+    limited_offsets._hub.options.heating.offset_ramp_limit = 1
+    limited = await limited_offsets.async_update_offset()
+    assert list(limited) == list(unlimited)
+    assert max(_steps_within_an_hour(unlimited)) > 1 or min(_steps_within_an_hour(unlimited)) < -1
+    assert all(abs(step) <= 1 for step in _steps_within_an_hour(limited))
+    assert all(abs(v) <= 3 for v in limited.values())
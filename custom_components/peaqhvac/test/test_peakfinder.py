@@ -1,5 +1,9 @@
+import random
+import statistics
+
 import pytest
-from ..service.hvac.offset.peakfinder import identify_peaks
+from ..service.hvac.offset.peakfinder import (
+    _check_deviation_peaks, _check_deviation_valleys, find_extremes, find_single_valleys, identify_peaks, identify_valleys)
 
 P240910 = [0.07,0.07,0.06,0.06,0.07,0.07,0.08,0.11,0.11,0.11,0.11,0.1,0.08,0.08,0.08,0.08,0.08,0.12,0.12,0.12,0.11,0.1,0.08,0.08]
 P240911 = [0.08,0.08,0.08,0.08,0.09,0.11,0.13,0.21,0.6,0.6,0.6,0.59,0.4,0.37,0.32,0.15,0.22,0.35,0.3,0.21,0.14,0.12,0.12,0.11]
@@ -13,5 +17,81 @@ def test_single_peak():
     assert peaks == [17]
 
 
+def _legacy_identify_peaks(prices: list) -> list[int]:
+    ret = []
+    for idx, p in enumerate(prices):
+        if p < statistics.mean(prices):
+            continue
+        if idx == 0 or idx == len(prices) - 1:
+            if p == max(prices):
+                ret.append(idx)
+        elif all([_check_deviation_peaks(p, prices[idx - 1]), _check_deviation_peaks(p, prices[idx + 1])]):
+            ret.append(idx)
+    return ret
+
+
+def _legacy_identify_valleys(prices: list) -> list[int]:
+    ret = []
+    for idx, p in enumerate(prices):
+        if p > statistics.mean(prices):
+            continue
+        if idx == 0 or idx == len(prices) - 1:
+            if p == min(prices):
+                ret.append(idx)
+        elif all([_check_deviation_valleys(p, prices[idx - 1]), _check_deviation_valleys(p, prices[idx + 1])]):
+            ret.append(idx)
+    return ret
+
+
+def _legacy_find_single_valleys(prices: list) -> list[int]:
+    ret = []
+    for idx, p in enumerate(prices):
+        if idx <= 1 or idx >= len(prices) - 2:
+            pass
+        elif all([
+            prices[idx] < prices[idx - 1],
+            prices[idx] < prices[idx + 1],
+            min(prices[idx - 1], prices[idx + 1]) / max(prices[idx - 1], prices[idx + 1]) > 0.8,
+        ]):
+            ret.append(idx)
+    return ret
+
+
+def _price_days() -> list[list[float]]:
+    random.seed(19)
+    days = [P240910, P240911, P240911 + P240910, [0.0, 0.1, 0.0, 0.2, 0.05, 0.0, 0.3]]
+    for count in (24, 48, 96, 192):
+        days.append([round(random.uniform(0.05, 2), 2) for _ in range(count)])
+        days.append([round(random.choice([random.uniform(0.05, 0.3), random.uniform(1, 3)]), 2) for _ in range(count)])
+    return days
+
+
+@pytest.mark.parametrize("prices", _price_days())
+def test_single_pass_matches_previous_detectors(prices):
+    ret = find_extremes(prices)
+    assert ret.peaks == _legacy_identify_peaks(prices)
+    assert ret.valleys == _legacy_identify_valleys(prices)
+    assert ret.single_valleys == _legacy_find_single_valleys(prices)
+    assert identify_peaks(prices) == ret.peaks
+    assert identify_valleys(prices) == ret.valleys
+    assert find_single_valleys(prices) == ret.single_valleys
+
+
+def test_peak_shape_of_quarter_hour_plateau():
+    hourly = [1.0] * 24
+    hourly[8] = 1.5
+    hourly[18] = 2.0
+    hourly[19] = 1.2
+    ret = find_extremes([p for p in hourly for _ in range(4)], step=4, shape=True)
+    assert ret.peaks == list(range(32, 36)) + list(range(72, 76))
+    assert all(ret.peak_widths[idx] == 4 for idx in ret.peaks)
+    assert ret.peak_prominence[32] == pytest.approx(0.5)
+    assert ret.peak_prominence[72] == pytest.approx(1.0)
 
 
+def test_prominence_is_measured_to_the_higher_base():
+    prices = [0.5, 1.0, 0.8, 2.0, 0.2, 1.5, 0.6]
+    ret = find_extremes(prices, shape=True)
+    assert ret.peaks == [1, 3, 5]
+    assert ret.peak_prominence == pytest.approx({1: 0.2, 3: 1.5, 5: 0.9})
+    assert find_extremes([]).peaks == []
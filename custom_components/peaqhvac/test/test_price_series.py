@@ -0,0 +1,61 @@
+import random
+import statistics
+from datetime import datetime, timedelta
+
+import pytest
+
+from ..service.hvac.offset.offset_utils import set_offset_dict
+from ..service.hvac.water_heater.water_heater_next_start import NextWaterBoost, NextStartPostModel
+from ..service.models.price_series import PriceSeries, interval_minutes
+from .test_water_heater_next_start_new import P240126, P240130, P240131
+
+
+def _quarters(prices: list) -> list:
+    return [p for p in prices for _ in range(4)]
+
+
+def test_interval_is_taken_from_the_number_of_prices():
+    assert [interval_minutes(c) for c in (23, 24, 25, 48)] == [60, 60, 60, 60]
+    assert [interval_minutes(c) for c in (92, 96, 100, 192)] == [15, 15, 15, 15]
+    series = PriceSeries.from_days(_quarters(P240126), [], datetime(2024, 1, 26, 13, 2))
+    assert series.interval == 15 and series.per_day == 96
+    assert series.index_of(datetime(2024, 1, 26, 13, 2)) == 52
+    assert series.floor(datetime(2024, 1, 26, 13, 29, 10)) == datetime(2024, 1, 26, 13, 15)
+    assert series.time_at(53) == datetime(2024, 1, 26, 13, 15)
+
+
+def test_mean_from_matches_statistics_mean():
+    random.seed(18)
+    prices = [round(random.uniform(-0.2, 3), 3) for _ in range(192)]
+    series = PriceSeries(prices)
+    for idx in range(len(prices)):
+        assert series.mean_from(idx) == statistics.mean(prices[idx:])
+    with pytest.raises(ValueError):
+        series.mean_from(len(prices))
+
+
+def test_water_boost_starts_on_the_quarter_hour_grid():
+    model = NextStartPostModel(
+        prices=_quarters(P240130 + P240131),
+        demand_hours=[20, 21],
+        non_hours=[12, 17, 11, 16],
+        current_temp=12,
+        temp_trend=-40,
+        latest_boost=datetime(2024, 1, 30, 20, 40),
+        dt=datetime(2024, 1, 30, 20, 55, 0)
+    )
+    assert model.series.interval == 15
+    ret = NextWaterBoost().get_next_start(model)
+    assert ret.next_start.minute in (5, 20, 35, 50)
+    assert datetime(2024, 1, 30, 21, 55) <= ret.next_start <= datetime(2024, 1, 30, 23, 50)
+    assert ret.target_temp == 25
+
+
+@pytest.mark.asyncio
+async def test_quarter_hour_offsets_are_keyed_per_interval():
+    now_dt = datetime(2024, 1, 30, 14, 10, 0)
+    ret = await set_offset_dict(_quarters(P240130 + P240131), now_dt, 0, {})
+    keys = list(ret)
+    assert len(keys) == 192
+    assert keys[1] - keys[0] == timedelta(minutes=15)
+    assert keys[-1] == datetime(2024, 1, 31, 23, 45)
@@ -0,0 +1,74 @@
+import random
+import statistics
+from datetime import datetime
+
+import pytest
+
+from ..service.hvac.offset.offset_utils import (
+    OFFSET_ENGINE_NUMPY, OFFSET_ENGINE_PYTHON, offset_per_day, set_offset_dict)
+from ..service.hvac.offset.peakfinder import identify_peaks
+from ..service.hvac.water_heater.water_heater_next_start import NextStartPostModel, NextWaterBoost
+from ..service.models.price_stats import PriceStats
+from .test_water_heater_next_start_new import P240130, P240131
+
+
+def test_stats_match_statistics():
+    random.seed(21)
+    prices = [round(random.uniform(-0.2, 3), 3) for _ in range(48)]
+    stats = PriceStats(prices)
+    assert stats.mean == statistics.mean(prices)
+    assert stats.stdev == statistics.stdev(prices)
+    assert (stats.min, stats.max) == (min(prices), max(prices))
+    assert stats.percentile(0) == min(prices) and stats.percentile(100) == max(prices)
+    assert stats.percentile(50) == statistics.median(prices)
+    for start, end in [(0, 48), (3, 17), (20, 21), (47, 48)]:
+        assert stats.mean_between(start, end) == statistics.mean(prices[start:end])
+        assert stats.sum_between(start, end) == pytest.approx(sum(prices[start:end]))
+    assert stats.sum_between(5, 5) == 0
+    with pytest.raises(ValueError):
+        stats.mean_between(5, 5)
+    with pytest.raises(ValueError):
+        stats.percentile(101)
+
+
+def test_empty_stats():
+    stats = PriceStats([])
+    assert (stats.mean, stats.stdev, stats.min, stats.max) == (None, None, None, None)
+    assert stats.days == () and len(stats.today) == 0 and len(stats.tomorrow) == 0
+
+
+def test_stats_are_split_per_day():
+    stats = PriceStats.from_days(P240130, P240131, datetime(2024, 1, 30, 14, 3))
+    assert list(stats.today.prices) == P240130 and list(stats.tomorrow.prices) == P240131
+    assert stats.tomorrow.start == datetime(2024, 1, 31)
+    assert stats.tomorrow.mean == statistics.mean(P240131)
+    dst = PriceStats.from_days(P240130[:23], P240131, datetime(2024, 3, 31, 1, 0))
+    assert [len(d) for d in dst.days] == [23, 24]
+    only_today = PriceStats.from_days(P240130, [], datetime(2024, 1, 30))
+    assert len(only_today.days) == 1 and len(only_today.tomorrow) == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("engine", [OFFSET_ENGINE_PYTHON, OFFSET_ENGINE_NUMPY])
+async def test_offsets_and_peaks_are_the_same_with_shared_stats(engine):
+    random.seed(22)
+    dt = datetime(2024, 1, 30, 14, 0)
+    for low in (0.05, -0.2):
+        prices = [round(random.uniform(low, 3), 3) for _ in range(48)]
+        stats = PriceStats.from_days(prices[:24], prices[24:], dt)
+        shared = await set_offset_dict(prices, dt, 0, {}, engine=engine, stats=stats)
+        assert shared == await set_offset_dict(prices, dt, 0, {}, engine=engine)
+        assert offset_per_day(shared, prices, 3, stats=stats) == offset_per_day(shared, prices, 3)
+        assert identify_peaks(prices[:24], stats=stats.today) == identify_peaks(prices[:24])
+
+
+def test_water_planner_uses_matching_stats_only():
+    dt = datetime(2024, 1, 30, 20, 55)
+    kwargs = dict(prices=P240130 + P240131, demand_hours=[20, 21], non_hours=[12, 17, 11, 16], current_temp=12,
+                  temp_trend=-40, latest_boost=datetime(2024, 1, 30, 20, 40), dt=dt)
+    stats = PriceStats.from_days(P240130, P240131, dt)
+    shared = NextStartPostModel(**kwargs, stats=stats)
+    assert shared.series is stats
+    assert NextStartPostModel(**kwargs, stats=PriceStats(P240130, start=datetime(2024, 1, 30))).series is not stats
+    ret = NextWaterBoost().get_next_start(shared)
+    assert ret == NextWaterBoost().get_next_start(NextStartPostModel(**kwargs))
@@ -0,0 +1,67 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from ..service.hub import state_changes
+from ..service.hub.state_changes import StateChanges
+from ..service.hub.tick_scheduler import TickScheduler
+
+
+class FakeHass:
+    def __init__(self, loop):
+        self.loop = loop
+        self.executor_jobs = 0
+
+    def async_create_background_task(self, coro, name):
+        return self.loop.create_task(coro, name=name)
+
+    async def async_add_executor_job(self, func, *args):
+        self.executor_jobs += 1
+        return func(*args)
+
+
+def _state_changes(monkeypatch) -> tuple[StateChanges, MagicMock, FakeHass]:
+    monkeypatch.setattr(state_changes, "SENSOR_BATCH_WINDOW", 0.05)
+    hass = FakeHass(asyncio.get_running_loop())
+    hub = MagicMock()
+    hub.scheduler = TickScheduler(hass)
+    hub.options = SimpleNamespace(indoor_temp=["sensor.kitchen", "sensor.hall", "sensor.office"], outdoor_temp=["sensor.out"])
+    hub.spotprice.entity = "sensor.nordpool"
+    hub.spotprice.async_update_spotprice = AsyncMock()
+    hub.hvac.async_update_hvac = AsyncMock()
+    hub.sensors.average_temp_indoors.async_update_values = AsyncMock()
+    hub.sensors.temp_trend_indoors.async_add_reading = AsyncMock()
+    hub.sensors.average_temp_outdoors.async_update_values = AsyncMock()
+    hub.sensors.temp_trend_outdoors.async_add_reading = AsyncMock()
+    return StateChanges(hub, hass), hub, hass
+
+
+@pytest.mark.asyncio
+async def test_burst_of_events_runs_one_control_cycle(monkeypatch):
+    states, hub, hass = _state_changes(monkeypatch)
+    states.latest_price_update.update()
+    for entity in ["sensor.kitchen", "sensor.hall", "sensor.office", "sensor.out"]:
+        await states.async_update_sensor(entity, "21.5")
+    assert hub.sensors.average_temp_indoors.async_update_values.await_count == 3
+    assert hub.sensors.temp_trend_outdoors.async_add_reading.await_count == 1
+    assert hub.hvac.async_update_hvac.await_count == 0
+    await asyncio.sleep(0.15)
+    assert hub.hvac.async_update_hvac.await_count == 1
+    assert hass.executor_jobs == 1
+    assert hub.spotprice.async_update_spotprice.await_count == 0
+
+
+@pytest.mark.asyncio
+async def test_price_event_in_batch_refreshes_spotprice(monkeypatch):
+    states, hub, _ = _state_changes(monkeypatch)
+    states.latest_price_update.update()
+    await states.async_update_sensor("sensor.kitchen", "21.5")
+    await states.async_update_sensor("sensor.nordpool", "1.2")
+    await asyncio.sleep(0.15)
+    assert hub.spotprice.async_update_spotprice.await_count == 1
+    await states.async_update_sensor("sensor.kitchen", "21.6")
+    await asyncio.sleep(0.15)
+    assert hub.spotprice.async_update_spotprice.await_count == 1
+    assert hub.hvac.async_update_hvac.await_count == 2
@@ -0,0 +1,108 @@
+import statistics
+from datetime import datetime, timedelta
+
+import pytest
+
+from ..service.hvac.water_heater.models.tank_cooling_model import MIN_SAMPLES, TankCoolingModel
+from ..service.hvac.water_heater.water_heater_next_start import NextStartPostModel, NextWaterBoost
+from ..service.hvac.water_heater.water_heater_optimal_start import OptimalWaterBoost
+from .test_water_heater_next_start_new import P240130, P240131
+
+
+def _feed(model: TankCoolingModel, start: datetime, temps: list[float], minutes: int = 15) -> list[bool]:
+    return [model.add_reading(t, (start + timedelta(minutes=minutes * i)).timestamp()) for i, t in enumerate(temps)]
+
+
+def _learned_day(night: float = 0.2, evening: float = 3.0) -> TankCoolingModel:
+    model = TankCoolingModel()
+    for day in range(MIN_SAMPLES + 1):
+        start = datetime(2024, 1, 10 + day)
+        temp = 50.0
+        for hour in range(24):
+            rate = evening if hour in (19, 20) else night
+            for quarter in range(4):
+                model.add_reading(temp, (start + timedelta(hours=hour, minutes=15 * quarter)).timestamp())
+                temp -= rate / 4
+            if temp < 30:
+                temp = 50.0
+    return model
+
+
+def test_cooling_is_learned_per_hour():
+    model = TankCoolingModel()
+    learned = _feed(model, datetime(2024, 1, 10, 6, 0), [48, 47.9, 47.8, 47.7, 47.6], minutes=5)
+    assert learned == [False, False, True, False, True]
+    assert model.rates[6] == pytest.approx(1.2)
+    assert model.samples[6] == 2
+    assert model.forecast() is None
+
+
+def test_boosts_and_gaps_start_over():
+    model = TankCoolingModel()
+    assert not any(_feed(model, datetime(2024, 1, 10, 6, 0), [40, 39.5, 50, 49.8], minutes=5))
+    assert not any(_feed(model, datetime(2024, 1, 10, 10, 0), [49, 45], minutes=240))
+    assert model.samples == [0] * 24
+
+
+def test_unavailable_and_impossible_readings_are_not_learned():
+    model = TankCoolingModel()
+    assert _feed(model, datetime(2024, 1, 10, 6, 0), [48, 0, 47.5], minutes=10) == [False, False, True]
+    assert model.rates[6] == pytest.approx(1.5)
+    model = TankCoolingModel()
+    assert _feed(model, datetime(2024, 1, 10, 8, 0), [47, 30, 29.9], minutes=15) == [False, False, True]
+    assert model.rates[8] == pytest.approx(0.4)
+    assert model.samples[8] == 1
+
+
+def test_forecast_fills_unlearned_hours_with_the_mean():
+    model = _learned_day()
+    forecast = model.forecast()
+    assert len(forecast) == 24
+    assert forecast[3] == 0.2 and forecast[19] == 3.0
+    assert model.standing_loss == pytest.approx(0.2)
+    model.rates[5] = None
+    assert model.forecast()[5] == round((21 * 0.2 + 2 * 3.0) / 23, 3)
+
+
+def test_cooling_is_stored_and_loaded():
+    model = _learned_day()
+    loaded = TankCoolingModel()
+    loaded.load(model.as_dict())
+    assert loaded.forecast() == model.forecast()
+    loaded.load({"rates": [1.0]})
+    assert loaded.forecast() == model.forecast()
+
+
+def test_planners_use_the_learned_cooling_when_the_trend_is_unknown():
+    forecast = _learned_day(night=0.1, evening=1.0).forecast()
+    kwargs = dict(prices=P240130 + P240131, demand_hours=[], non_hours=[], current_temp=45, temp_trend=0,
+                  latest_boost=datetime(2024, 1, 29, 13, 40), dt=datetime(2024, 1, 30, 14, 0))
+    learned = NextStartPostModel(**kwargs, cooling=forecast)
+    assert learned.temp_trend == -statistics.mean(forecast)
+    assert NextStartPostModel(**kwargs).temp_trend == -0.5
+    assert NextStartPostModel(**(kwargs | {"temp_trend": -4}), cooling=forecast).temp_trend == -4
+
+    planner = OptimalWaterBoost()
+    planner.get_next_start(learned)
+    assert planner._cooling(learned, datetime(2024, 1, 30, 19)) == 1.0
+    assert planner._cooling(learned, datetime(2024, 1, 31, 3)) == 0.1
+    assert planner._cooling(learned, datetime(2024, 1, 30, 14, 30)) == 0.5
+    default = OptimalWaterBoost()
+    default.get_next_start(NextStartPostModel(**kwargs))
+    assert planner.boosts[0].time > default.boosts[0].time
+
+
+def test_greedy_planner_projects_the_learned_cooling_per_hour():
+    forecast = _learned_day(night=0.1, evening=3.0).forecast()
+    dt = datetime(2024, 1, 30, 14, 0)
+    kwargs = dict(prices=P240130 + P240131, demand_hours=[], non_hours=[], current_temp=45, temp_trend=0,
+                  latest_boost=datetime(2024, 1, 29, 13, 40), dt=dt)
+    learned = NextStartPostModel(**kwargs, cooling=forecast)
+    assert learned.cooling_at(datetime(2024, 1, 30, 14, 50)) is None
+    assert learned.cooling_at(datetime(2024, 1, 30, 19, 50)) == 3.0
+    projected = NextWaterBoost._get_temperature_at_datetime(
+        dt, datetime(2024, 1, 30, 21, 0), 45, learned.temp_trend, learned.cooling_at)
+    assert projected == round(45 + learned.temp_trend - 4 * 0.1 - 2 * 3.0, 1)
+
+    flat = NextStartPostModel(**kwargs, cooling=(-learned.temp_trend,) * 24)
+    assert NextWaterBoost().get_next_start(learned).next_start < NextWaterBoost().get_next_start(flat).next_start
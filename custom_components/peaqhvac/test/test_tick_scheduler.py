@@ -0,0 +1,126 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from ..service.hub.tick_scheduler import TickScheduler
+from ..service.models.tick_snapshot import TickSnapshot
+
+
+class FakeHass:
+    def __init__(self, loop):
+        self.loop = loop
+
+    def async_create_background_task(self, coro, name):
+        return self.loop.create_task(coro, name=name)
+
+
+def _local_seconds(ts: float) -> float:
+    return ts + datetime.fromtimestamp(ts).astimezone().utcoffset().total_seconds()
+
+
+@pytest.mark.asyncio
+async def test_next_due_is_aligned_to_price_interval_boundaries():
+    scheduler = TickScheduler(FakeHass(asyncio.get_running_loop()))
+    scheduler.register("twenty", lambda s: None, period=20)
+    scheduler.register("phased", lambda s: None, period=30, phase=5)
+    now = time.time()
+    scheduler.start()
+    twenty = scheduler.tasks["twenty"].next_due
+    phased = scheduler.tasks["phased"].next_due
+    assert now < twenty <= now + 20
+    assert round(_local_seconds(twenty)) % 20 == 0
+    assert round(_local_seconds(phased)) % 30 == 5
+    boundary = (int(_local_seconds(now)) // 900 + 1) * 900
+    assert (boundary - round(_local_seconds(twenty))) % 20 == 0
+    scheduler.stop()
+
+
+@pytest.mark.asyncio
+async def test_due_tasks_share_snapshot_and_respect_dependencies():
+    scheduler = TickScheduler(FakeHass(asyncio.get_running_loop()))
+    calls = []
+
+    async def water_heater(snapshot):
+        calls.append(("water_heater", snapshot))
+
+    def current_offset(snapshot):
+        calls.append(("current_offset", snapshot))
+
+    async def weather(snapshot):
+        calls.append(("weather", snapshot))
+
+    scheduler.register("water_heater", water_heater, period=30, after=("current_offset",))
+    scheduler.register("current_offset", current_offset, period=20, after=("weather",))
+    scheduler.register("weather", weather, period=30)
+    snapshot = TickSnapshot(now=datetime.now())
+    await scheduler.async_run(list(scheduler.tasks.values()), snapshot)
+    assert [c[0] for c in calls] == ["weather", "current_offset", "water_heater"]
+    assert all(c[1] is snapshot for c in calls)
+
+
+@pytest.mark.asyncio
+async def test_snapshot_factory_is_called_once_per_tick():
+    made = []
+
+    def factory(now):
+        made.append(TickSnapshot(now=now))
+        return made[-1]
+
+    scheduler = TickScheduler(FakeHass(asyncio.get_running_loop()), snapshot_factory=factory)
+    seen = []
+    done = asyncio.Event()
+    scheduler.register("first", lambda s: seen.append(s), period=1)
+    scheduler.register("second", lambda s: (seen.append(s), done.set()), period=1, after=("first",))
+    scheduler.start()
+    await asyncio.wait_for(done.wait(), timeout=1.5)
+    scheduler.stop()
+    assert len(made) == 1
+    assert seen == [made[0], made[0]]
+
+
+@pytest.mark.asyncio
+async def test_dependency_that_is_not_due_does_not_block():
+    scheduler = TickScheduler(FakeHass(asyncio.get_running_loop()))
+    calls = []
+    scheduler.register("water_heater", lambda s: calls.append("water_heater"), period=30, after=("current_offset",))
+    scheduler.register("current_offset", lambda s: calls.append("current_offset"), period=20)
+    await scheduler.async_run([scheduler.tasks["water_heater"]], TickSnapshot(now=datetime.now()))
+    assert calls == ["water_heater"]
+
+
+@pytest.mark.asyncio
+async def test_tick_fires_and_stop_cancels_the_timer():
+    scheduler = TickScheduler(FakeHass(asyncio.get_running_loop()))
+    fired = asyncio.Event()
+    scheduler.register("every second", lambda s: fired.set(), period=1)
+    scheduler.start()
+    await asyncio.wait_for(fired.wait(), timeout=1.5)
+    scheduler.stop()
+    assert scheduler._timer is None
+    fired.clear()
+    await asyncio.sleep(1.1)
+    assert not fired.is_set()
+
+
+@pytest.mark.asyncio
+async def test_call_at_runs_once_and_replaces_pending_call():
+    scheduler = TickScheduler(FakeHass(asyncio.get_running_loop()))
+    calls = []
+    scheduler.call_at("boundary", datetime.now() + timedelta(seconds=5), lambda s: calls.append("late"))
+    scheduler.call_at("boundary", datetime.now() + timedelta(milliseconds=50), lambda s: calls.append(s.now))
+    await asyncio.sleep(0.15)
+    assert len(calls) == 1 and isinstance(calls[0], datetime)
+    assert not scheduler._oneshots
+
+
+@pytest.mark.asyncio
+async def test_stop_cancels_pending_one_shots():
+    scheduler = TickScheduler(FakeHass(asyncio.get_running_loop()))
+    calls = []
+    scheduler.call_at("boundary", datetime.now() + timedelta(milliseconds=50), lambda s: calls.append(1))
+    scheduler.stop()
+    scheduler.call_at("boundary", datetime.now() + timedelta(milliseconds=50), lambda s: calls.append(2))
+    await asyncio.sleep(0.1)
+    assert calls == []
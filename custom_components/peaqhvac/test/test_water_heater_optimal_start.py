@@ -0,0 +1,112 @@
+import itertools
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from ..service.hvac.water_heater.water_heater_next_start import NextStartPostModel, NextWaterBoost
+from ..service.hvac.water_heater.water_heater_optimal_start import (
+    BOOST_OVERHEAD, BOOST_TARGETS, MIN_TEMP, WATER_PLANNER_OPTIMAL, OptimalWaterBoost, create_water_planner)
+from .test_water_heater_next_start_new import P240130, P240131, P240314, P240315
+
+
+def _model(**changes) -> NextStartPostModel:
+    kwargs = dict(prices=P240130 + P240131, demand_hours=[], non_hours=[], current_temp=45, temp_trend=-2,
+                  latest_boost=datetime(2024, 1, 29, 13, 40), dt=datetime(2024, 1, 30, 14, 0))
+    return NextStartPostModel(**(kwargs | changes))
+
+
+def _brute_force(planner: OptimalWaterBoost, model: NextStartPostModel) -> float:
+    """Cost of every combination of boosts, with the cost model of the planner."""
+    series = model.series
+    start = series.index_of(model.dt)
+    reference = series.mean_from(start)
+    best = None
+    for actions in itertools.product((None, *BOOST_TARGETS), repeat=len(series) - start):
+        cost, temp = 0.0, model.current_temp
+        for idx, action in enumerate(actions, start=start):
+            if action is not None and temp < action:
+                cost += series.prices[idx] * (action - temp + BOOST_OVERHEAD)
+                temp = action
+            elif action is not None:
+                break
+            else:
+                temp = max(temp + model.temp_trend, MIN_TEMP)
+            cost += planner._penalty(temp, series.time_at(idx).hour in model.demand_hours) * reference
+        else:
+            cost += reference * (planner.water_limit - temp)
+            best = cost if best is None else min(best, cost)
+    return best
+
+
+def _plan_cost(planner: OptimalWaterBoost, model: NextStartPostModel) -> float:
+    series = model.series
+    start = series.index_of(model.dt)
+    reference = series.mean_from(start)
+    boosts = {b.time: b.target_temp for b in planner.plan(model)}
+    cost, temp = 0.0, model.current_temp
+    for idx in range(start, len(series)):
+        target = boosts.get(series.time_at(idx) + timedelta(minutes=50))
+        if target is not None:
+            cost += series.prices[idx] * (target - temp + BOOST_OVERHEAD)
+            temp = target
+        else:
+            temp = max(temp + model.temp_trend, MIN_TEMP)
+        cost += planner._penalty(temp, series.time_at(idx).hour in model.demand_hours) * reference
+    return cost + reference * (planner.water_limit - temp)
+
+
+@pytest.mark.parametrize("current_temp,temp_trend,demand_hours", [
+    (45, -2, []), (41, -3, [20]), (30, -1.5, []), (52, -4, [18, 19]),
+])
+def test_plan_is_cost_minimal(current_temp, temp_trend, demand_hours):
+    planner = OptimalWaterBoost()
+    model = _model(current_temp=current_temp, temp_trend=temp_trend, demand_hours=demand_hours,
+                   dt=datetime(2024, 1, 30, 16, 0), prices=P240130)
+    assert _plan_cost(planner, model) == pytest.approx(_brute_force(planner, model))
+
+
+def test_boosts_are_placed_in_cheap_intervals_across_the_horizon():
+    planner = OptimalWaterBoost()
+    ret = planner.get_next_start(_model())
+    assert len(planner.boosts) >= 2
+    assert ret.next_start == planner.boosts[0].time
+    assert ret.target_temp in (47, 53)
+    prices = dict(zip((datetime(2024, 1, 30) + timedelta(hours=i, minutes=50) for i in range(48)), P240130 + P240131))
+    boosted = [prices[b.time] for b in planner.boosts]
+    assert planner.boosts[0].target_temp == 53
+    assert max(boosted[1:]) <= 0.4
+    assert sum(boosted) / len(boosted) < sum(P240130[14:] + P240131) / len(P240130[14:] + P240131)
+
+
+def test_plan_keeps_out_of_non_hours_and_waits_after_a_boost():
+    planner = OptimalWaterBoost()
+    model = _model(current_temp=25, non_hours=[14, 15], latest_boost=datetime(2024, 1, 30, 13, 30))
+    ret = planner.get_next_start(model)
+    assert ret.next_start >= datetime(2024, 1, 30, 16)
+    assert all(b.time.hour not in (14, 15) for b in planner.boosts)
+
+
+def test_warm_tank_over_a_short_horizon_needs_no_boost():
+    planner = OptimalWaterBoost()
+    ret = planner.get_next_start(_model(prices=P240130, current_temp=53, temp_trend=-0.5, dt=datetime(2024, 1, 30, 20)))
+    assert ret.next_start == datetime.max and ret.target_temp is None
+
+
+def test_quarter_hour_plan():
+    quarters = [p for p in P240314 + P240315 for _ in range(4)]
+    planner = OptimalWaterBoost()
+    model = _model(prices=quarters, dt=datetime(2024, 3, 14, 9, 20), current_temp=42, temp_trend=-1.5)
+    start = time.perf_counter()
+    ret = planner.get_next_start(model)
+    assert time.perf_counter() - start < 0.5
+    assert ret.next_start.minute in (5, 20, 35, 50)
+    assert all(b.time.minute in (5, 20, 35, 50) for b in planner.boosts)
+    assert len(planner.boosts) >= 2
+
+
+def test_water_planner_is_selected_by_name():
+    assert isinstance(create_water_planner(), NextWaterBoost)
+    assert isinstance(create_water_planner(WATER_PLANNER_OPTIMAL), OptimalWaterBoost)
+    with pytest.raises(ValueError):
+        create_water_planner("cheapest")
@@ -0,0 +1,180 @@
+import itertools
+import random
+import statistics
+from datetime import datetime, timedelta
+
+import pytest
+
+from ..service.hvac.water_heater.next_start_cache import NextStartCache, next_start_fingerprint
+from ..service.hvac.water_heater.water_heater_next_start import (
+    NextStartExportModel, NextStartPostModel, NextWaterBoost, PriceData)
+from ..service.hvac.water_heater.water_heater_optimal_start import OptimalWaterBoost
+from ..service.models.enums.hvac_presets import HvacPresets
+from ..service.models.price_stats import PriceStats
+from .test_water_heater_next_start_new import (
+    P240126, P240129, P240130, P240131, P240201, P240202, P240203, P240314, P240315)
+
+
+class _LegacyNextWaterBoost(NextWaterBoost):
+    """The list based planner: a full data list with a new mean per interval, filtered and sorted afterwards."""
+    def get_next_start(self, model: NextStartPostModel) -> NextStartExportModel:
+        self.water_limit = 30 if model.hvac_preset == HvacPresets.Away else 40
+        self.low_water_limit = self.water_limit - 20
+        self.dt = model.dt
+        self.min_price = model.min_price
+        self.interval = model.series.interval
+        if model.latest_boost is not None and self.dt - model.latest_boost < timedelta(hours=1):
+            self.dt = self.dt + timedelta(hours=1)
+        data = self._legacy_data(model)
+        selected = None
+        for d in data:
+            if all([
+                d.is_cold,
+                (d.price_spread < 1 or d.price < self.min_price or (d.is_demand or d.water_temp < d.target_temp)),
+                not d.is_non,
+                d.time >= self.reset_hour(self.dt, self.interval)
+            ]):
+                selected = d
+                break
+        if selected is None:
+            return NextStartExportModel(datetime.max, None)
+        filtered = [
+            d for d in data if max(d.time, selected.time) - min(d.time, selected.time) <= timedelta(hours=2)
+            and d.time >= self.reset_hour(self.dt, self.interval)
+        ]
+        selected = self._legacy_final_selected(filtered, selected)
+        return NextStartExportModel(selected.time, selected.target_temp)
+
+    def _legacy_data(self, model: NextStartPostModel) -> list:
+        data = []
+        series = model.series
+        start = series.index_of(self.dt)
+        for idx, p in enumerate(series.prices[start:], start=start):
+            new_hour = series.floor(self.dt + series.step * (idx - start)) + series.step - timedelta(minutes=10)
+            second_hour = self.dt + series.step * (idx - start + 1)
+            temp_at_time = self._get_temperature_at_datetime(self.dt, new_hour, model.current_temp, model.temp_trend)
+            if new_hour < self.reset_hour(self.dt, self.interval):
+                continue
+            price_spread = round(p / statistics.mean(series.prices[max(idx - start, 0):]), 2)
+            data.append(PriceData(
+                p,
+                price_spread,
+                new_hour,
+                temp_at_time,
+                self._calculate_is_cold(temp_at_time, second_hour, model, p,
+                                        series.prices[idx + 1] if idx + 1 < len(series) else 9999),
+                second_hour.hour in model.demand_hours,
+                new_hour.hour in model.non_hours or second_hour.hour in model.non_hours,
+                self._calculate_target_temp_for_hour(temp_at_time, second_hour.hour in model.demand_hours, p,
+                                                     price_spread, model.min_price)
+            ))
+        return data
+
+    def _legacy_final_selected(self, filtered: list, selected: PriceData) -> PriceData:
+        for fdemand in [d for d in filtered if d.is_demand and not d.is_non]:
+            if fdemand.is_cold and fdemand.price_spread < selected.price_spread:
+                return fdemand
+        for d in sorted(filtered, key=lambda x: (not x.is_demand, x.price_spread)):
+            if not d.is_non and d.price_spread < selected.price_spread and not selected.is_demand and not selected.water_temp < self.low_water_limit:
+                selected = d
+                break
+        return selected
+
+
+DAYS = [
+    (P240126, []),
+    (P240129, []),
+    (P240130, P240131),
+    (P240201, P240202),
+    (P240202, P240203),
+    (P240314, P240315),
+]
+
+
+def _cases(quarters: bool):
+    random.seed(22 + quarters)
+    for (today, tomorrow), hour in itertools.product(DAYS, (0, 6, 13, 20, 23)):
+        if quarters:
+            today, tomorrow = [p for p in today for _ in range(4)], [p for p in tomorrow for _ in range(4)]
+        dt = datetime(2024, 1, 26, hour, random.randint(0, 59), random.randint(0, 59))
+        for _ in range(6):
+            yield dict(
+                prices=today + tomorrow,
+                demand_hours=random.choice([[], [20, 21], [6, 7, 20]]),
+                non_hours=random.choice([[], [12, 17, 11, 16]]),
+                current_temp=round(random.uniform(10, 55), 1),
+                temp_trend=random.choice([0, -0.5, -1.78, -5, -40]),
+                min_price=random.choice([0, 0.1, 0.5]),
+                hvac_preset=random.choice([HvacPresets.Normal, HvacPresets.Away]),
+                latest_boost=dt - timedelta(minutes=random.randint(0, 600)),
+                dt=dt,
+            )
+
+
+@pytest.mark.parametrize("quarters", [False, True])
+def test_single_pass_planner_matches_the_list_planner(quarters):
+    for kwargs in _cases(quarters):
+        ret = NextWaterBoost().get_next_start(NextStartPostModel(**kwargs))
+        assert ret == _LegacyNextWaterBoost().get_next_start(NextStartPostModel(**kwargs)), kwargs
+
+
+def test_single_pass_planner_with_shared_stats():
+    for kwargs in _cases(True):
+        dt = kwargs["dt"]
+        stats = PriceStats(kwargs["prices"], start=dt.replace(hour=0, minute=0, second=0))
+        ret = NextWaterBoost().get_next_start(NextStartPostModel(**kwargs, stats=stats))
+        assert ret == _LegacyNextWaterBoost().get_next_start(NextStartPostModel(**kwargs)), kwargs
+
+
+def _plan(cache: NextStartCache, **changes) -> NextStartExportModel:
+    kwargs = dict(prices=P240130 + P240131, demand_hours=[20, 21], non_hours=[12, 17, 11, 16], current_temp=38,
+                  temp_trend=-1, latest_boost=datetime(2024, 1, 30, 13, 40), dt=datetime(2024, 1, 30, 14, 5))
+    model = NextStartPostModel(**(kwargs | changes))
+    key = next_start_fingerprint(model)
+    ret = cache.get(key, model.dt)
+    if ret is None:
+        ret = NextWaterBoost().get_next_start(model)
+        cache.put(key, ret)
+    return ret
+
+
+def test_next_start_is_replanned_only_on_changed_inputs():
+    cache = NextStartCache()
+    first = _plan(cache)
+    assert first.next_start > datetime(2024, 1, 30, 15)
+    assert _plan(cache) == first
+    assert (cache.hits, cache.misses) == (1, 1)
+    _plan(cache, dt=datetime(2024, 1, 30, 14, 35))
+    _plan(cache, dt=datetime(2024, 1, 30, 14, 35), current_temp=37.5)
+    assert (cache.hits, cache.misses) == (1, 3)
+    assert cache.as_dict()["hits"] == 1
+
+
+@pytest.mark.parametrize("planner", [NextWaterBoost, OptimalWaterBoost])
+def test_plans_within_one_interval_do_not_share_a_key(planner):
+    """Both planners project the temperature from the exact reference time, a plan from 14:01 is not one for 14:58."""
+    differ = 0
+    for kwargs in _cases(False):
+        early = NextStartPostModel(**(kwargs | {"dt": kwargs["dt"].replace(minute=1, second=0)}))
+        late = NextStartPostModel(**(kwargs | {"dt": kwargs["dt"].replace(minute=58, second=0)}))
+        assert next_start_fingerprint(early) != next_start_fingerprint(late)
+        differ += planner().get_next_start(early) != planner().get_next_start(late)
+    assert differ > 0
+
+
+def test_next_start_is_replanned_once_it_has_passed():
+    cache = NextStartCache()
+    ret = _plan(cache)
+    cache.put(next_start_fingerprint(NextStartPostModel(
+        prices=P240130 + P240131, demand_hours=[20, 21], non_hours=[12, 17, 11, 16], current_temp=38, temp_trend=-1,
+        latest_boost=datetime(2024, 1, 30, 13, 40), dt=datetime(2024, 1, 30, 14, 5))),
+        NextStartExportModel(datetime(2024, 1, 30, 14, 0), 47))
+    assert _plan(cache) == ret
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+def test_cached_next_start_is_a_copy():
+    cache = NextStartCache()
+    ret = _plan(cache)
+    ret.next_start = datetime.max
+    assert _plan(cache).next_start != datetime.max